@@ -9,11 +9,19 @@ reports.
 from __future__ import annotations
 
 import os
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass
 from typing import Any
 
+from gemini_client import GeminiUnavailable, backend_name, get_gateway, load_sdk
+from metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS
+from tracing import span
+
 DEFAULT_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
 _MAX_CONTEXT_ROWS = 10
+_MAX_FORECAST_ROWS = 25
+_MODEL_UNAVAILABLE_NOTE = "The AI summary is unavailable right now; the computed figures follow."
 
 _BASE_ANALYSIS_INSTRUCTION = (
     "You are an expert in data analysis. Help non-technical people understand "
@@ -22,9 +30,9 @@ _BASE_ANALYSIS_INSTRUCTION = (
 
 
 def _load_generative_ai():
-    """Load and validate the installed google-generativeai SDK surface."""
+    """Load and validate the configured SDK surface (see ``gemini_client.load_sdk``)."""
     try:
-        import google.generativeai as genai
+        genai = load_sdk()
     except ImportError as exc:  # pragma: no cover - exercised via boundary tests
         raise RuntimeError(
             "google-generativeai is required for analytics features."
@@ -42,12 +50,15 @@ def _validate_generative_ai_module(genai_module: Any) -> None:
         )
 
 
-def _extract_text(response: Any) -> str:
-    """Normalize Gemini responses into plain text."""
+def _response_text(response: Any) -> str | None:
+    """Return the text of a Gemini response or stream chunk, if it has any."""
     if isinstance(response, str):
         return response
 
-    text = getattr(response, "text", None)
+    try:
+        text = getattr(response, "text", None)
+    except ValueError:  # the SDK raises for chunks without text parts
+        text = None
     if text:
         return text
 
@@ -66,7 +77,13 @@ def _extract_text(response: Any) -> str:
         if parts:
             return "".join(parts)
 
-    return str(response)
+    return None
+
+
+def _extract_text(response: Any) -> str:
+    """Normalize Gemini responses into plain text."""
+    text = _response_text(response)
+    return text if text is not None else str(response)
 
 
 def _build_inventory_context(df: Any) -> str:
@@ -105,26 +122,119 @@ class GeminiAnalyticsClient:
         self._genai = self.genai_module or _load_generative_ai()
         _validate_generative_ai_module(self._genai)
         self._model = self._genai.GenerativeModel(self.model_name)
-
-    def generate(self, prompt: str) -> str:
-        response = self._model.generate_content(prompt)
-        return _extract_text(response)
+        self._source = backend_name() if self.genai_module is None else "gemini"
+
+    def generate(self, prompt: str, *, generation_config: dict[str, Any] | None = None) -> str:
+        with (
+            span(
+                "GeminiAnalyticsClient.generate",
+                model=self.model_name,
+                prompt_chars=len(prompt),
+            ) as call_span,
+            LLM_REQUEST_SECONDS.time(caller="analytics", source=self._source),
+        ):
+            if generation_config is None:
+                response = get_gateway().call(lambda: self._model.generate_content(prompt), caller="analytics")
+            else:
+                response = get_gateway().call(
+                    lambda: self._model.generate_content(prompt, generation_config=generation_config),
+                    caller="analytics",
+                )
+            text = _extract_text(response)
+            call_span.set_attribute("response_chars", len(text))
+            return text
+
+    def generate_stream(
+        self, prompt: str, *, generation_config: dict[str, Any] | None = None
+    ) -> Iterator[str]:
+        """Yield the response text in chunks as the model produces them."""
+        started = time.perf_counter()
+        with (
+            span(
+                "GeminiAnalyticsClient.generate_stream",
+                model=self.model_name,
+                prompt_chars=len(prompt),
+            ) as call_span,
+            LLM_REQUEST_SECONDS.time(caller="analytics", source=self._source),
+        ):
+            options: dict[str, Any] = {"stream": True}
+            if generation_config is not None:
+                options["generation_config"] = generation_config
+            response_chars = 0
+            chunks = get_gateway().stream(
+                lambda: self._model.generate_content(prompt, **options), caller="analytics"
+            )
+            for chunk in chunks:
+                text = _response_text(chunk)
+                if not text:
+                    continue
+                if not response_chars:
+                    first_token = time.perf_counter() - started
+                    LLM_FIRST_TOKEN_SECONDS.observe(first_token, caller="analytics", source=self._source)
+                    call_span.set_attribute("first_token_seconds", round(first_token, 3))
+                response_chars += len(text)
+                yield text
+            call_span.set_attribute("response_chars", response_chars)
 
 
 def _get_client() -> GeminiAnalyticsClient:
     return GeminiAnalyticsClient()
 
 
-def _run_analysis(df: Any, task_instruction: str, task_prompt: str, client: GeminiAnalyticsClient | None = None) -> str:
-    client = client or _get_client()
+def _analysis_prompt(df: Any, task_instruction: str, task_prompt: str) -> str:
     context = _build_inventory_context(df)
-    prompt = (
+    return (
         f"{_BASE_ANALYSIS_INSTRUCTION}\n\n"
         f"{task_instruction}\n\n"
         f"{task_prompt}\n\n"
         f"Inventory context:\n{context}"
     )
-    return client.generate(prompt)
+
+
+def _run_analysis(df: Any, task_instruction: str, task_prompt: str, client: GeminiAnalyticsClient | None = None) -> str:
+    client = client or _get_client()
+    return client.generate(_analysis_prompt(df, task_instruction, task_prompt))
+
+
+def _stream(prompt: str, client: Any | None = None, fallback: str | None = None) -> Iterator[str]:
+    """Stream ``prompt`` through ``client``; clients without streaming yield one chunk.
+
+    When Gemini is unavailable before the first chunk, ``fallback`` (if given)
+    is yielded instead.
+    """
+    client = client or _get_client()
+    generate_stream = getattr(client, "generate_stream", None)
+    if generate_stream is None:
+        yield _generate(prompt, client, fallback)
+        return
+    started = False
+    try:
+        for chunk in generate_stream(prompt):
+            started = True
+            yield chunk
+    except GeminiUnavailable:
+        if fallback is None or started:
+            raise
+        yield fallback
+
+
+def _generate(prompt: str, client: Any | None = None, fallback: str | None = None) -> str:
+    """Generate ``prompt`` with ``client``, answering ``fallback`` while Gemini is unavailable."""
+    client = client or _get_client()
+    try:
+        return client.generate(prompt)
+    except GeminiUnavailable:
+        if fallback is None:
+            raise
+        return fallback
+
+
+def _insights_prompt(df: Any) -> str:
+    insights_prompt = (
+        "Analyze this inventory data and provide key insights about stock levels, "
+        "popular categories, and pricing trends."
+    )
+    return _analysis_prompt(df, "Focus on actionable inventory insights.", insights_prompt)
 
 
 def generate_insights(df: Any) -> str:
@@ -137,28 +247,100 @@ def generate_insights(df: Any) -> str:
     Returns:
         str: Generated insights.
     """
-    insights_prompt = (
-        "Analyze this inventory data and provide key insights about stock levels, "
-        "popular categories, and pricing trends."
+    return _get_client().generate(_insights_prompt(df))
+
+
+def stream_insights(df: Any, *, client: GeminiAnalyticsClient | None = None) -> Iterator[str]:
+    """Like ``generate_insights``, but yields the text in chunks as it is generated."""
+    return _stream(_insights_prompt(df), client)
+
+
+def _has_forecast_inputs(df: Any) -> bool:
+    columns = set(map(str, getattr(df, "columns", [])))
+    return {"ID", "STOCK"} <= columns
+
+
+def _build_forecast_context(forecast: Any, horizon_days: int) -> str:
+    """Summarize a ``forecasting.forecast_stock_needs`` frame for the model."""
+    at_risk = forecast[forecast["AT_RISK"]]
+    lines = [
+        f"Products forecast: {len(forecast)}",
+        f"At risk within {horizon_days} days or below reorder point: {len(at_risk)}",
+        f"Already out of stock: {int((forecast['STOCK'] <= 0).sum())}",
+        f"Products with no recorded outflow: {int((forecast['DAILY_RATE'] <= 0).sum())}",
+        f"Most urgent products (up to {_MAX_FORECAST_ROWS}, soonest first):",
+        at_risk.head(_MAX_FORECAST_ROWS).to_string(index=False) if len(at_risk) else "(none)",
+    ]
+    return "\n".join(lines)
+
+
+def _stock_needs_prompt(df: Any, db_path: str | None, forecast: Any | None) -> tuple[str, str | None]:
+    """Return the prompt and, when a forecast exists, a fallback answer built from it."""
+    if forecast is None and _has_forecast_inputs(df):
+        from forecasting import forecast_stock_needs
+
+        forecast = forecast_stock_needs(df, db_path)
+    if forecast is None:
+        prediction_prompt = (
+            "Based on the current inventory data, predict which products are likely to "
+            "run out of stock in the next month. Consider historical sales data if available."
+        )
+        return _analysis_prompt(df, "Focus on stock risk and replenishment timing.", prediction_prompt), None
+
+    from forecasting import DEFAULT_HORIZON_DAYS, DEFAULT_LEAD_TIME_DAYS
+
+    context = _build_forecast_context(forecast, DEFAULT_HORIZON_DAYS)
+    prompt = (
+        f"{_BASE_ANALYSIS_INSTRUCTION}\n\n"
+        "Focus on stock risk and replenishment timing.\n\n"
+        "The stock-out forecast below was computed from the recorded stock movements: "
+        "DAILY_RATE is the smoothed units sold per day, DAYS_TO_STOCKOUT and STOCKOUT_DATE "
+        f"assume that rate holds, and REORDER_POINT covers a {DEFAULT_LEAD_TIME_DAYS}-day lead "
+        "time plus safety stock. Summarize which products need replenishing first and why. "
+        "Use only the numbers given; do not invent figures.\n\n"
+        f"Stock-out forecast:\n{context}"
     )
-    return _run_analysis(df, "Focus on actionable inventory insights.", insights_prompt)
+    return prompt, f"{_MODEL_UNAVAILABLE_NOTE}\n\n{context}"
 
 
-def predict_stock_needs(df: Any) -> str:
+def predict_stock_needs(
+    df: Any,
+    *,
+    db_path: str | None = None,
+    forecast: Any | None = None,
+    client: GeminiAnalyticsClient | None = None,
+) -> str:
     """
     Predicts which products are likely to run out of stock in the next month.
 
+    When the data has ``ID`` and ``STOCK`` columns, every product is forecast
+    locally from the stock movement ledger at ``db_path`` (see
+    ``forecasting``) and the model only summarizes the ranked result. Pass a
+    precomputed ``forecast`` to reuse one already shown to the user.
+
     Args:
         df: The inventory data.
+        db_path: Database holding the STOCK_MOVEMENT history.
+        forecast: Optional result of ``forecasting.forecast_stock_needs``.
+        client: Optional model client.
 
     Returns:
         str: Stock predictions.
     """
-    prediction_prompt = (
-        "Based on the current inventory data, predict which products are likely to "
-        "run out of stock in the next month. Consider historical sales data if available."
-    )
-    return _run_analysis(df, "Focus on stock risk and replenishment timing.", prediction_prompt)
+    prompt, fallback = _stock_needs_prompt(df, db_path, forecast)
+    return _generate(prompt, client, fallback)
+
+
+def stream_stock_needs(
+    df: Any,
+    *,
+    db_path: str | None = None,
+    forecast: Any | None = None,
+    client: GeminiAnalyticsClient | None = None,
+) -> Iterator[str]:
+    """Like ``predict_stock_needs``, but yields the text in chunks as it is generated."""
+    prompt, fallback = _stock_needs_prompt(df, db_path, forecast)
+    return _stream(prompt, client, fallback)
 
 
 def categorize_product(df: Any, product_name: str, product_description: str) -> str:
@@ -179,18 +361,48 @@ def categorize_product(df: Any, product_name: str, product_description: str) ->
     return _run_analysis(df, "Focus on the most appropriate inventory category.", categorization_prompt)
 
 
-def generate_report(df: Any) -> str:
+def generate_report(
+    df: Any,
+    *,
+    db_path: str | None = None,
+    report: Any | None = None,
+    client: GeminiAnalyticsClient | None = None,
+) -> str:
     """
     Generates a comprehensive inventory report.
 
+    With ``db_path`` (or a precomputed ``report``) the figures come from
+    ``reporting.build_report`` over the whole table. The model writes only the
+    narrative, which is followed by the figures exactly as computed.
+
     Args:
         df: The inventory data.
+        db_path: Database to compute the report figures from.
+        report: Optional result of ``reporting.build_report``.
+        client: Optional model client.
 
     Returns:
         str: The inventory report.
     """
-    report_prompt = (
-        "Generate a comprehensive inventory report. Include total inventory value, "
-        "top-selling products, low stock alerts, and any notable trends."
+    if report is None and db_path is not None:
+        from reporting import build_report
+
+        report = build_report(db_path)
+    if report is None:
+        report_prompt = (
+            "Generate a comprehensive inventory report. Include total inventory value, "
+            "top-selling products, low stock alerts, and any notable trends."
+        )
+        return _run_analysis(df, "Produce a concise executive summary.", report_prompt, client)
+
+    figures = report.to_markdown()
+    prompt = (
+        f"{_BASE_ANALYSIS_INSTRUCTION}\n\n"
+        "Produce a concise executive summary.\n\n"
+        "Write a short narrative (a few paragraphs) for an inventory report around the figures "
+        "below: what stands out, which categories and products matter most, and what to act on. "
+        "The figures will be printed after your text, so do not repeat the tables. Use only the "
+        "numbers given; do not invent or recompute figures.\n\n"
+        f"{figures}"
     )
-    return _run_analysis(df, "Produce a concise executive summary.", report_prompt)
+    return f"{_generate(prompt, client, _MODEL_UNAVAILABLE_NOTE).strip()}\n\n{figures}"
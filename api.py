@@ -0,0 +1,447 @@
+"""
+api.py
+
+A headless JSON-over-HTTP service for integrations that do not need the
+Streamlit UI. It exposes the dashboard metrics, natural-language SQL (with the
+same read-only guardrails), Excel import preview/processing and the analytics
+helpers, and records the same audit events as the UI.
+
+The server is stdlib-only (``ThreadingHTTPServer``, one thread per request) and
+shares this process's metrics registry and import preview cache; ``/metrics``
+serves the Prometheus text format. Run it with::
+
+    python api.py --port 8502
+
+It binds to 127.0.0.1 by default. Set ``INVENTORY_API_TOKEN`` to require an
+``Authorization: Bearer <token>`` header on every request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import analytics
+from audit import append_audit_event
+from database import DATABASE_PATH, INVENTORY_VALUE_COLUMN, PRODUCT_TABLE, validate_product_schema
+from excel_processing import (
+    DUPLICATE_POLICIES,
+    DUPLICATES_LAST_WINS,
+    preview_excel_import,
+    process_excel_file,
+)
+from guardrails import GuardrailViolation, SqlGuardrailViolation, validate_read_only_sql
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import REGISTRY
+from preview_cache import get_preview_cache
+from prompt import generate_sql_query, get_sql_prompt_metadata
+from tracing import span
+from utils import read_sql_query
+
+API_TOKEN_ENV = "INVENTORY_API_TOKEN"
+DEFAULT_API_HOST = "127.0.0.1"
+DEFAULT_API_PORT = 8502
+DEFAULT_MAX_ROWS = 1_000
+MAX_BODY_BYTES = 50 * 1024 * 1024
+PREVIEW_CACHE_SIZE = 8
+SQL_DB_DESCRIPTION = (
+    "Product table schema: PRODUCT "
+    "(ID INTEGER PRIMARY KEY AUTOINCREMENT, NAME TEXT, STOCK INTEGER, PRICE REAL, CATEGORY TEXT)"
+)
+_IMPORT_ACTIONS = ("add", "remove", "modify")
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class ApiError(Exception):
+    """An error that maps directly onto an HTTP status and JSON message."""
+
+    def __init__(self, status: int, message: str, **extra: Any):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+@dataclass
+class ApiRequest:
+    method: str
+    path: str
+    query: dict[str, str]
+    headers: Any
+    body: bytes = b""
+
+    def json(self) -> dict[str, Any]:
+        if not self.body:
+            return {}
+        try:
+            payload = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ApiError(400, f"Request body is not valid JSON: {exc}") from exc
+        if not isinstance(payload, dict):
+            raise ApiError(400, "Request body must be a JSON object.")
+        return payload
+
+    def flag(self, name: str) -> bool:
+        return self.query.get(name, "").strip().lower() in _TRUE_VALUES
+
+
+class _UploadedBytes(io.BytesIO):
+    """Give request bodies the ``name`` attribute Streamlit uploads have."""
+
+    def __init__(self, data: bytes, name: str | None):
+        super().__init__(data)
+        self.name = name
+
+
+@dataclass
+class _CachedPreview:
+    filename: str | None
+    data: bytes
+    preview: dict[str, Any]
+
+
+@dataclass
+class InventoryApi:
+    """Request handlers bound to one database, plus the shared preview cache."""
+
+    db_path: str
+    max_rows: int = DEFAULT_MAX_ROWS
+    _previews: OrderedDict[str, _CachedPreview] = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        self.db_path = str(self.db_path)
+        self.routes: dict[tuple[str, str], Callable[[ApiRequest], dict[str, Any]]] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/dashboard"): self.dashboard,
+            ("POST", "/sql"): self.sql,
+            ("POST", "/imports/preview"): self.preview_import,
+            ("POST", "/imports/process"): self.process_import,
+            ("POST", "/analytics/insights"): self.insights,
+            ("POST", "/analytics/stock-needs"): self.stock_needs,
+            ("POST", "/analytics/categorize"): self.categorize,
+            ("POST", "/analytics/report"): self.report,
+        }
+
+    def dispatch(self, request: ApiRequest) -> dict[str, Any]:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise ApiError(405, f"{request.method} is not supported for {request.path}.")
+            raise ApiError(404, f"Unknown endpoint: {request.path}")
+        with span(f"api.{request.method} {request.path}"):
+            return handler(request)
+
+    # -- dashboard -----------------------------------------------------------------
+
+    def health(self, request: ApiRequest) -> dict[str, Any]:
+        try:
+            validate_product_schema(self.db_path)
+        except RuntimeError as exc:
+            raise ApiError(503, f"Database startup check failed: {exc}") from exc
+        return {"status": "ok"}
+
+    def dashboard(self, request: ApiRequest) -> dict[str, Any]:
+        query = (
+            f"SELECT COUNT(*) as product_count, "
+            f"COALESCE(SUM(price * {INVENTORY_VALUE_COLUMN}), 0) as total_inventory_value "
+            f"FROM {PRODUCT_TABLE}"
+        )
+        (row,) = read_sql_query(query, self.db_path).to_dict(orient="records")
+        return {
+            "product_count": row["product_count"],
+            "total_inventory_value": row["total_inventory_value"],
+        }
+
+    # -- natural language SQL --------------------------------------------------------
+
+    def sql(self, request: ApiRequest) -> dict[str, Any]:
+        payload = request.json()
+        question = str(payload.get("question") or "").strip()
+        if not question:
+            raise ApiError(400, "Provide a non-empty 'question'.")
+        max_rows = _positive_int(payload.get("max_rows", self.max_rows), "max_rows")
+
+        sql_query = generate_sql_query(SQL_DB_DESCRIPTION, question)
+        audit_details = {
+            **get_sql_prompt_metadata(),
+            "channel": "api",
+            "question": question,
+            "generated_sql": sql_query,
+        }
+        try:
+            validated_sql = validate_read_only_sql(sql_query, allowed_tables=(PRODUCT_TABLE,))
+            result = read_sql_query(validated_sql, self.db_path)
+        except SqlGuardrailViolation as exc:
+            append_audit_event(
+                self.db_path,
+                "sql_query_review",
+                {**audit_details, "status": "blocked", "error": str(exc)},
+            )
+            raise ApiError(422, f"Blocked unsafe AI-generated SQL: {exc}", generated_sql=sql_query) from exc
+        except Exception as exc:
+            append_audit_event(
+                self.db_path,
+                "sql_query_review",
+                {**audit_details, "status": "failed", "error": str(exc)},
+            )
+            raise ApiError(500, f"Error executing SQL query: {exc}", generated_sql=sql_query) from exc
+
+        rows = result.to_dict(orient="records")
+        append_audit_event(
+            self.db_path,
+            "sql_query_review",
+            {
+                **audit_details,
+                "validated_sql": validated_sql,
+                "status": "executed",
+                "row_count": len(rows),
+            },
+        )
+        return {
+            "generated_sql": sql_query,
+            "validated_sql": validated_sql,
+            "columns": list(result.columns),
+            "rows": rows[:max_rows],
+            "row_count": len(rows),
+            "truncated": len(rows) > max_rows,
+        }
+
+    # -- Excel imports -------------------------------------------------------------
+
+    def _cached_preview(self, request: ApiRequest) -> tuple[str, _CachedPreview, bool]:
+        """Return the preview for the request body or ``preview_id``, computing it once."""
+
+        preview_id = request.query.get("preview_id")
+        if request.body:
+            digest = hashlib.sha256(request.body).hexdigest()
+            if preview_id and preview_id != digest:
+                raise ApiError(409, "preview_id does not match the uploaded file.")
+            preview_id = digest
+        elif not preview_id:
+            raise ApiError(400, "Upload the spreadsheet as the request body or pass preview_id.")
+
+        with self._lock:
+            cached = self._previews.get(preview_id)
+            if cached is not None:
+                self._previews.move_to_end(preview_id)
+                return preview_id, cached, True
+        if not request.body:
+            raise ApiError(404, "Unknown or expired preview_id; upload the file again.")
+
+        filename = request.query.get("filename")
+        try:
+            preview = preview_excel_import(
+                _UploadedBytes(request.body, filename),
+                self.db_path,
+                emit_audit_event=True,
+                cache=get_preview_cache(self.db_path),
+            )
+        except GuardrailViolation as exc:
+            raise ApiError(422, str(exc)) from exc
+        except ValueError as exc:
+            raise ApiError(400, f"Could not read the spreadsheet: {exc}") from exc
+        cached = _CachedPreview(filename=filename, data=request.body, preview=preview)
+        with self._lock:
+            self._previews[preview_id] = cached
+            while len(self._previews) > PREVIEW_CACHE_SIZE:
+                self._previews.popitem(last=False)
+        return preview_id, cached, False
+
+    def preview_import(self, request: ApiRequest) -> dict[str, Any]:
+        preview_id, cached, hit = self._cached_preview(request)
+        preview = cached.preview
+        return {
+            "preview_id": preview_id,
+            "cached": hit,
+            "columns": [str(column) for column in preview["dataframe"].columns],
+            "format": preview["upload_format"].name,
+            "row_count": preview["total_rows"],
+            "column_mappings": preview["column_mappings"],
+            "proposed_new_columns": preview["proposed_new_columns"],
+            "duplicate_keys": {str(name): count for name, count in preview["duplicate_keys"].items()},
+            "new_column_types": preview["new_column_types"],
+            "coercion_failures": preview["coercion_failures"],
+        }
+
+    def process_import(self, request: ApiRequest) -> dict[str, Any]:
+        action = request.query.get("action", "add")
+        if action not in _IMPORT_ACTIONS:
+            raise ApiError(400, f"action must be one of: {', '.join(_IMPORT_ACTIONS)}.")
+        batch_size = request.query.get("batch_size")
+        batch_size = _positive_int(batch_size, "batch_size") if batch_size else None
+        duplicate_policy = request.query.get("duplicate_policy", DUPLICATES_LAST_WINS)
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ApiError(400, f"duplicate_policy must be one of: {', '.join(DUPLICATE_POLICIES)}.")
+        preview_id, cached, _ = self._cached_preview(request)
+        try:
+            processed_rows = process_excel_file(
+                _UploadedBytes(cached.data, cached.filename),
+                self.db_path,
+                action,
+                allow_schema_changes=request.flag("allow_schema_changes"),
+                allow_destructive_actions=request.flag("allow_destructive_actions"),
+                preview=cached.preview,
+                batch_size=batch_size,
+                duplicate_policy=duplicate_policy,
+            )
+        except GuardrailViolation as exc:
+            raise ApiError(422, str(exc), preview_id=preview_id) from exc
+        except ValueError as exc:
+            raise ApiError(400, str(exc), preview_id=preview_id) from exc
+        with self._lock:
+            # The schema or rows may have changed, so every cached mapping is stale.
+            self._previews.clear()
+        return {"preview_id": preview_id, "action": action, "processed_rows": processed_rows}
+
+    # -- analytics -----------------------------------------------------------------
+
+    def _run_analytics(self, func: Callable[..., str], *args: str, **kwargs: Any) -> dict[str, Any]:
+        df = read_sql_query(f"SELECT * FROM {PRODUCT_TABLE}", self.db_path)
+        try:
+            return {"text": func(df, *args, **kwargs)}
+        except RuntimeError as exc:
+            raise ApiError(503, str(exc)) from exc
+
+    def insights(self, request: ApiRequest) -> dict[str, Any]:
+        return self._run_analytics(analytics.generate_insights)
+
+    def stock_needs(self, request: ApiRequest) -> dict[str, Any]:
+        return self._run_analytics(analytics.predict_stock_needs, db_path=self.db_path)
+
+    def report(self, request: ApiRequest) -> dict[str, Any]:
+        return self._run_analytics(analytics.generate_report, db_path=self.db_path)
+
+    def categorize(self, request: ApiRequest) -> dict[str, Any]:
+        payload = request.json()
+        name = str(payload.get("name") or "").strip()
+        description = str(payload.get("description") or "").strip()
+        if not name or not description:
+            raise ApiError(400, "Provide both 'name' and 'description'.")
+        return self._run_analytics(analytics.categorize_product, name, description)
+
+
+def _positive_int(value: Any, name: str) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError) as exc:
+        raise ApiError(400, f"'{name}' must be an integer.") from exc
+    if number <= 0:
+        raise ApiError(400, f"'{name}' must be positive.")
+    return number
+
+
+def _json_default(value: Any) -> Any:
+    item = getattr(value, "item", None)  # NumPy scalars from pandas frames
+    if callable(item):
+        return item()
+    return str(value)
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    server_version = "InventoryAPI/1.0"
+    api: InventoryApi
+    token: str | None = None
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        self._send(status, body, "application/json")
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        supplied = self.headers.get("Authorization", "")
+        return hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {self.token}".encode("utf-8"))
+
+    def _handle(self, method: str) -> None:
+        if not self._authorized():
+            self._send_json(401, {"error": "Missing or invalid bearer token."})
+            return
+        parts = urlsplit(self.path)
+        if method == "GET" and parts.path == "/metrics":
+            self._send(200, REGISTRY.render().encode("utf-8"), METRICS_CONTENT_TYPE)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Request body exceeds {MAX_BODY_BYTES} bytes."})
+            return
+        request = ApiRequest(
+            method=method,
+            path=parts.path.rstrip("/") or "/",
+            query={key: values[-1] for key, values in parse_qs(parts.query).items()},
+            headers=self.headers,
+            body=self.rfile.read(length) if length else b"",
+        )
+        try:
+            self._send_json(200, self.api.dispatch(request))
+        except ApiError as exc:
+            self._send_json(exc.status, {"error": str(exc), **exc.extra})
+        except Exception as exc:  # keep the server alive and report the failure
+            self._send_json(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self._handle("POST")
+
+
+def create_server(
+    db_path: str | Path = DATABASE_PATH,
+    *,
+    host: str = DEFAULT_API_HOST,
+    port: int = DEFAULT_API_PORT,
+    token: str | None = None,
+) -> ThreadingHTTPServer:
+    """Build (but do not start) the API server for ``db_path``."""
+
+    api = InventoryApi(str(db_path))
+    token = token if token is not None else os.getenv(API_TOKEN_ENV)
+    handler = type("InventoryApiHandler", (_ApiHandler,), {"api": api, "token": token or None})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the inventory features over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_API_HOST, help="Interface to bind (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_API_PORT, help="Port to bind (default: 8502).")
+    parser.add_argument("--db-path", type=Path, default=DATABASE_PATH, help="SQLite database to serve.")
+    args = parser.parse_args(argv)
+
+    import config  # noqa: F401 - loads .env so Gemini credentials match the UI
+
+    validate_product_schema(str(args.db_path))
+    server = create_server(args.db_path, host=args.host, port=args.port)
+    print(f"Serving inventory API on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
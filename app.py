@@ -6,6 +6,8 @@ handles user inputs, and calls functions from other modules to execute the core
 """
 
 
+from contextlib import contextmanager
+
 import streamlit as st
 
 try:
@@ -14,7 +16,7 @@ try:
 except ImportError:  # pandasai is not a declared dependency; install manually on Python 3.11
     _PANDASAI_AVAILABLE = False
 
-from analytics import categorize_product, generate_insights, generate_report, predict_stock_needs
+from analytics import categorize_product, stream_insights, stream_stock_needs
 from audit import append_audit_event
 from config import (  # ensure configuration is loaded
     MISSING_CREDENTIALS,
@@ -25,21 +27,49 @@ from database import (
     PRODUCT_TABLE,
     validate_product_schema,
 )
-from excel_processing import preview_excel_import, process_excel_file
-from guardrails import (
-    DestructiveActionApprovalRequired,
-    SchemaChangeApprovalRequired,
-    SqlGuardrailViolation,
-    validate_read_only_sql,
+from excel_processing import (
+    DUPLICATE_POLICIES,
+    DUPLICATES_LAST_WINS,
+    preview_excel_import,
+    process_excel_file,
+)
+from forecasting import forecast_stock_needs
+from guardrails import SqlGuardrailViolation, validate_read_only_sql
+from jobs import (
+    CATEGORIZATION_JOB,
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    REPORT_JOB,
+    list_jobs,
+    start_workers,
+    submit_categorization_job,
+    submit_import_job,
+    submit_report_job,
 )
+from mapping_memory import forget_mapping, list_mappings
+from metrics import IMPORT_PREVIEW_CACHE, start_exporter
+from preview_cache import get_preview_cache
+from profiling import profile_action
 from prompt import (
-    generate_sql_query,
+    finalize_sql_query,
     get_column_mapping_prompt_metadata,
     get_sql_prompt_metadata,
+    stream_sql_query,
 )
+from tracing import span
 from utils import read_sql_query
 
 IMPORT_PREVIEW_STATE_KEY = "excel_import_preview"
+JOB_POLL_SECONDS = 2
+
+
+@contextmanager
+def _ui_action(name: str):
+    """Trace a button handler as one ``ui.<name>`` span, profiling it when opted in."""
+
+    with span(f"ui.{name}"), profile_action(name, DATABASE_PATH):
+        yield
 
 
 def _get_uploaded_file_signature(uploaded_file) -> str | None:
@@ -83,9 +113,16 @@ def _get_cached_import_preview(uploaded_file, db_path):
         and cached_preview.get("cache_key") == cache_key
         and cached_preview.get("db_path") == db_path
     ):
+        IMPORT_PREVIEW_CACHE.inc(result="hit")
         return cached_preview["preview"]
 
-    preview = preview_excel_import(uploaded_file, db_path, emit_audit_event=True)
+    IMPORT_PREVIEW_CACHE.inc(result="miss")
+    preview = preview_excel_import(
+        uploaded_file,
+        db_path,
+        emit_audit_event=True,
+        cache=get_preview_cache(db_path),
+    )
     if cache_key is not None:
         st.session_state[IMPORT_PREVIEW_STATE_KEY] = {
             "cache_key": cache_key,
@@ -94,6 +131,9 @@ def _get_cached_import_preview(uploaded_file, db_path):
         }
     return preview
 
+# Serve Prometheus metrics when INVENTORY_METRICS_PORT is set (no-op on reruns)
+start_exporter()
+
 # Set up Streamlit page configuration
 st.set_page_config(
     page_title="Inventory Management Using GenAI",
@@ -237,66 +277,73 @@ st.markdown('<h2>SQL Query Input</h2>', unsafe_allow_html=True)
 question = st.text_area("Enter your query in natural language:")
 
 if st.button("Generate SQL Query"):
-    if question:
-        db_description = (
-            "Product table schema: PRODUCT "
-            "(ID INTEGER PRIMARY KEY AUTOINCREMENT, NAME TEXT, STOCK INTEGER, PRICE REAL, CATEGORY TEXT)"
-        )
-        sql_query = generate_sql_query(db_description, question)
-        try:
-            validated_sql = validate_read_only_sql(sql_query, allowed_tables=(PRODUCT_TABLE,))
-            st.write("Generated SQL Query:", validated_sql)
-            result_df = read_sql_query(validated_sql, db_path)
-            append_audit_event(
-                db_path,
-                "sql_query_review",
-                {
-                    **get_sql_prompt_metadata(),
-                    "question": question,
-                    "generated_sql": sql_query,
-                    "validated_sql": validated_sql,
-                    "status": "executed",
-                    "row_count": len(result_df),
-                },
-            )
-            st.write(result_df)
-        except SqlGuardrailViolation as exc:
-            append_audit_event(
-                db_path,
-                "sql_query_review",
-                {
-                    **get_sql_prompt_metadata(),
-                    "question": question,
-                    "generated_sql": sql_query,
-                    "status": "blocked",
-                    "error": str(exc),
-                },
+    with _ui_action("generate_sql_query"):
+        if question:
+            db_description = (
+                "Product table schema: PRODUCT "
+                "(ID INTEGER PRIMARY KEY AUTOINCREMENT, NAME TEXT, STOCK INTEGER, PRICE REAL, CATEGORY TEXT)"
             )
-            st.error(f"Blocked unsafe AI-generated SQL: {exc}")
-        except Exception as e:
-            append_audit_event(
-                db_path,
-                "sql_query_review",
-                {
-                    **get_sql_prompt_metadata(),
-                    "question": question,
-                    "generated_sql": sql_query,
-                    "status": "failed",
-                    "error": str(e),
-                },
-            )
-            st.error(f"Error executing SQL query: {e}")
-    else:
-        st.error("Please enter a query.")
+            st.write("Generated SQL Query:")
+            streamed_sql = st.write_stream(stream_sql_query(db_description, question))
+            sql_query = finalize_sql_query(streamed_sql, question)
+            try:
+                validated_sql = validate_read_only_sql(sql_query, allowed_tables=(PRODUCT_TABLE,))
+                if validated_sql != streamed_sql.strip():
+                    st.write("Running:", validated_sql)
+                result_df = read_sql_query(validated_sql, db_path)
+                append_audit_event(
+                    db_path,
+                    "sql_query_review",
+                    {
+                        **get_sql_prompt_metadata(),
+                        "question": question,
+                        "generated_sql": sql_query,
+                        "validated_sql": validated_sql,
+                        "status": "executed",
+                        "row_count": len(result_df),
+                    },
+                )
+                st.write(result_df)
+            except SqlGuardrailViolation as exc:
+                append_audit_event(
+                    db_path,
+                    "sql_query_review",
+                    {
+                        **get_sql_prompt_metadata(),
+                        "question": question,
+                        "generated_sql": sql_query,
+                        "status": "blocked",
+                        "error": str(exc),
+                    },
+                )
+                st.error(f"Blocked unsafe AI-generated SQL: {exc}")
+            except Exception as e:
+                append_audit_event(
+                    db_path,
+                    "sql_query_review",
+                    {
+                        **get_sql_prompt_metadata(),
+                        "question": question,
+                        "generated_sql": sql_query,
+                        "status": "failed",
+                        "error": str(e),
+                    },
+                )
+                st.error(f"Error executing SQL query: {e}")
+        else:
+            st.error("Please enter a query.")
 
 # --------------------------
 # Excel File Processing Section
 # --------------------------
 st.markdown('<h2>Upload Excel File</h2>', unsafe_allow_html=True)
-uploaded_file = st.file_uploader("Choose an Excel file", type=["xlsx"])
+uploaded_file = st.file_uploader(
+    "Choose an Excel, CSV, TSV or Parquet file", type=["xlsx", "csv", "tsv", "parquet"]
+)
 action = st.selectbox("Select Action", ["add", "remove", "modify"])
 approve_schema_changes = False
 approve_destructive_action = False
+duplicate_policy = DUPLICATES_LAST_WINS
 import_preview = None
 
 if uploaded_file is None:
@@ -307,18 +354,58 @@ else:
         import_preview = _get_cached_import_preview(uploaded_file, db_path)
         st.write("Column names in the uploaded file:", import_preview["dataframe"].columns.tolist())
         st.write("Resolved column mappings:", import_preview["column_mappings"])
+        if import_preview["duplicate_keys"]:
+            st.warning(
+                "These product names appear more than once in the file: {}.".format(
+                    ", ".join(f"{name} (x{count})" for name, count in import_preview["duplicate_keys"].items())
+                )
+            )
+            duplicate_policy = st.selectbox(
+                "How should repeated product names be imported?",
+                DUPLICATE_POLICIES,
+                format_func={
+                    "last": "Keep the last row",
+                    "sum": "Keep the last row and sum the stock",
+                    "reject": "Reject the file",
+                }.get,
+            )
+        if import_preview.get("coercion_failures"):
+            st.warning(
+                "Some values do not match their column type and will be stored as-is: {}.".format(
+                    "; ".join(
+                        f"{column}: {entry['failed']} value(s), e.g. {', '.join(entry['examples'])}"
+                        for column, entry in import_preview["coercion_failures"].items()
+                    )
+                )
+            )
         if action in {"remove", "modify"}:
             st.warning(
                 f"The '{action}' action changes or removes existing inventory rows."
             )
+            import_diff = process_excel_file(
+                uploaded_file,
+                db_path,
+                action,
+                preview=import_preview,
+                dry_run=True,
+                duplicate_policy=duplicate_policy,
+            )
+            st.write("Dry run — what this import would change:", import_diff.counts())
+            for kind, samples in import_diff.samples.items():
+                if samples:
+                    st.write(f"Sample {kind.replace('_', '-')} rows:", samples)
             approve_destructive_action = st.checkbox(
                 f"Approve the '{action}' action for this import",
                 key=f"approve_destructive_{action}",
             )
         if import_preview["proposed_new_columns"]:
+            new_column_types = import_preview.get("new_column_types", {})
             st.warning(
                 "This import proposes new PRODUCT columns: {}.".format(
-                    ", ".join(import_preview["proposed_new_columns"])
+                    ", ".join(
+                        f"{column} ({new_column_types[column]})" if column in new_column_types else column
+                        for column in import_preview["proposed_new_columns"]
+                    )
                 )
             )
             approve_schema_changes = st.checkbox(
@@ -341,46 +428,50 @@ else:
         st.error(f"Unable to preview the Excel import: {exc}")
 
 if st.button("Process Excel File"):
-    if uploaded_file:
-        try:
-            if import_preview is None:
-                import_preview = _get_cached_import_preview(uploaded_file, db_path)
-            process_excel_file(
-                uploaded_file,
-                db_path,
-                action,
-                allow_schema_changes=approve_schema_changes,
-                allow_destructive_actions=approve_destructive_action,
-                preview=import_preview,
-            )
-            _clear_cached_import_preview()
-            st.success(f"Successfully processed the Excel file for {action} action.")
-        except DestructiveActionApprovalRequired as exc:
-            st.error(str(exc))
-        except SchemaChangeApprovalRequired as exc:
-            st.error(str(exc))
-        except Exception as exc:
-            st.error(f"Unable to process the Excel file: {exc}")
-    else:
-        st.error("Please upload an Excel file.")
+    with _ui_action("process_excel_file"):
+        if uploaded_file:
+            try:
+                if import_preview is None:
+                    import_preview = _get_cached_import_preview(uploaded_file, db_path)
+                job_id = submit_import_job(
+                    db_path,
+                    uploaded_file.getvalue(),
+                    filename=getattr(uploaded_file, "name", None),
+                    action=action,
+                    column_mappings=import_preview["column_mappings"],
+                    allow_schema_changes=approve_schema_changes,
+                    allow_destructive_actions=approve_destructive_action,
+                    duplicate_policy=duplicate_policy,
+                )
+                start_workers(db_path)
+                _clear_cached_import_preview()
+                st.success(f"Queued the Excel file for the {action} action as job #{job_id}.")
+            except Exception as exc:
+                st.error(f"Unable to queue the Excel file: {exc}")
+        else:
+            st.error("Please upload an Excel file.")
 
 # --------------------------
 # Inventory Insights Section
 # --------------------------
 st.markdown('<h2>Generate Inventory Insights</h2>', unsafe_allow_html=True)
 if st.button("Generate Insights"):
-    df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
-    insights = generate_insights(df_full)
-    st.write("Inventory Insights:", insights)
+    with _ui_action("generate_insights"):
+        df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
+        st.write("Inventory Insights:")
+        st.write_stream(stream_insights(df_full))
 
 # --------------------------
 # Stock Prediction Section
 # --------------------------
 st.markdown('<h2>Predict Stock Needs</h2>', unsafe_allow_html=True)
 if st.button("Predict Stock Needs"):
-    df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
-    predictions = predict_stock_needs(df_full)
-    st.write("Stock Predictions:", predictions)
+    with _ui_action("predict_stock_needs"):
+        df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
+        forecast = forecast_stock_needs(df_full, db_path)
+        st.write("Stock-out forecast (soonest first):", forecast.head(25))
+        st.write("Stock Predictions:")
+        st.write_stream(stream_stock_needs(df_full, db_path=db_path, forecast=forecast))
 
 # --------------------------
 # Product Categorization Section
@@ -390,18 +481,86 @@ product_name = st.text_input("Enter the product name:")
 product_description = st.text_area("Enter the product description:")
 
 if st.button("Categorize Product"):
-    if product_name and product_description:
-        df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
-        category = categorize_product(df_full, product_name, product_description)
-        st.write("Product Category:", category)
-    else:
-        st.error("Please provide both product name and description.")
+    with _ui_action("categorize_product"):
+        if product_name and product_description:
+            df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
+            category = categorize_product(df_full, product_name, product_description)
+            st.write("Product Category:", category)
+        else:
+            st.error("Please provide both product name and description.")
+
+if st.button("Categorize Uncategorized Products"):
+    with _ui_action("bulk_categorization"):
+        job_id = submit_categorization_job(db_path)
+        start_workers(db_path)
+        st.success(f"Queued bulk categorization as job #{job_id}; progress appears under Background Jobs.")
 
 # --------------------------
 # Inventory Report Section
 # --------------------------
 st.markdown('<h2>Generate Inventory Report</h2>', unsafe_allow_html=True)
 if st.button("Generate Report"):
-    df_full = read_sql_query("SELECT * FROM PRODUCT", db_path)
-    report = generate_report(df_full)
-    st.write("Inventory Report:", report)
+    with _ui_action("generate_report"):
+        job_id = submit_report_job(db_path)
+        start_workers(db_path)
+        st.success(f"Queued the inventory report as job #{job_id}.")
+
+# --------------------------
+# Background Jobs Section
+# --------------------------
+st.markdown('<h2>Background Jobs</h2>', unsafe_allow_html=True)
+
+
+def _render_background_jobs():
+    for job in list_jobs(db_path, limit=10):
+        st.write(f"Job #{job.id} ({job.kind}): {job.status}")
+        if job.status == JOB_RUNNING and job.progress_fraction is not None:
+            st.progress(
+                job.progress_fraction,
+                text=f"{job.progress_current} of {job.progress_total} rows",
+            )
+        elif job.status == JOB_FAILED:
+            st.error(job.error)
+        elif job.status == JOB_SUCCEEDED and job.kind == REPORT_JOB:
+            st.write("Inventory Report:")
+            st.markdown(job.result["text"])
+        elif job.status == JOB_SUCCEEDED and job.kind == CATEGORIZATION_JOB:
+            st.write(
+                f"Categorized {job.result['rows_categorized']} of {job.result['rows_selected']} "
+                f"uncategorized rows in {job.result['chunks_processed']} chunks."
+            )
+            if not job.result["completed"]:
+                st.warning("Bulk categorization stopped early; run it again to resume.")
+        elif job.status == JOB_SUCCEEDED:
+            st.write(f"Processed {job.result['processed_rows']} rows ({job.result['action']}).")
+
+
+# Re-render only this panel while jobs run; older Streamlit falls back to reruns.
+if hasattr(st, "fragment"):
+    st.fragment(run_every=JOB_POLL_SECONDS)(_render_background_jobs)()
+else:
+    _render_background_jobs()
+
+# --------------------------
+# Remembered Column Mappings Section
+# --------------------------
+st.markdown('<h2>Remembered Column Mappings</h2>', unsafe_allow_html=True)
+remembered_mappings = list_mappings(db_path)
+if not remembered_mappings:
+    st.write("No column mappings remembered yet.")
+for entry in remembered_mappings:
+    st.write(
+        f"{entry.signature[:12]} from {entry.source or 'an upload'}: "
+        f"{entry.hit_count} reuses, last used {entry.last_used_at}",
+        entry.column_mappings,
+    )
+if remembered_mappings:
+    signature_to_evict = st.selectbox(
+        "Mapping to evict",
+        [entry.signature for entry in remembered_mappings],
+        format_func=lambda signature: signature[:12],
+    )
+    if st.button("Evict Mapping"):
+        if forget_mapping(db_path, signature_to_evict):
+            append_audit_event(db_path, "column_mapping_evicted", {"signature": signature_to_evict})
+            st.success("Evicted the remembered mapping; the next upload with that layout asks the model again.")
@@ -8,8 +8,12 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Mapping
 
+from metrics import AUDIT_EVENTS, AUDIT_LOG_BYTES, AUDIT_WRITE_SECONDS
+from tracing import span, trace_summary
+
 AUDIT_LOG_FILENAME = "ai_operation_audit.jsonl"
 AUDIT_LOG_WARN_BYTES = 100 * 1024 * 1024  # 100 MB
+_AUDIT_SPAN = "append_audit_event"
 
 
 def _to_json_safe(value: Any) -> Any:
@@ -39,8 +43,26 @@ def append_audit_event(db_path: str | Path, event_type: str, details: Mapping[st
     ``AUDIT_LOG_WARN_BYTES`` (100 MB). The write still succeeds — the warning
     is a safety valve to surface runaway growth before it exhausts disk space.
     Full log rotation is deferred for a future iteration.
+
+    When called inside a tracing span, ``tracing.trace_summary()`` is stored
+    under the event's ``trace`` key: the IDs of the full trace plus the
+    active span's recent steps (earlier audit writes left out), so batched
+    imports do not re-log everything traced before each event.
     """
 
+    trace = trace_summary(skip=(_AUDIT_SPAN,))
+    with span(_AUDIT_SPAN, event_type=str(event_type)), AUDIT_WRITE_SECONDS.time():
+        audit_path = _write_audit_event(db_path, event_type, details, trace)
+    AUDIT_EVENTS.inc(event_type=str(event_type))
+    return audit_path
+
+
+def _write_audit_event(
+    db_path: str | Path,
+    event_type: str,
+    details: Mapping[str, Any],
+    trace: dict[str, Any] | None,
+) -> Path:
     audit_path = get_audit_log_path(db_path)
     audit_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -52,7 +74,7 @@ def append_audit_event(db_path: str | Path, event_type: str, details: Mapping[st
                 f"{file_size / (1024 * 1024):.1f} MB. "
                 "Consider archiving or rotating it to avoid disk exhaustion.",
                 UserWarning,
-                stacklevel=2,
+                stacklevel=3,
             )
 
     event = {
@@ -60,7 +82,10 @@ def append_audit_event(db_path: str | Path, event_type: str, details: Mapping[st
         "event_type": str(event_type),
         "details": _to_json_safe(dict(details)),
     }
+    if trace is not None:
+        event["trace"] = _to_json_safe(trace)
     with audit_path.open("a", encoding="utf-8") as handle:
         handle.write(json.dumps(event, sort_keys=True))
         handle.write("\n")
+        AUDIT_LOG_BYTES.set(handle.tell())
     return audit_path
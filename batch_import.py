@@ -0,0 +1,327 @@
+"""Import many files, or every sheet of a workbook, in one run.
+
+Parsing is the slow part of an import, so files are parsed in a pool of
+worker processes. The main process is the single writer: it consumes the
+parsed sheets in submission order while later files are still being parsed.
+Each file is applied in one transaction, covering all of its sheets, so a
+file either lands completely or not at all. Column mappings are resolved once
+per distinct header layout in the batch. Each layout first consults
+``mapping_memory`` and then the matcher/model in ``utils.map_columns``. A
+mapping is still reviewed against the live schema before every sheet is
+written.
+
+``python batch_import.py --action add a.xlsx b.csv`` runs a batch from the
+command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import multiprocessing
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from audit import append_audit_event
+from database import DATABASE_PATH, clear_movement_reason, set_movement_reason
+from excel_processing import (
+    DUPLICATE_POLICIES,
+    DUPLICATES_LAST_WINS,
+    apply_import_rows,
+    import_movement_reason,
+    infer_new_column_types,
+)
+from guardrails import (
+    GuardrailViolation,
+    enforce_destructive_action_policy,
+    enforce_schema_change_policy,
+    normalize_identifier,
+    review_column_mappings,
+)
+from mapping_memory import layout_signature, recall_mapping, remember_mapping
+from metrics import IMPORT_ROWS, IMPORT_SECONDS
+from prompt import get_gemini_response
+from stock_ledger import checkpoint_if_due
+from tracing import span
+from upload_formats import iter_upload_chunks, read_upload_sample, sniff_upload_format
+from utils import map_columns
+
+PROCESSES_ENV = "INVENTORY_IMPORT_PROCESSES"
+
+
+@dataclass(frozen=True)
+class ParsedSheet:
+    sheet: str | None
+    frame: Any
+
+
+@dataclass
+class SheetResult:
+    sheet: str | None
+    column_mappings: dict[str, str]
+    processed_rows: int = 0
+    coercion_failures: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FileImportResult:
+    filename: str
+    status: str = "pending"
+    processed_rows: int = 0
+    sheets: list[SheetResult] = field(default_factory=list)
+    error: str | None = None
+
+
+class _NamedUpload(io.BytesIO):
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def parse_upload(filename: str, data: bytes, all_sheets: bool = True) -> list[ParsedSheet]:
+    """Parse one file into frames; workbooks yield one frame per sheet.
+
+    Runs in the pool's worker processes, so it only takes and returns
+    picklable values.
+    """
+
+    upload = _NamedUpload(data, filename)
+    upload_format = sniff_upload_format(upload)
+    if upload_format.streamed:
+        import pandas as pd
+
+        chunks = list(iter_upload_chunks(upload, upload_format))
+        frame = pd.concat(chunks, ignore_index=True) if chunks else read_upload_sample(upload, upload_format, 0)
+        return [ParsedSheet(None, frame)]
+    import pandas as pd
+
+    sheets = pd.read_excel(upload, sheet_name=None if all_sheets else 0)
+    if not isinstance(sheets, dict):
+        return [ParsedSheet(None, sheets)]
+    return [ParsedSheet(str(name), frame) for name, frame in sheets.items() if len(frame.columns)]
+
+
+def _parse_task(task: tuple[str, bytes, bool]) -> list[ParsedSheet]:
+    return parse_upload(*task)
+
+
+def _default_processes() -> int:
+    return int(os.getenv(PROCESSES_ENV, 0)) or os.cpu_count() or 1
+
+
+def iter_parsed_files(
+    files: Sequence[tuple[str, bytes]],
+    *,
+    all_sheets: bool = True,
+    processes: int | None = None,
+) -> Iterator[tuple[str, list[ParsedSheet] | BaseException]]:
+    """Yield ``(filename, sheets or parse error)`` in submission order."""
+
+    tasks = [(filename, data, all_sheets) for filename, data in files]
+    processes = min(processes or _default_processes(), len(tasks))
+    if processes <= 1:
+        for task in tasks:
+            try:
+                yield task[0], _parse_task(task)
+            except Exception as exc:
+                yield task[0], exc
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        futures = [executor.submit(_parse_task, task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            try:
+                yield task[0], future.result()
+            except Exception as exc:
+                yield task[0], exc
+
+
+class _MappingResolver:
+    """Resolve each distinct header layout in a batch once."""
+
+    def __init__(self, db_path: str | Path, existing_columns: list[str]):
+        self.db_path = db_path
+        self.existing_columns = existing_columns
+        self._by_layout: dict[object, dict[str, str]] = {}
+        self.model_calls = 0
+
+    def resolve(self, headers: list[str]) -> dict[str, str]:
+        signature = layout_signature(headers, self.existing_columns)
+        key = signature or tuple(headers)
+        by_normalized = self._by_layout.get(key)
+        if by_normalized is None:
+            mapping = recall_mapping(self.db_path, headers, self.existing_columns)
+            if mapping is None:
+                self.model_calls += 1
+                with span("map_columns"):
+                    mapping = map_columns(headers, self.existing_columns, get_gemini_response)
+            if signature is None:
+                self._by_layout[key] = mapping
+                return mapping
+            by_normalized = self._by_layout[key] = {
+                normalize_identifier(header): target for header, target in mapping.items()
+            }
+        if signature is None:
+            return dict(by_normalized)
+        return {header: by_normalized[normalize_identifier(header)] for header in headers}
+
+
+def _product_columns(connection: sqlite3.Connection) -> list[str]:
+    return [info[1] for info in connection.execute("PRAGMA table_info(PRODUCT)")]
+
+
+def _apply_file(
+    connection: sqlite3.Connection,
+    result: FileImportResult,
+    sheets: list[tuple[ParsedSheet, dict[str, str]]],
+    action: str,
+    allow_schema_changes: bool,
+    duplicate_policy: str,
+) -> None:
+    # An explicit BEGIN makes the ALTER TABLEs part of the file's transaction too.
+    connection.execute("BEGIN")
+    set_movement_reason(connection, import_movement_reason(action))
+    for parsed, mapping in sheets:
+        headers = [str(column) for column in parsed.frame.columns]
+        existing_columns = _product_columns(connection)
+        review = review_column_mappings(mapping, existing_columns)
+        enforce_schema_change_policy(review, allow_schema_changes=allow_schema_changes)
+        column_mappings = review.sanitized_mapping
+        sheet_result = SheetResult(parsed.sheet, column_mappings)
+        result.sheets.append(sheet_result)
+        stats = {}
+        sheet_result.processed_rows = apply_import_rows(
+            connection,
+            action,
+            [parsed.frame],
+            column_mappings,
+            existing_columns=existing_columns,
+            proposed_new_columns=review.proposed_new_columns,
+            new_column_types=infer_new_column_types(parsed.frame, column_mappings, review.proposed_new_columns),
+            duplicate_policy=duplicate_policy,
+            stats=stats,
+        )
+        sheet_result.coercion_failures = stats.get("coercion_failures", {})
+        remember_mapping(connection, headers, existing_columns, column_mappings, source=result.filename)
+        result.processed_rows += sheet_result.processed_rows
+    clear_movement_reason(connection)
+
+
+def import_batch(
+    db_path: str | Path,
+    files: Iterable[tuple[str, bytes]],
+    action: str,
+    *,
+    all_sheets: bool = True,
+    allow_schema_changes: bool = False,
+    allow_destructive_actions: bool = False,
+    processes: int | None = None,
+    duplicate_policy: str = DUPLICATES_LAST_WINS,
+) -> list[FileImportResult]:
+    """Parse ``(filename, bytes)`` uploads in parallel and apply each in one transaction.
+
+    Sheets are written with ``excel_processing.apply_import_rows``, the same
+    write path as ``process_excel_file``, so repeated product names within a
+    sheet are consolidated per ``duplicate_policy`` there too. A file that
+    fails to parse, violates a guardrail or hits a bad row is rolled back and
+    reported; the remaining files are still applied.
+    """
+
+    files = list(files)
+    enforce_destructive_action_policy(action, allow_destructive_actions=allow_destructive_actions)
+    results: list[FileImportResult] = []
+    with span("import_batch", action=action, files=len(files)) as batch_span, sqlite3.connect(db_path) as connection:
+        resolver = _MappingResolver(db_path, _product_columns(connection))
+        for filename, parsed in iter_parsed_files(files, all_sheets=all_sheets, processes=processes):
+            result = FileImportResult(filename)
+            results.append(result)
+            with IMPORT_SECONDS.time(action=action) as import_labels:
+                try:
+                    if isinstance(parsed, BaseException):
+                        raise parsed
+                    # Resolve mappings before the write transaction starts: a
+                    # model call must not hold the database lock, and the
+                    # memory lookup uses its own connection.
+                    sheets = [
+                        (sheet, resolver.resolve([str(column) for column in sheet.frame.columns]))
+                        for sheet in parsed
+                    ]
+                    _apply_file(connection, result, sheets, action, allow_schema_changes, duplicate_policy)
+                    connection.commit()
+                    result.status = "success"
+                except Exception as exc:
+                    connection.rollback()
+                    result.status = "blocked" if isinstance(exc, GuardrailViolation) else "failed"
+                    result.error = str(exc)
+                    result.processed_rows = 0
+                    for sheet in result.sheets:
+                        sheet.processed_rows = 0
+                import_labels["status"] = result.status
+            IMPORT_ROWS.inc(result.processed_rows, action=action, status=result.status)
+            append_audit_event(
+                db_path,
+                "batch_import_file",
+                {
+                    "action": action,
+                    "uploaded_filename": filename,
+                    "duplicate_policy": duplicate_policy,
+                    "status": result.status,
+                    "processed_rows": result.processed_rows,
+                    "sheets": [
+                        {
+                            "sheet": sheet.sheet,
+                            "column_mappings": sheet.column_mappings,
+                            "processed_rows": sheet.processed_rows,
+                            "coercion_failures": sheet.coercion_failures,
+                        }
+                        for sheet in result.sheets
+                    ],
+                    **({"error": result.error} if result.error else {}),
+                },
+            )
+        batch_span.count("mapping_model_calls", resolver.model_calls)
+    checkpoint_if_due(db_path)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import several spreadsheet files in one batch.")
+    parser.add_argument("files", nargs="+", type=Path, help="Excel, CSV/TSV or Parquet files.")
+    parser.add_argument("--db-path", type=Path, default=DATABASE_PATH, help="Inventory database to update.")
+    parser.add_argument("--action", choices=("add", "remove", "modify"), default="add")
+    parser.add_argument("--first-sheet-only", action="store_true", help="Skip all but the first sheet.")
+    parser.add_argument("--allow-schema-changes", action="store_true")
+    parser.add_argument("--allow-destructive-actions", action="store_true")
+    parser.add_argument(
+        "--duplicates",
+        choices=DUPLICATE_POLICIES,
+        default=DUPLICATES_LAST_WINS,
+        help="How to treat repeated product names: keep the last row, sum STOCK, or reject the file.",
+    )
+    parser.add_argument("--processes", type=int, default=None, help="Parser processes (default: CPU count).")
+    args = parser.parse_args(argv)
+
+    import config  # noqa: F401 - loads .env so unseen layouts can reach Gemini
+
+    results = import_batch(
+        args.db_path,
+        [(path.name, path.read_bytes()) for path in args.files],
+        args.action,
+        all_sheets=not args.first_sheet_only,
+        allow_schema_changes=args.allow_schema_changes,
+        allow_destructive_actions=args.allow_destructive_actions,
+        processes=args.processes,
+        duplicate_policy=args.duplicates,
+    )
+    for result in results:
+        print(f"{result.filename}: {result.status}, {result.processed_rows} rows" + (f" ({result.error})" if result.error else ""))
+    return 0 if all(result.status == "success" for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+"""Offline performance benchmarks for the inventory app's hot paths.
+
+Run ``python -m benchmarks --help`` from the repository root. Results are
+written as JSON so runs from different commits can be compared with
+``--compare``.
+"""
@@ -0,0 +1,218 @@
+"""Benchmark cases for the inventory app's hot paths.
+
+Each case prepares untimed state in ``setup`` (called before every repeat so
+mutating cases start from the same database) and exposes the timed callable
+it returns. Databases are synthetic: they are seeded once per size with
+``database.seed_database`` and copied for cases that modify them.
+"""
+
+from __future__ import annotations
+
+import shutil
+import sqlite3
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+import database
+from audit import append_audit_event
+from excel_processing import process_excel_file
+from guardrails import review_column_mappings, validate_read_only_sql
+from prompt import get_gemini_response
+from utils import map_columns, read_sql_query
+
+_IMPORT_COLUMNS = {"Name": "NAME", "Category": "CATEGORY", "Price": "PRICE", "Stock": "STOCK"}
+_SQL_MAX_CHARS = 99_000  # just under guardrails._SQL_MAX_LENGTH
+# (largest suite size, header count): a spreadsheet wide enough for that many rows.
+_MAP_COLUMN_COUNTS = ((1_000, 10), (100_000, 100), (1_000_000, 1_000))
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    name: str
+    description: str
+    setup: Callable[[int, Path], Callable[[], Any]]
+    sizes: Callable[[tuple[int, ...]], tuple[int, ...]] = lambda suite_sizes: suite_sizes
+
+
+def _fresh_dir(workdir: Path, label: str) -> Path:
+    target = workdir / label
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+    return target
+
+
+@lru_cache(maxsize=None)
+def _template_database(size: int, workdir: Path) -> Path:
+    """Seed a PRODUCT table with ``size`` rows whose NAMEs are unique."""
+
+    db_path = workdir / "templates" / f"inventory-{size}.db"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    db_path.unlink(missing_ok=True)
+    database.ensure_schema(db_path)
+    database.seed_database(db_path, num_products=size, seed=size)
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(f"UPDATE {database.PRODUCT_TABLE} SET NAME = NAME || ' #' || ID")
+    return db_path
+
+
+def _copy_database(size: int, workdir: Path, label: str) -> Path:
+    target = _fresh_dir(workdir, label) / "inventory.db"
+    shutil.copyfile(_template_database(size, workdir), target)
+    return target
+
+
+def _import_frame(db_path: Path, size: int, action: str) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as connection:
+        names = [
+            row[0]
+            for row in connection.execute(
+                f"SELECT NAME FROM {database.PRODUCT_TABLE} ORDER BY ID LIMIT ?", (size,)
+            )
+        ]
+    if action == "add":
+        # Half of the rows update existing products, half insert new ones.
+        names = [name if index % 2 else f"New product {index}" for index, name in enumerate(names)]
+    frame = pd.DataFrame({"Name": names})
+    if action != "remove":
+        positions = pd.RangeIndex(len(frame))
+        frame["Category"] = "Benchmark"
+        frame["Price"] = (positions % 997) + 0.5
+        frame["Stock"] = positions % 500
+    return frame
+
+
+def _process_excel_setup(action: str) -> Callable[[int, Path], Callable[[], Any]]:
+    def setup(size: int, workdir: Path) -> Callable[[], Any]:
+        db_path = _copy_database(size, workdir, f"process-{action}")
+        frame = _import_frame(db_path, size, action)
+        mapping = {column: _IMPORT_COLUMNS[column] for column in frame.columns}
+        existing_columns = list(database.PRODUCT_REQUIRED_COLUMNS)
+        review = review_column_mappings(mapping, existing_columns)
+        preview = {
+            "dataframe": frame,
+            "existing_columns": existing_columns,
+            "column_mappings": review.sanitized_mapping,
+            "proposed_new_columns": list(review.proposed_new_columns),
+            "review": review,
+        }
+        return lambda: process_excel_file(
+            None,
+            str(db_path),
+            action,
+            allow_destructive_actions=True,
+            preview=preview,
+        )
+
+    return setup
+
+
+def _seed_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    db_path = _fresh_dir(workdir, "seed") / "inventory.db"
+    database.ensure_schema(db_path)
+    return lambda: database.seed_database(db_path, num_products=size, seed=size)
+
+
+def _full_table_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    db_path = str(_template_database(size, workdir))
+    return lambda: read_sql_query(f"SELECT * FROM {database.PRODUCT_TABLE}", db_path)
+
+
+def _dashboard_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    db_path = str(_template_database(size, workdir))
+    queries = (
+        f"SELECT COUNT(*) as product_count, "
+        f"COALESCE(SUM(price * {database.INVENTORY_VALUE_COLUMN}), 0) as total_inventory_value "
+        f"FROM {database.PRODUCT_TABLE}",
+        f"SELECT CATEGORY, COUNT(*) AS product_count, SUM(PRICE * STOCK) AS value "
+        f"FROM {database.PRODUCT_TABLE} GROUP BY CATEGORY",
+        f"SELECT COUNT(*) AS low_stock FROM {database.PRODUCT_TABLE} WHERE STOCK <= 10",
+    )
+    return lambda: [read_sql_query(query, db_path) for query in queries]
+
+
+def _large_select(length: int) -> str:
+    prefix = "SELECT ID, NAME, PRICE FROM PRODUCT WHERE NAME IN ("
+    terms: list[str] = []
+    current = len(prefix) + 1
+    index = 0
+    while True:
+        term = f"'Product {index}'"
+        if current + len(term) + 2 > length:
+            break
+        terms.append(term)
+        current += len(term) + 2
+        index += 1
+    return prefix + ", ".join(terms or ["'x'"]) + ")"
+
+
+def _validate_sql_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    sql = _large_select(size)
+    return lambda: validate_read_only_sql(sql, allowed_tables=(database.PRODUCT_TABLE,))
+
+
+def _map_columns_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    known = ["Product Name", "Qty", "Colour", "Unit Price", "Brand", "Type", "Details"]
+    excel_columns = [
+        known[index] if index < len(known) else f"Attribute {index}" for index in range(size)
+    ]
+    existing_columns = list(database.PRODUCT_REQUIRED_COLUMNS)
+    return lambda: map_columns(excel_columns, existing_columns, get_gemini_response)
+
+
+def _audit_setup(size: int, workdir: Path) -> Callable[[], Any]:
+    db_path = _fresh_dir(workdir, "audit") / "inventory.db"
+    details = {"status": "executed", "row_count": 10, "generated_sql": "SELECT * FROM PRODUCT"}
+
+    def run() -> None:
+        for _ in range(size):
+            append_audit_event(db_path, "benchmark_event", details)
+
+    return run
+
+
+def _capped(limit: int) -> Callable[[tuple[int, ...]], tuple[int, ...]]:
+    return lambda suite_sizes: tuple(sorted({min(size, limit) for size in suite_sizes}))
+
+
+def _map_column_count(suite_size: int) -> int:
+    for limit, count in _MAP_COLUMN_COUNTS:
+        if suite_size <= limit:
+            return count
+    return _MAP_COLUMN_COUNTS[-1][1]
+
+
+def _map_column_sizes(suite_sizes: tuple[int, ...]) -> tuple[int, ...]:
+    return tuple(sorted({_map_column_count(size) for size in suite_sizes}))
+
+
+CASES: tuple[BenchmarkCase, ...] = (
+    BenchmarkCase("seed_database", "Generate and insert N demo rows.", _seed_setup),
+    BenchmarkCase("read_sql_query_full_table", "SELECT * over N rows into a DataFrame.", _full_table_setup),
+    BenchmarkCase("dashboard_aggregates", "Dashboard totals, per-category and low-stock aggregates.", _dashboard_setup),
+    BenchmarkCase("process_excel_file_add", "Upsert N rows (half new, half existing).", _process_excel_setup("add")),
+    BenchmarkCase("process_excel_file_modify", "Update N existing rows by NAME.", _process_excel_setup("modify")),
+    BenchmarkCase("process_excel_file_remove", "Delete N existing rows by NAME.", _process_excel_setup("remove")),
+    BenchmarkCase(
+        "validate_read_only_sql",
+        "Validate a SELECT of N characters (capped at the guardrail limit).",
+        _validate_sql_setup,
+        _capped(_SQL_MAX_CHARS),
+    ),
+    BenchmarkCase("map_columns", "Map N spreadsheet headers through the fake model.", _map_columns_setup, _map_column_sizes),
+    BenchmarkCase("append_audit_event", "Append N audit events to the JSONL log.", _audit_setup, _capped(100_000)),
+)
+
+
+def select_cases(names: Iterable[str] | None) -> tuple[BenchmarkCase, ...]:
+    if not names:
+        return CASES
+    wanted = set(names)
+    unknown = wanted - {case.name for case in CASES}
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(sorted(unknown))}")
+    return tuple(case for case in CASES if case.name in wanted)
@@ -0,0 +1,386 @@
+"""Concurrent-session load test for the Streamlit app's code paths.
+
+Example::
+
+    python -m benchmarks.load --sessions 16 --duration 60 --rows 100000
+    python -m benchmarks.load --sessions 4 --iterations 20 --mix sql_query=1,upload=1
+
+Streamlit serves every browser session from a thread of one server process
+and reruns ``app.py`` on each click. This harness does the same without a
+browser. Each simulated session is a thread that picks a weighted random
+action and runs it, then pauses for an exponentially distributed think time
+and repeats. Every action first does the rerun work (schema check plus the
+dashboard aggregate) and then what the button handler calls:
+
+* ``dashboard``: the rerun alone.
+* ``sql_query``: streamed SQL generation, validation, the query and its audit event.
+* ``upload``: a CSV restocking existing products, previewed through the shared
+  preview cache and then applied with ``modify`` in batches, as the import
+  worker does.
+* ``analytics``: the full-table read, the stock-out forecast and the streamed
+  model summary.
+
+All sessions share one seeded database, with unique product names, and the
+``fake_gemini`` backend. Model latency and the Gemini rate limiter keep their
+defaults, so model time and throttling count towards the latencies. The JSON
+report has latency percentiles per action and counts of errors. SQLite
+"database is locked" errors are counted separately as lock errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.run import _git_commit, _use_fake_backend
+
+SUITE_NAME = "inventory-load"
+DEFAULT_SESSIONS = 8
+DEFAULT_DURATION_SECONDS = 30.0
+DEFAULT_ROWS = 100_000
+DEFAULT_THINK_SECONDS = 0.5
+DEFAULT_MIX = {"dashboard": 4, "sql_query": 3, "analytics": 2, "upload": 1}
+UPLOAD_ROWS = 50
+PERCENTILES = (50, 90, 95, 99)
+LOCK_ERROR_MARKERS = ("database is locked", "database table is locked", "database is busy")
+
+QUESTIONS = (
+    "How many products are there?",
+    "What is the total inventory value?",
+    "Which products are out of stock?",
+    "Show the 10 most expensive products",
+    "List products with stock below 10",
+    "What is the average price per category?",
+)
+DB_DESCRIPTION = (
+    "Product table schema: PRODUCT "
+    "(ID INTEGER PRIMARY KEY AUTOINCREMENT, NAME TEXT, STOCK INTEGER, PRICE REAL, CATEGORY TEXT)"
+)
+
+
+@dataclass
+class _Results:
+    """Latencies and errors per action, shared by every session thread."""
+
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: Counter = field(default_factory=Counter)
+    lock_errors: Counter = field(default_factory=Counter)
+    error_types: Counter = field(default_factory=Counter)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, action: str, seconds: float, error: BaseException | None) -> None:
+        with self.lock:
+            self.latencies.setdefault(action, []).append(seconds)
+            if error is None:
+                return
+            self.errors[action] += 1
+            if is_lock_error(error):
+                self.lock_errors[action] += 1
+            self.error_types[type(error).__name__] += 1
+
+
+def is_lock_error(error: BaseException) -> bool:
+    """True for SQLite errors raised when a lock could not be taken in time."""
+
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        marker in message for marker in LOCK_ERROR_MARKERS
+    )
+
+
+def _percentile_summary(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        values = {f"p{p}": cuts[p - 1] for p in PERCENTILES}
+    else:
+        values = {f"p{p}": ordered[0] for p in PERCENTILES}
+    return {**values, "max": ordered[-1], "mean": statistics.fmean(ordered)}
+
+
+def _actions(db_path: str, names: list[str]) -> dict[str, Callable[[random.Random], Any]]:
+    """Build the session actions; app modules are imported only once the backend is set."""
+
+    from analytics import stream_stock_needs
+    from audit import append_audit_event
+    from database import INVENTORY_VALUE_COLUMN, PRODUCT_TABLE, validate_product_schema
+    from excel_processing import preview_excel_import, process_excel_file
+    from forecasting import forecast_stock_needs
+    from guardrails import validate_read_only_sql
+    from jobs import DEFAULT_IMPORT_BATCH_SIZE
+    from preview_cache import get_preview_cache
+    from prompt import finalize_sql_query, stream_sql_query
+    from utils import read_sql_query
+
+    dashboard_query = (
+        f"SELECT COUNT(*) as product_count, "
+        f"COALESCE(SUM(price * {INVENTORY_VALUE_COLUMN}), 0) as total_inventory_value "
+        f"FROM {PRODUCT_TABLE}"
+    )
+
+    def rerun() -> None:
+        validate_product_schema(db_path)
+        read_sql_query(dashboard_query, db_path)
+
+    def dashboard(rng: random.Random) -> None:
+        rerun()
+
+    def sql_query(rng: random.Random) -> None:
+        rerun()
+        question = rng.choice(QUESTIONS)
+        streamed_sql = "".join(stream_sql_query(DB_DESCRIPTION, question))
+        sql = finalize_sql_query(streamed_sql, question)
+        validated_sql = validate_read_only_sql(sql, allowed_tables=(PRODUCT_TABLE,))
+        result = read_sql_query(validated_sql, db_path)
+        append_audit_event(
+            db_path,
+            "sql_query_review",
+            {"question": question, "validated_sql": validated_sql, "row_count": len(result)},
+        )
+
+    def upload(rng: random.Random) -> None:
+        rerun()
+        rows = "".join(
+            f'"{name}",{rng.randrange(1_000)}\n' for name in rng.sample(names, min(UPLOAD_ROWS, len(names)))
+        )
+        upload_file = io.BytesIO(f"Name,Stock\n{rows}".encode())
+        upload_file.name = "restock.csv"
+        preview = preview_excel_import(upload_file, db_path, cache=get_preview_cache(db_path))
+        upload_file.seek(0)
+        process_excel_file(
+            upload_file,
+            db_path,
+            "modify",
+            allow_destructive_actions=True,
+            preview=preview,
+            batch_size=DEFAULT_IMPORT_BATCH_SIZE,
+        )
+
+    def analytics(rng: random.Random) -> None:
+        rerun()
+        df_full = read_sql_query(f"SELECT * FROM {PRODUCT_TABLE}", db_path)
+        forecast = forecast_stock_needs(df_full, db_path)
+        "".join(stream_stock_needs(df_full, db_path=db_path, forecast=forecast))
+
+    return {"dashboard": dashboard, "sql_query": sql_query, "upload": upload, "analytics": analytics}
+
+
+def _session(
+    index: int,
+    actions: dict[str, Callable[[random.Random], Any]],
+    mix: dict[str, float],
+    results: _Results,
+    *,
+    seed: int,
+    duration_seconds: float | None,
+    iterations: int | None,
+    think_seconds: float,
+    start: threading.Barrier,
+) -> None:
+    rng = random.Random(seed * 1_000_003 + index)
+    names, weights = list(mix), list(mix.values())
+    start.wait()
+    deadline = None if duration_seconds is None else time.monotonic() + duration_seconds
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.monotonic() < deadline):
+        action = rng.choices(names, weights)[0]
+        error = None
+        started = time.perf_counter()
+        try:
+            actions[action](rng)
+        except Exception as exc:
+            error = exc
+        results.record(action, time.perf_counter() - started, error)
+        done += 1
+        if think_seconds > 0:
+            time.sleep(rng.expovariate(1 / think_seconds))
+
+
+def run_load(
+    *,
+    sessions: int = DEFAULT_SESSIONS,
+    duration_seconds: float | None = DEFAULT_DURATION_SECONDS,
+    iterations: int | None = None,
+    rows: int = DEFAULT_ROWS,
+    mix: dict[str, float] | None = None,
+    think_seconds: float = DEFAULT_THINK_SECONDS,
+    seed: int = 0,
+    workdir: Path | None = None,
+    log=print,
+) -> dict[str, Any]:
+    """Run ``sessions`` concurrent sessions and return the JSON-serializable report.
+
+    Sessions stop after ``iterations`` actions each, or once
+    ``duration_seconds`` have passed, whichever comes first (at least one of
+    the two must be set). Actions already running when time is up finish and
+    are counted.
+    """
+
+    if duration_seconds is None and iterations is None:
+        raise ValueError("Set duration_seconds, iterations or both.")
+    mix = dict(DEFAULT_MIX if mix is None else mix)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown or not any(weight > 0 for weight in mix.values()):
+        raise ValueError(f"The mix needs positive weights for actions among {sorted(DEFAULT_MIX)}.")
+
+    _use_fake_backend(latency_ms=None, requests_per_second=None)
+
+    from benchmarks.cases import _template_database
+    from database import PRODUCT_TABLE
+
+    results = _Results()
+    with tempfile.TemporaryDirectory(prefix="inventory-load-") as tmp:
+        db_path = _template_database(rows, Path(workdir or tmp).resolve())
+        with sqlite3.connect(db_path) as connection:
+            names = [row[0] for row in connection.execute(f"SELECT NAME FROM {PRODUCT_TABLE}")]
+        actions = _actions(str(db_path), names)
+        log(f"Seeded {rows:,} products; starting {sessions} sessions")
+
+        start = threading.Barrier(sessions + 1)
+        threads = []
+        for index in range(sessions):
+            thread = threading.Thread(
+                target=_session,
+                args=(index, actions, mix, results),
+                kwargs={
+                    "seed": seed,
+                    "duration_seconds": duration_seconds,
+                    "iterations": iterations,
+                    "think_seconds": think_seconds,
+                    "start": start,
+                },
+                name=f"load-session-{index}",
+                daemon=True,
+            )
+            threads.append(thread)
+            thread.start()
+        start.wait()
+        started = time.monotonic()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+    per_action = {}
+    for action in mix:
+        samples = results.latencies.get(action, [])
+        per_action[action] = {
+            "count": len(samples),
+            "errors": results.errors[action],
+            "lock_errors": results.lock_errors[action],
+            "seconds": _percentile_summary(samples) if samples else None,
+        }
+        if samples:
+            summary = per_action[action]["seconds"]
+            log(
+                f"{action:<10} {len(samples):>6}  p50 {summary['p50'] * 1000:>9.1f} ms"
+                f"  p95 {summary['p95'] * 1000:>9.1f} ms  errors {results.errors[action]}"
+            )
+    total = sum(item["count"] for item in per_action.values())
+    return {
+        "suite": SUITE_NAME,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sessions": sessions,
+        "duration_seconds": duration_seconds,
+        "iterations": iterations,
+        "rows": rows,
+        "mix": mix,
+        "think_seconds": think_seconds,
+        "seed": seed,
+        "elapsed_seconds": elapsed,
+        "actions": per_action,
+        "totals": {
+            "count": total,
+            "errors": sum(results.errors.values()),
+            "lock_errors": sum(results.lock_errors.values()),
+            "throughput_per_second": total / elapsed if elapsed > 0 else None,
+        },
+        "error_types": dict(results.error_types),
+    }
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        try:
+            mix[name.strip()] = float(weight) if weight else 1.0
+        except ValueError as exc:
+            raise argparse.ArgumentTypeError("mix entries look like action=weight") from exc
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown actions: {', '.join(sorted(unknown))}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs at least one positive weight")
+    return mix
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the app's code paths with concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="Concurrent sessions (default: 8).")
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to run (default: 30 unless --iterations is given).",
+    )
+    parser.add_argument("--iterations", type=int, help="Stop each session after this many actions.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Products to seed (default: 100000).")
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default=DEFAULT_MIX,
+        help="Action weights (default: dashboard=4,sql_query=3,analytics=2,upload=1).",
+    )
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=DEFAULT_THINK_SECONDS,
+        help="Mean pause between a session's actions in seconds (default: 0.5).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the sessions' action choices.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    duration = args.duration
+    if duration is None and args.iterations is None:
+        duration = DEFAULT_DURATION_SECONDS
+    report = run_load(
+        sessions=max(1, args.sessions),
+        duration_seconds=duration,
+        iterations=args.iterations,
+        rows=max(1, args.rows),
+        mix=args.mix,
+        think_seconds=max(0.0, args.think),
+        seed=args.seed,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
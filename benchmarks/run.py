@@ -0,0 +1,250 @@
+"""Command-line runner for the offline benchmark suite.
+
+Example::
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --quick --compare bench.json
+
+Gemini calls go to the ``fake_gemini`` backend (selected before any app module
+is imported), so no API key or network access is needed. Its latency defaults
+to zero here so model time does not drown out the code paths being measured;
+set ``FAKE_GEMINI_LATENCY_MS`` to include realistic model timing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000,)
+DEFAULT_REPEAT = 3
+DEFAULT_BUDGET_SECONDS = 120.0
+SUITE_NAME = "inventory-hot-paths"
+
+
+def _git_commit() -> str | None:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parents[1],
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def _time_case(case, size: int, workdir: Path, repeat: int) -> dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        run = case.setup(size, workdir)
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        "case": case.name,
+        "size": size,
+        "repeat": repeat,
+        "seconds": {
+            "min": best,
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+        },
+        "throughput_per_second": size / best if best > 0 else None,
+    }
+
+
+def _use_fake_backend(*, latency_ms: str | None = "0", requests_per_second: str | None = "1000000") -> None:
+    """Point every Gemini call at ``fake_gemini`` before app modules load.
+
+    ``latency_ms`` and ``requests_per_second`` are defaults for
+    ``FAKE_GEMINI_LATENCY_MS`` and ``GEMINI_REQUESTS_PER_SECOND``; by default
+    the model is instant and unthrottled. ``None`` keeps the module defaults.
+    """
+
+    os.environ["INVENTORY_GEMINI_BACKEND"] = "fake"
+    if latency_ms is not None:
+        os.environ.setdefault("FAKE_GEMINI_LATENCY_MS", latency_ms)
+    if requests_per_second is not None:
+        os.environ.setdefault("GEMINI_REQUESTS_PER_SECOND", requests_per_second)
+
+    import fake_gemini
+    import gemini_client
+
+    fake_gemini.reset()
+    gemini_client.reset_gateway()
+
+
+def predict_seconds(measured: list[tuple[int, float]], size: int) -> float:
+    """Extrapolate a case's time at ``size`` from its ``(size, seconds)`` runs.
+
+    The growth exponent is taken from the last two runs, and never assumed to
+    be better than linear, so a quadratic case is predicted as quadratic
+    rather than under-reported by a straight line.
+    """
+
+    last_size, last_seconds = measured[-1]
+    exponent = 1.0
+    if len(measured) > 1:
+        prior_size, prior_seconds = measured[-2]
+        if prior_seconds > 0 and last_seconds > 0 and last_size > prior_size:
+            exponent = max(exponent, math.log(last_seconds / prior_seconds) / math.log(last_size / prior_size))
+    return last_seconds * (size / last_size) ** exponent
+
+
+def run_suite(
+    *,
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    repeat: int = DEFAULT_REPEAT,
+    case_names: list[str] | None = None,
+    budget_seconds: float = DEFAULT_BUDGET_SECONDS,
+    workdir: Path | None = None,
+    log=print,
+) -> dict[str, Any]:
+    """Run the selected cases and return the JSON-serializable report.
+
+    Sizes run smallest first. When ``predict_seconds`` expects the next size
+    to exceed ``budget_seconds``, the case's remaining sizes are recorded as
+    skipped rather than left to run for hours.
+    """
+
+    _use_fake_backend()
+
+    from benchmarks.cases import select_cases
+
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="inventory-bench-") as tmp:
+        base = Path(workdir or tmp).resolve()
+        for case in select_cases(case_names):
+            measured: list[tuple[int, float]] = []
+            for size in sorted(case.sizes(tuple(sizes))):
+                if measured and predict_seconds(measured, size) > budget_seconds:
+                    results.append({"case": case.name, "size": size, "skipped": "over budget"})
+                    log(f"{case.name:<28} {size:>10,}  skipped (over budget)")
+                    continue
+                result = _time_case(case, size, base, repeat)
+                results.append(result)
+                best = result["seconds"]["min"]
+                log(f"{case.name:<28} {size:>10,}  {best * 1000:>12.2f} ms")
+                measured.append((size, best))
+
+    return {
+        "suite": SUITE_NAME,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": list(sizes),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_reports(current: dict[str, Any], baseline: dict[str, Any]) -> list[dict[str, Any]]:
+    """Pair up results by (case, size) and compute current/baseline time ratios."""
+
+    baseline_times = {
+        (item["case"], item["size"]): item["seconds"]["min"]
+        for item in baseline.get("results", [])
+        if "seconds" in item
+    }
+    rows = []
+    for item in current.get("results", []):
+        key = (item["case"], item["size"])
+        if "seconds" not in item or key not in baseline_times:
+            continue
+        previous = baseline_times[key]
+        rows.append(
+            {
+                "case": item["case"],
+                "size": item["size"],
+                "baseline_seconds": previous,
+                "current_seconds": item["seconds"]["min"],
+                "ratio": item["seconds"]["min"] / previous if previous > 0 else None,
+            }
+        )
+    return rows
+
+
+def _parse_sizes(value: str) -> tuple[int, ...]:
+    try:
+        sizes = tuple(int(part.replace("_", "")) for part in value.split(",") if part.strip())
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError("sizes must be comma-separated integers") from exc
+    if not sizes or any(size <= 0 for size in sizes):
+        raise argparse.ArgumentTypeError("sizes must be positive")
+    return sizes
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline hot-path benchmark suite.")
+    parser.add_argument(
+        "--sizes",
+        type=_parse_sizes,
+        default=DEFAULT_SIZES,
+        help="Comma-separated row counts (default: 1000,100000,1000000).",
+    )
+    parser.add_argument("--quick", action="store_true", help="Only run the 1 000-row size.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per size (default: 3).")
+    parser.add_argument("--case", action="append", dest="cases", metavar="NAME", help="Run only this case (repeatable).")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET_SECONDS,
+        help="Skip a case's larger sizes once they are predicted to exceed this many seconds.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON report to compare against.")
+    parser.add_argument("--list", action="store_true", help="List the available cases and exit.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        _use_fake_backend()
+        from benchmarks.cases import CASES
+
+        for case in CASES:
+            print(f"{case.name:<28} {case.description}")
+        return 0
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    report = run_suite(
+        sizes=sizes,
+        repeat=max(1, args.repeat),
+        case_names=args.cases,
+        budget_seconds=args.budget,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        report["comparison"] = {
+            "baseline_commit": baseline.get("git_commit"),
+            "results": compare_reports(report, baseline),
+        }
+        for row in report["comparison"]["results"]:
+            print(
+                f"{row['case']:<28} {row['size']:>10,}  x{row['ratio']:.2f} vs baseline",
+                file=sys.stderr,
+            )
+
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    return 0
@@ -0,0 +1,307 @@
+"""Bulk categorization of PRODUCT rows that have no CATEGORY.
+
+Uncategorized rows are selected in ID-ordered chunks, packed many-per-request
+into a structured JSON prompt, and sent to the model concurrently behind a
+shared rate limiter. Answers are written back with ``executemany`` and a
+per-job checkpoint is committed in the same transaction, so an interrupted run
+resumes from the last completed chunk instead of starting over.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Protocol
+
+from audit import append_audit_event
+from database import PRODUCT_TABLE
+from gemini_client import TokenBucket
+from prompt import build_bulk_categorization_prompt, get_bulk_categorization_prompt_metadata
+
+PROGRESS_TABLE = "_categorization_progress"
+DEFAULT_JOB_NAME = "default"
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+_CATEGORY_MAX_LENGTH = 50  # matches CATEGORY VARCHAR(50)
+_DESCRIPTION_MAX_LENGTH = 300
+_JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+_UNCATEGORIZED_CONDITION = "(CATEGORY IS NULL OR TRIM(CATEGORY) = '')"
+
+
+class _GeneratingClient(Protocol):
+    def generate(self, prompt: str, *, generation_config: dict[str, Any] | None = None) -> str:
+        ...
+
+
+@dataclass(frozen=True)
+class BulkCategorizationResult:
+    job_name: str
+    chunks_processed: int
+    rows_selected: int
+    rows_categorized: int
+    failed_batches: int
+    last_id: int
+    completed: bool
+
+
+def _ensure_progress_table(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+        "job_name TEXT PRIMARY KEY, last_id INTEGER NOT NULL, updated_at TEXT NOT NULL)"
+    )
+
+
+def get_checkpoint(db_path: str | Path, job_name: str = DEFAULT_JOB_NAME) -> int:
+    """Return the highest PRODUCT.ID already handled by ``job_name`` (0 if none)."""
+
+    with sqlite3.connect(str(db_path)) as connection:
+        _ensure_progress_table(connection)
+        row = connection.execute(
+            f"SELECT last_id FROM {PROGRESS_TABLE} WHERE job_name = ?", (job_name,)
+        ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def reset_checkpoint(db_path: str | Path, job_name: str = DEFAULT_JOB_NAME) -> None:
+    with sqlite3.connect(str(db_path)) as connection:
+        _ensure_progress_table(connection)
+        connection.execute(f"DELETE FROM {PROGRESS_TABLE} WHERE job_name = ?", (job_name,))
+
+
+def _known_categories(connection: sqlite3.Connection, limit: int = 50) -> list[str]:
+    rows = connection.execute(
+        f"SELECT CATEGORY, COUNT(*) AS n FROM {PRODUCT_TABLE} "
+        f"WHERE NOT {_UNCATEGORIZED_CONDITION} GROUP BY CATEGORY ORDER BY n DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [str(row[0]) for row in rows]
+
+
+def _select_chunk(connection: sqlite3.Connection, after_id: int, chunk_size: int) -> list[dict[str, Any]]:
+    rows = connection.execute(
+        f"SELECT ID, NAME, SPECIFICATIONS FROM {PRODUCT_TABLE} "
+        f"WHERE ID > ? AND {_UNCATEGORIZED_CONDITION} ORDER BY ID LIMIT ?",
+        (after_id, chunk_size),
+    ).fetchall()
+    return [
+        {
+            "id": int(row[0]),
+            "name": str(row[1] or ""),
+            "description": str(row[2] or "")[:_DESCRIPTION_MAX_LENGTH],
+        }
+        for row in rows
+    ]
+
+
+def parse_categorization_response(response: str, expected_ids: set[int]) -> dict[int, str]:
+    """Parse the model's JSON array into ``{id: category}``.
+
+    Entries for unknown IDs, empty categories, and malformed items are dropped
+    rather than trusted, so a partially wrong answer still yields the valid part.
+    """
+
+    text = response.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("items", data.get("results", []))
+    if not isinstance(data, list):
+        raise ValueError("Categorization response must be a JSON array.")
+
+    result: dict[int, str] = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        try:
+            product_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        category = str(item.get("category") or "").strip()[:_CATEGORY_MAX_LENGTH]
+        if product_id in expected_ids and category:
+            result[product_id] = category
+    return result
+
+
+def _default_client() -> _GeneratingClient:
+    from analytics import GeminiAnalyticsClient
+
+    return GeminiAnalyticsClient()
+
+
+def categorize_uncategorized_products(
+    db_path: str | Path,
+    *,
+    client: _GeneratingClient | None = None,
+    job_name: str = DEFAULT_JOB_NAME,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    max_chunks: int | None = None,
+    restart: bool = False,
+    rate_limiter: TokenBucket | None = None,
+    progress_callback: Callable[[int, int | None], None] | None = None,
+) -> BulkCategorizationResult:
+    """Categorize every PRODUCT row whose CATEGORY is empty.
+
+    Rows are read in chunks of ``chunk_size`` after the job's checkpoint; each
+    chunk is split into requests of ``batch_size`` items that run on up to
+    ``max_workers`` threads, throttled to ``requests_per_second``. After a chunk
+    finishes, its categories and the new checkpoint are committed together.
+
+    A request that raises stops the run after the current chunk without moving
+    the checkpoint, so the next call retries it; rows that were categorized
+    are no longer selected. Items the model simply skips are left empty and
+    are passed over once their chunk completes. Pass ``restart=True`` to clear
+    the checkpoint and revisit every uncategorized row.
+
+    ``progress_callback(rows_selected, total_rows)`` is called after each chunk,
+    where ``total_rows`` counts the uncategorized rows past the checkpoint when
+    the run started.
+    """
+
+    if chunk_size <= 0 or batch_size <= 0 or max_workers <= 0:
+        raise ValueError("chunk_size, batch_size and max_workers must be positive")
+
+    client = client or _default_client()
+    limiter = rate_limiter or TokenBucket(requests_per_second)
+    if restart:
+        reset_checkpoint(db_path, job_name)
+
+    last_id = get_checkpoint(db_path, job_name)
+    total_rows = None
+    if progress_callback is not None:
+        with sqlite3.connect(str(db_path)) as connection:
+            total_rows = connection.execute(
+                f"SELECT COUNT(*) FROM {PRODUCT_TABLE} WHERE ID > ? AND {_UNCATEGORIZED_CONDITION}",
+                (last_id,),
+            ).fetchone()[0]
+    chunks_processed = rows_selected = rows_categorized = failed_batches = 0
+    completed = False
+
+    def run_batch(items: list[dict[str, Any]], known_categories: list[str]) -> dict[int, str]:
+        limiter.acquire()
+        prompt = build_bulk_categorization_prompt(items, known_categories)
+        response = client.generate(prompt, generation_config=_JSON_GENERATION_CONFIG)
+        return parse_categorization_response(response, {item["id"] for item in items})
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while max_chunks is None or chunks_processed < max_chunks:
+            with sqlite3.connect(str(db_path)) as connection:
+                chunk = _select_chunk(connection, last_id, chunk_size)
+                known_categories = _known_categories(connection)
+            if not chunk:
+                completed = True
+                break
+
+            batches = [chunk[start:start + batch_size] for start in range(0, len(chunk), batch_size)]
+            futures = [executor.submit(run_batch, batch, known_categories) for batch in batches]
+            categories: dict[int, str] = {}
+            chunk_failed = False
+            for future in futures:
+                try:
+                    categories.update(future.result())
+                except Exception:
+                    failed_batches += 1
+                    chunk_failed = True
+
+            chunk_last_id = chunk[-1]["id"]
+            with sqlite3.connect(str(db_path)) as connection:
+                _ensure_progress_table(connection)
+                connection.executemany(
+                    f"UPDATE {PRODUCT_TABLE} SET CATEGORY = ? WHERE ID = ? AND {_UNCATEGORIZED_CONDITION}",
+                    [(category, product_id) for product_id, category in categories.items()],
+                )
+                if not chunk_failed:
+                    connection.execute(
+                        f"INSERT INTO {PROGRESS_TABLE} (job_name, last_id, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(job_name) DO UPDATE SET last_id = excluded.last_id, "
+                        "updated_at = excluded.updated_at",
+                        (job_name, chunk_last_id, datetime.now(timezone.utc).isoformat()),
+                    )
+
+            chunks_processed += 1
+            rows_selected += len(chunk)
+            rows_categorized += len(categories)
+            if progress_callback is not None:
+                progress_callback(rows_selected, total_rows)
+            if chunk_failed:
+                break
+            last_id = chunk_last_id
+
+    result = BulkCategorizationResult(
+        job_name=job_name,
+        chunks_processed=chunks_processed,
+        rows_selected=rows_selected,
+        rows_categorized=rows_categorized,
+        failed_batches=failed_batches,
+        last_id=last_id,
+        completed=completed,
+    )
+    append_audit_event(
+        db_path,
+        "bulk_categorization",
+        {
+            **get_bulk_categorization_prompt_metadata(),
+            "job_name": job_name,
+            "chunk_size": chunk_size,
+            "batch_size": batch_size,
+            "max_workers": max_workers,
+            "chunks_processed": chunks_processed,
+            "rows_selected": rows_selected,
+            "rows_categorized": rows_categorized,
+            "failed_batches": failed_batches,
+            "last_id": last_id,
+            "status": "completed" if completed else ("interrupted" if failed_batches else "partial"),
+        },
+    )
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import DATABASE_PATH
+
+    parser = argparse.ArgumentParser(description="Categorize PRODUCT rows with an empty CATEGORY.")
+    parser.add_argument("--db", default=str(DATABASE_PATH), help="Path to the inventory database.")
+    parser.add_argument("--job", default=DEFAULT_JOB_NAME, help="Checkpoint name used for resuming.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, metavar="N")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, metavar="N")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, metavar="N")
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=DEFAULT_REQUESTS_PER_SECOND,
+        help="Maximum model requests per second across all workers.",
+    )
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint.")
+    args = parser.parse_args()
+
+    outcome = categorize_uncategorized_products(
+        args.db,
+        job_name=args.job,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        requests_per_second=args.rps,
+        restart=args.restart,
+    )
+    print(
+        f"Categorized {outcome.rows_categorized} of {outcome.rows_selected} rows "
+        f"in {outcome.chunks_processed} chunks (checkpoint ID {outcome.last_id})."
+    )
+    if not outcome.completed:
+        print("Run stopped before the end; re-run the same command to resume.")
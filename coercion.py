@@ -0,0 +1,168 @@
+"""Bulk conversion of imported columns to the PRODUCT column types.
+
+pandas hands the importer numpy scalars, NaN, Timestamps and strings such as
+``"1,234.50"``. Binding those one value at a time leaves SQLite to store
+whatever arrives: text in an INTEGER column, or NaN where NULL was meant.
+Instead, each mapped column is converted once per chunk, with vectorized
+pandas operations, to the affinity of its declared type in ``PRAGMA
+table_info(PRODUCT)``. The rows handed to ``sqlite3`` are then plain Python
+values.
+
+Values that cannot be converted are kept as they are, which is what SQLite
+would have stored before, and counted per column so the preview and the audit
+log can report them. The type of a proposed new column is inferred from its
+values rather than its name.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+INTEGER = "INTEGER"
+REAL = "REAL"
+NUMERIC = "NUMERIC"
+TEXT = "TEXT"
+BLOB = "BLOB"
+
+FAILURE_EXAMPLES = 3
+
+# Thousands separators: a comma followed by exactly three digits, as in "1,234.50".
+_THOUSANDS = r"(?<=\d),(?=\d{3}(?:\D|$))"
+_CURRENCY = r"^[$€£¥]\s*"
+_NUMERIC_AFFINITIES = (INTEGER, REAL, NUMERIC)
+
+
+def sqlite_affinity(declared_type: str | None) -> str:
+    """Return the SQLite column affinity for a declared type (SQLite docs, section 3.1)."""
+
+    declared = (declared_type or "").upper()
+    if "INT" in declared:
+        return INTEGER
+    if any(token in declared for token in ("CHAR", "CLOB", "TEXT")):
+        return TEXT
+    if not declared or "BLOB" in declared:
+        return BLOB
+    if any(token in declared for token in ("REAL", "FLOA", "DOUB")):
+        return REAL
+    return NUMERIC
+
+
+def _is_blank(series):
+    text = series.astype("string").str.strip()
+    return text.isna() | text.eq("").fillna(True)
+
+
+def _parse_numbers(series):
+    """Return ``(numbers, failed)``: parsed floats/ints and a mask of unparseable values."""
+
+    import pandas as pd
+    from pandas.api import types
+
+    if types.is_bool_dtype(series):
+        return series.astype("Int64"), pd.Series(False, index=series.index)
+    if types.is_numeric_dtype(series):
+        return series, pd.Series(False, index=series.index)
+    blank = _is_blank(series)
+    if types.is_datetime64_any_dtype(series):
+        return pd.Series(float("nan"), index=series.index), ~blank
+    cleaned = (
+        series.astype("string")
+        .str.strip()
+        .str.replace(_CURRENCY, "", regex=True)
+        .str.replace(_THOUSANDS, "", regex=True)
+    )
+    numbers = pd.to_numeric(cleaned, errors="coerce")
+    return numbers, numbers.isna() & ~blank
+
+
+def _integral(numbers) -> bool:
+    present = numbers.dropna()
+    return bool(len(present)) and bool((present % 1 == 0).all())
+
+
+def _as_text(series):
+    from pandas.api import types
+
+    if types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime("%Y-%m-%d %H:%M:%S").str.replace(r" 00:00:00$", "", regex=True)
+        return text.astype(object).where(series.notna(), None)
+    if types.is_float_dtype(series) and _integral(series):
+        # Codes such as SKUs come back as 1234.0 once a column has a blank cell.
+        series = series.astype("Int64")
+    return series.astype("string").astype(object).where(series.notna(), None)
+
+
+def _coerce_series(series, affinity: str):
+    """Return ``(converted series, failed mask)`` for one column."""
+
+    import pandas as pd
+
+    if affinity == TEXT:
+        return _as_text(series), pd.Series(False, index=series.index)
+    if affinity not in _NUMERIC_AFFINITIES:
+        return series, pd.Series(False, index=series.index)
+    numbers, failed = _parse_numbers(series)
+    if affinity == REAL:
+        numbers = numbers.astype("Float64")
+    elif _integral(numbers):
+        numbers = numbers.astype("Int64")
+    if failed.any():
+        return numbers.astype(object).where(~failed, series), failed
+    return numbers, failed
+
+
+def coerce_frame(frame, column_types: Mapping[str, str], failures: dict | None = None):
+    """Convert each column named in ``column_types`` to its declared type's affinity.
+
+    ``column_types`` maps frame headers to declared SQL types; other columns
+    are left alone. Unconvertible values are kept and tallied in ``failures``
+    as ``{header: {"failed": count, "examples": [...]}}``, accumulating across
+    calls so a streamed import reports one total per column.
+    """
+
+    if not hasattr(frame, "dtypes"):
+        return frame
+    converted = {}
+    for header, declared_type in column_types.items():
+        if header not in frame.columns:
+            continue
+        series, failed = _coerce_series(frame[header], sqlite_affinity(declared_type))
+        converted[header] = series
+        count = int(failed.sum())
+        if count and failures is not None:
+            entry = failures.setdefault(header, {"failed": 0, "examples": []})
+            entry["failed"] += count
+            room = FAILURE_EXAMPLES - len(entry["examples"])
+            if room > 0:
+                entry["examples"].extend(str(value) for value in frame[header][failed].head(room))
+    return frame.assign(**converted) if converted else frame
+
+
+def infer_sqlite_type(series) -> str | None:
+    """Pick a column type for ``series`` from its values, or ``None`` if it is all blank."""
+
+    from pandas.api import types
+
+    if types.is_bool_dtype(series):
+        return INTEGER
+    if types.is_datetime64_any_dtype(series):
+        return TEXT if series.notna().any() else None
+    if _is_blank(series).all():
+        return None
+    numbers, failed = _parse_numbers(series)
+    if failed.any():
+        return TEXT
+    return INTEGER if _integral(numbers) else REAL
+
+
+def iter_records(frame):
+    """Yield the frame's rows as dicts of Python values, with missing values as ``None``.
+
+    Plain Python values bind straight into ``sqlite3``; frames without
+    ``dtypes`` (already Python rows) are passed through ``iterrows``.
+    """
+
+    if not hasattr(frame, "dtypes"):
+        yield from (row for _, row in frame.iterrows())
+        return
+    yield from frame.astype(object).where(frame.notna(), None).to_dict("records")
@@ -0,0 +1,246 @@
+"""Offline fuzzy matching of spreadsheet headers onto PRODUCT columns.
+
+Every target column (the existing PRODUCT columns plus the well-known
+synonym targets) is indexed by the character trigrams of its aliases. A
+header is scored against the targets that share at least one trigram. The
+score is the Dice coefficient of the two trigram sets, or a fixed token score
+when one of the header's words is an alias. Each header may fall back to a
+fresh column of its own name, worth ``GUESS_SCORE``, so a header with no
+target scoring above that becomes a new column straight away. The rest are
+assigned jointly with the Hungarian algorithm on headers x targets, so two
+headers never claim the same column.
+
+Only headers whose best match is neither clear nor clearly absent are
+reported as ambiguous; ``utils.map_columns`` escalates just those to the
+model.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+from guardrails import normalize_identifier
+
+# Target column -> header spellings (normalized, underscores removed) that mean it.
+COLUMN_SYNONYMS: dict[str, tuple[str, ...]] = {
+    "NAME": ("NAME", "PRODUCTNAME", "ITEMNAME", "PRODUCT", "ITEM"),
+    "CATEGORY": ("CATEGORY", "TYPE", "GROUP"),
+    "BRAND": ("BRAND",),
+    "PRICE": ("PRICE", "COST", "AMOUNT", "RATE"),
+    "STOCK": ("STOCK", "QUANTITY", "QTY", "INVENTORY"),
+    "QUANTITY": ("QUANTITY", "STOCK", "QTY", "INVENTORY"),
+    "COLOR": ("COLOR", "COLOUR"),
+    "SIZE": ("SIZE",),
+    "WEIGHT": ("WEIGHT",),
+    "SPECIFICATIONS": ("SPECIFICATIONS", "SPECIFICATION", "DETAILS", "DESCRIPTION", "SPEC"),
+    "ID": ("ID", "PRODUCTID"),
+}
+
+ACCEPT_SCORE = 0.65  # a match at least this good, and clear of the runner-up, is taken offline
+MIN_MARGIN = 0.1
+GUESS_SCORE = 0.62  # weaker matches become new columns when the model is unavailable
+NO_MATCH_SCORE = 0.3  # below this nothing resembles the header: a new column, no model needed
+TOKEN_SCORE = 0.8
+
+
+@dataclass(frozen=True)
+class ColumnMatch:
+    header: str
+    target: str
+    score: float
+    runner_up: float
+    confident: bool
+    new_column: bool
+
+
+def _compact(value: str) -> str:
+    return normalize_identifier(value).replace("_", "")
+
+
+def _trigrams(compact: str) -> frozenset[str]:
+    padded = f" {compact} "
+    return frozenset(padded[index : index + 3] for index in range(len(padded) - 2))
+
+
+class ColumnMatcher:
+    """Trigram index over one PRODUCT schema; build once, match many uploads."""
+
+    def __init__(
+        self,
+        existing_columns: Iterable[str],
+        synonyms: Mapping[str, Sequence[str]] = COLUMN_SYNONYMS,
+    ):
+        existing = {normalize_identifier(column): str(column) for column in existing_columns}
+        aliases: dict[str, set[str]] = {normalized: {normalized.replace("_", "")} for normalized in existing}
+        for target, spellings in synonyms.items():
+            aliases.setdefault(target, set()).update({target, *spellings})
+        # A synonym target that is not in the schema keeps only spellings no
+        # existing column claims, so "QTY" means STOCK rather than a new QUANTITY.
+        claimed = set().union(*(aliases[target] for target in existing))
+        for target in list(aliases):
+            if target not in existing:
+                aliases[target] -= claimed
+                if not aliases[target]:
+                    del aliases[target]
+
+        self.targets = [existing.get(target, target) for target in aliases]
+        self._aliases: list[tuple[str, int, frozenset[str]]] = []
+        self._exact: dict[str, set[int]] = {}
+        self._index: dict[str, set[int]] = {}
+        for target_index, spellings in enumerate(aliases.values()):
+            for alias in spellings:
+                alias_index = len(self._aliases)
+                grams = _trigrams(alias)
+                self._aliases.append((alias, target_index, grams))
+                self._exact.setdefault(alias, set()).add(target_index)
+                for gram in grams:
+                    self._index.setdefault(gram, set()).add(alias_index)
+
+    def scores(self, header: str) -> dict[int, float]:
+        """Return ``{target index: score}`` for targets resembling ``header``."""
+
+        compact = _compact(header)
+        result: dict[int, float] = {}
+        for target_index in self._exact.get(compact, ()):
+            result[target_index] = 1.0
+        for token in normalize_identifier(header).split("_"):
+            for target_index in self._exact.get(token, ()):
+                result[target_index] = max(result.get(target_index, 0.0), TOKEN_SCORE)
+        grams = _trigrams(compact)
+        candidates = set().union(*(self._index.get(gram, ()) for gram in grams))
+        for alias_index in candidates:
+            _, target_index, alias_grams = self._aliases[alias_index]
+            dice = 2 * len(grams & alias_grams) / (len(grams) + len(alias_grams))
+            if dice > result.get(target_index, 0.0):
+                result[target_index] = dice
+        return result
+
+    def match(self, headers: Iterable[object]) -> dict[str, ColumnMatch]:
+        headers = [str(header) for header in headers]
+        if not headers:
+            return {}
+        header_scores = [self.scores(header) for header in headers]
+        target_count = len(self.targets)
+        # A new column is worth GUESS_SCORE to any header, so only the gain
+        # over it matters and a zero gain is the shared "no match" option.
+        gains = [
+            {target_index: score - GUESS_SCORE for target_index, score in scores.items() if score > GUESS_SCORE}
+            for scores in header_scores
+        ]
+        contested = [row for row, row_gains in enumerate(gains) if row_gains]
+        matrix = [[gains[row].get(target_index, 0.0) for target_index in range(target_count)] for row in contested]
+        assignment = [target_count] * len(headers)
+        for row, column in _assign(matrix):
+            if matrix[row][column] > 0:
+                assignment[contested[row]] = column
+
+        matches: dict[str, ColumnMatch] = {}
+        for header, scores, column in zip(headers, header_scores, assignment):
+            ranked = sorted(scores.values(), reverse=True)
+            best = ranked[0] if ranked else 0.0
+            if column < target_count:
+                score = scores[column]
+                runner_up = max((value for index, value in scores.items() if index != column), default=0.0)
+                confident = score >= ACCEPT_SCORE and score - runner_up >= MIN_MARGIN
+                target = self.targets[column]
+            else:
+                score = 0.0
+                runner_up = best
+                confident = best < NO_MATCH_SCORE
+                target = normalize_identifier(header) or "COLUMN"
+            matches[header] = ColumnMatch(
+                header=header,
+                target=target,
+                score=score,
+                runner_up=runner_up,
+                confident=confident,
+                new_column=column >= target_count,
+            )
+        return matches
+
+
+def _assign(matrix: Sequence[Sequence[float]]) -> list[tuple[int, int]]:
+    """Return ``(row, column)`` pairs maximizing the total, for any matrix shape.
+
+    The Hungarian pass needs at least as many columns as rows, so a tall
+    matrix is solved transposed; its cost is O(min(shape)^2 * max(shape)).
+    """
+
+    if not matrix or not matrix[0]:
+        return []
+    if len(matrix) <= len(matrix[0]):
+        return list(enumerate(_hungarian_maximize(matrix)))
+    transposed = [list(column) for column in zip(*matrix)]
+    return [(row, column) for column, row in enumerate(_hungarian_maximize(transposed))]
+
+
+def _hungarian_maximize(matrix: Sequence[Sequence[float]]) -> list[int]:
+    """Return the column assigned to each row, maximizing the total score.
+
+    Kuhn-Munkres with row/column potentials, O(rows^2 * columns); requires
+    ``rows <= columns``.
+    """
+
+    rows = len(matrix)
+    columns = len(matrix[0])
+    inf = float("inf")
+    row_potential = [0.0] * (rows + 1)
+    column_potential = [0.0] * (columns + 1)
+    owner = [0] * (columns + 1)  # 1-based row assigned to each column, 0 = free
+    previous = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        current = 0
+        slack = [inf] * (columns + 1)
+        visited = [False] * (columns + 1)
+        while True:
+            visited[current] = True
+            row_at = owner[current]
+            delta = inf
+            next_column = 0
+            for column in range(1, columns + 1):
+                if visited[column]:
+                    continue
+                cost = -matrix[row_at - 1][column - 1] - row_potential[row_at] - column_potential[column]
+                if cost < slack[column]:
+                    slack[column] = cost
+                    previous[column] = current
+                if slack[column] < delta:
+                    delta = slack[column]
+                    next_column = column
+            for column in range(columns + 1):
+                if visited[column]:
+                    row_potential[owner[column]] += delta
+                    column_potential[column] -= delta
+                else:
+                    slack[column] -= delta
+            current = next_column
+            if owner[current] == 0:
+                break
+        while current:
+            prior = previous[current]
+            owner[current] = owner[prior]
+            current = prior
+
+    assignment = [0] * rows
+    for column in range(1, columns + 1):
+        if owner[column]:
+            assignment[owner[column] - 1] = column - 1
+    return assignment
+
+
+@lru_cache(maxsize=32)
+def _matcher_for(existing_columns: tuple[str, ...]) -> ColumnMatcher:
+    return ColumnMatcher(existing_columns)
+
+
+def get_matcher(existing_columns: Iterable[str]) -> ColumnMatcher:
+    """Return a shared matcher for this schema; the index is built once per schema."""
+
+    return _matcher_for(tuple(str(column) for column in existing_columns))
+
+
+def match_columns(headers: Iterable[object], existing_columns: Iterable[str]) -> dict[str, ColumnMatch]:
+    return get_matcher(existing_columns).match(headers)
@@ -4,8 +4,18 @@ from __future__ import annotations
 
 import random
 import sqlite3
-from collections.abc import Callable
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
+
+try:  # NumPy ships with pandas; the stdlib generator below covers its absence.
+    import numpy as _np
+except ImportError:  # pragma: no cover - exercised only in minimal environments.
+    _np = None
 
 DATABASE_PATH = Path(__file__).with_name("product_inventory.db")
 PRODUCT_TABLE = "PRODUCT"
@@ -38,6 +48,180 @@ CREATE TABLE IF NOT EXISTS {PRODUCT_TABLE} (
 );
 """
 
+STOCK_MOVEMENT_TABLE = "STOCK_MOVEMENT"
+STOCK_SNAPSHOT_TABLE = "STOCK_SNAPSHOT"
+STOCK_SNAPSHOT_LEVEL_TABLE = "STOCK_SNAPSHOT_LEVEL"
+STOCK_MOVEMENT_CONTEXT_TABLE = "_stock_movement_context"
+DEFAULT_MOVEMENT_REASON = "manual"
+DELISTED_MOVEMENT_REASON = "delisted"
+IMPORT_MOVEMENT_REASON_PREFIX = "import:"
+RECOUNT_MOVEMENT_REASONS = ("recount", "correction")
+# Millisecond UTC ISO-8601 text; sorts chronologically, so time ranges use the indexes.
+LEDGER_TIME_FORMAT_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+_STOCK_DELTA_NEW = f"COALESCE(CAST(NEW.{INVENTORY_VALUE_COLUMN} AS INTEGER), 0)"
+_STOCK_DELTA_OLD = f"COALESCE(CAST(OLD.{INVENTORY_VALUE_COLUMN} AS INTEGER), 0)"
+_MOVEMENT_REASON_SQL = (
+    f"COALESCE((SELECT REASON FROM {STOCK_MOVEMENT_CONTEXT_TABLE} WHERE ID = 1), '{DEFAULT_MOVEMENT_REASON}')"
+)
+
+# The ledger is append-only: triggers on PRODUCT record every STOCK change, so
+# no writer can forget to. Writers that know why stock moved (imports) put a
+# reason in the one-row context table for the length of their transaction.
+# Stock that is loaded rather than moved (pre-ledger rows, demo seeding) is
+# recorded as an opening snapshot instead, so it does not read as inflow.
+# Deleting a product writes off its remaining stock under its own
+# DELISTED_MOVEMENT_REASON, whatever the transaction's reason is.
+CREATE_STOCK_LEDGER_TABLES_SQL = (
+    f"""
+CREATE TABLE IF NOT EXISTS {STOCK_MOVEMENT_TABLE} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PRODUCT_ID INTEGER NOT NULL,
+    DELTA INTEGER NOT NULL,
+    REASON TEXT NOT NULL,
+    MOVED_AT TEXT NOT NULL DEFAULT ({LEDGER_TIME_FORMAT_SQL})
+)""",
+    f"""
+CREATE INDEX IF NOT EXISTS IDX_STOCK_MOVEMENT_PRODUCT_TIME
+ON {STOCK_MOVEMENT_TABLE} (PRODUCT_ID, MOVED_AT, DELTA)""",
+    f"""
+CREATE INDEX IF NOT EXISTS IDX_STOCK_MOVEMENT_TIME
+ON {STOCK_MOVEMENT_TABLE} (MOVED_AT, PRODUCT_ID, DELTA, REASON)""",
+    f"""
+CREATE TABLE IF NOT EXISTS {STOCK_SNAPSHOT_TABLE} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TAKEN_AT TEXT NOT NULL,
+    LAST_MOVEMENT_ID INTEGER NOT NULL
+)""",
+    f"""
+CREATE INDEX IF NOT EXISTS IDX_STOCK_SNAPSHOT_TIME ON {STOCK_SNAPSHOT_TABLE} (TAKEN_AT)""",
+    f"""
+CREATE TABLE IF NOT EXISTS {STOCK_SNAPSHOT_LEVEL_TABLE} (
+    PRODUCT_ID INTEGER NOT NULL,
+    SNAPSHOT_ID INTEGER NOT NULL,
+    STOCK INTEGER NOT NULL,
+    PRIMARY KEY (PRODUCT_ID, SNAPSHOT_ID)
+) WITHOUT ROWID""",
+    f"""
+CREATE TABLE IF NOT EXISTS {STOCK_MOVEMENT_CONTEXT_TABLE} (
+    ID INTEGER PRIMARY KEY CHECK (ID = 1),
+    REASON TEXT NOT NULL
+)""",
+)
+CREATE_STOCK_TRIGGERS_SQL = {
+    "TRG_PRODUCT_STOCK_INSERT": f"""
+CREATE TRIGGER IF NOT EXISTS TRG_PRODUCT_STOCK_INSERT
+AFTER INSERT ON {PRODUCT_TABLE}
+WHEN {_STOCK_DELTA_NEW} != 0
+BEGIN
+    INSERT INTO {STOCK_MOVEMENT_TABLE} (PRODUCT_ID, DELTA, REASON)
+    VALUES (NEW.ID, {_STOCK_DELTA_NEW}, {_MOVEMENT_REASON_SQL});
+END""",
+    "TRG_PRODUCT_STOCK_UPDATE": f"""
+CREATE TRIGGER IF NOT EXISTS TRG_PRODUCT_STOCK_UPDATE
+AFTER UPDATE OF {INVENTORY_VALUE_COLUMN} ON {PRODUCT_TABLE}
+WHEN {_STOCK_DELTA_NEW} != {_STOCK_DELTA_OLD}
+BEGIN
+    INSERT INTO {STOCK_MOVEMENT_TABLE} (PRODUCT_ID, DELTA, REASON)
+    VALUES (NEW.ID, {_STOCK_DELTA_NEW} - {_STOCK_DELTA_OLD}, {_MOVEMENT_REASON_SQL});
+END""",
+    "TRG_PRODUCT_STOCK_DELETE": f"""
+CREATE TRIGGER IF NOT EXISTS TRG_PRODUCT_STOCK_DELETE
+AFTER DELETE ON {PRODUCT_TABLE}
+WHEN {_STOCK_DELTA_OLD} != 0
+BEGIN
+    INSERT INTO {STOCK_MOVEMENT_TABLE} (PRODUCT_ID, DELTA, REASON)
+    VALUES (OLD.ID, -{_STOCK_DELTA_OLD}, '{DELISTED_MOVEMENT_REASON}');
+END""",
+}
+
+DEFAULT_SEED_CHUNK_SIZE = 50_000
+MAX_SEED_SHARDS = 10  # SQLite's default limit on attached databases
+
+_PRODUCT_ADJECTIVES = (
+    "Premium",
+    "Deluxe",
+    "Advanced",
+    "Smart",
+    "Eco-friendly",
+    "Compact",
+    "Portable",
+    "Professional",
+)
+_PRODUCT_NOUNS = ("Device", "Gadget", "Tool", "Appliance", "System", "Kit", "Set", "Solution")
+_PRODUCT_CATEGORIES = (
+    "Electronics",
+    "Clothing",
+    "Home & Garden",
+    "Sports & Outdoors",
+    "Books",
+    "Toys",
+    "Beauty",
+    "Food & Beverage",
+)
+_PRODUCT_SIZES = ("XS", "S", "M", "L", "XL", "XXL", "N/A")
+
+# Fixed vocabularies for the vectorized generator. Building them once and
+# drawing indices keeps per-row work out of Python entirely.
+_VECTOR_WORDS = (
+    "Aero", "Apex", "Arc", "Atlas", "Beam", "Bolt", "Breeze", "Core", "Crest", "Delta",
+    "Echo", "Ember", "Flux", "Forge", "Glide", "Halo", "Helix", "Ion", "Jet", "Kite",
+    "Lumen", "Nova", "Orbit", "Peak", "Pulse", "Quartz", "Ridge", "Sonic", "Spark", "Terra",
+    "Vertex", "Zen",
+)
+_VECTOR_BRANDS = (
+    "Acme Corp", "Northwind", "Globex", "Initech", "Umbrella", "Stark Industries",
+    "Wayne Enterprises", "Hooli", "Vandelay", "Soylent", "Cyberdyne", "Tyrell", "Wonka",
+    "Oscorp", "Aperture", "Massive Dynamic",
+)
+_VECTOR_COLORS = (
+    "Red", "Blue", "Green", "Black", "White", "Silver", "Gold", "Grey", "Navy", "Orange",
+    "Purple", "Teal", "Yellow", "Pink", "Brown", "Olive",
+)
+_VECTOR_SPEC_OPENERS = (
+    "Durable build for everyday use.",
+    "Lightweight design with a compact footprint.",
+    "Engineered for reliable performance.",
+    "Designed with sustainable materials.",
+    "Backed by a two-year warranty.",
+    "Ideal for home and office.",
+    "Tested for demanding environments.",
+    "Easy to set up and maintain.",
+)
+_VECTOR_SPEC_CLOSERS = (
+    "Ships in recyclable packaging.",
+    "Includes a quick-start guide.",
+    "Compatible with standard accessories.",
+    "Available while stocks last.",
+    "Customer favourite this season.",
+    "Limited edition finish.",
+    "Replacement parts available.",
+    "Certified for safety compliance.",
+)
+
+_SEED_COLUMNS = (
+    f"NAME, CATEGORY, BRAND, PRICE, {INVENTORY_VALUE_COLUMN}, SIZE, COLOR, WEIGHT, SPECIFICATIONS"
+)
+_INSERT_PRODUCT_SQL = f"""
+INSERT INTO {PRODUCT_TABLE}
+({_SEED_COLUMNS})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@dataclass(frozen=True)
+class SeedReport:
+    """Outcome of a ``seed_database`` run."""
+
+    rows: int
+    seconds: float
+    workers: int = 1
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
 def get_connection(db_path: str | Path = DATABASE_PATH) -> sqlite3.Connection:
     """Return a SQLite connection for the configured product database."""
 
@@ -71,6 +255,14 @@ def _product_table_exists(connection: sqlite3.Connection) -> bool:
     return row is not None
 
 
+def has_stock_ledger(connection: sqlite3.Connection) -> bool:
+    row = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (STOCK_MOVEMENT_CONTEXT_TABLE,),
+    ).fetchone()
+    return row is not None
+
+
 def _get_product_columns(connection: sqlite3.Connection) -> list[str]:
     return [row[1] for row in connection.execute(f"PRAGMA table_info({PRODUCT_TABLE})").fetchall()]
 
@@ -102,12 +294,138 @@ def _ensure_product_table_matches_current_schema(connection: sqlite3.Connection)
     _raise_for_missing_columns(actual_columns)
 
 
+def _create_stock_ledger(connection: sqlite3.Connection) -> None:
+    """Add the STOCK_MOVEMENT ledger, its snapshots and the PRODUCT triggers.
+
+    Stock that predates the ledger is recorded as an opening snapshot rather
+    than as movements, so existing databases start with a consistent history.
+    """
+
+    _ensure_product_table_matches_current_schema(connection)
+    for statement in (*CREATE_STOCK_LEDGER_TABLES_SQL, *CREATE_STOCK_TRIGGERS_SQL.values()):
+        connection.execute(statement)
+    if connection.execute(f"SELECT 1 FROM {STOCK_SNAPSHOT_TABLE} LIMIT 1").fetchone() is None:
+        record_opening_stock(connection)
+
+
+def _max_product_id(connection: sqlite3.Connection) -> int:
+    return connection.execute(f"SELECT COALESCE(MAX(ID), 0) FROM {PRODUCT_TABLE}").fetchone()[0]
+
+
+def record_opening_stock(connection: sqlite3.Connection, after_product_id: int = 0) -> None:
+    """Snapshot the STOCK of products with ``ID > after_product_id`` as their opening level.
+
+    The snapshot keeps the previous movement watermark, so movements of other
+    products since the last snapshot still count on top of it.
+    """
+
+    cursor = connection.execute(
+        f"INSERT INTO {STOCK_SNAPSHOT_TABLE} (TAKEN_AT, LAST_MOVEMENT_ID) "
+        f"VALUES ({LEDGER_TIME_FORMAT_SQL}, (SELECT COALESCE(MAX(LAST_MOVEMENT_ID), 0) FROM {STOCK_SNAPSHOT_TABLE}))"
+    )
+    connection.execute(
+        f"INSERT INTO {STOCK_SNAPSHOT_LEVEL_TABLE} (PRODUCT_ID, SNAPSHOT_ID, STOCK) "
+        f"SELECT ID, ?, CAST({INVENTORY_VALUE_COLUMN} AS INTEGER) FROM {PRODUCT_TABLE} "
+        f"WHERE ID > ? AND COALESCE(CAST({INVENTORY_VALUE_COLUMN} AS INTEGER), 0) != 0",
+        (cursor.lastrowid, after_product_id),
+    )
+
+
+def _bulk_load_products(connection: sqlite3.Connection, load: Callable[[], None]) -> None:
+    """Run ``load`` (an INSERT of new PRODUCT rows) as an opening-balance load.
+
+    The ledger triggers are dropped for the load and recreated afterwards in
+    the same transaction, so a failed load restores them on rollback. The
+    loaded stock is recorded with ``record_opening_stock`` instead of one
+    movement per row, which keeps bulk seeding at full speed and keeps demo
+    stock from reading as inflow.
+    """
+
+    if not has_stock_ledger(connection):
+        load()
+        return
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+    loaded_after = _max_product_id(connection)
+    for trigger in CREATE_STOCK_TRIGGERS_SQL:
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    load()
+    record_opening_stock(connection, loaded_after)
+    for statement in CREATE_STOCK_TRIGGERS_SQL.values():
+        connection.execute(statement)
+
+
+def outflow_condition_sql(alias: str = "") -> str:
+    """Return the SQL condition selecting movements that consumed stock.
+
+    Only negative deltas count, and not all of them: deletions
+    (``delisted``), imports (``import:*``, which set levels from a count) and
+    movements labelled ``recount`` or ``correction`` adjust the books rather
+    than consume stock. Unlabelled writes (``manual``) and any other reason,
+    such as ``sale``, count as outflow.
+    """
+
+    prefix = f"{alias}." if alias else ""
+    recounts = ", ".join(f"'{reason}'" for reason in (DELISTED_MOVEMENT_REASON, *RECOUNT_MOVEMENT_REASONS))
+    return (
+        f"{prefix}DELTA < 0 AND {prefix}REASON NOT IN ({recounts}) "
+        f"AND {prefix}REASON NOT LIKE '{IMPORT_MOVEMENT_REASON_PREFIX}%'"
+    )
+
+
+def _label_delisting_movements(connection: sqlite3.Connection) -> None:
+    """Give deletions their own ledger reason from now on.
+
+    Recorded write-offs are relabelled ``delisted`` only where the reason
+    proves them: remove imports only delete. A manual write-off and a sale
+    that emptied the shelf both left the level at zero, and deleting an
+    empty product records nothing, so other history is left alone. The time
+    index gains REASON so outflow queries stay index-only.
+    """
+
+    connection.execute("DROP TRIGGER IF EXISTS TRG_PRODUCT_STOCK_DELETE")
+    connection.execute(CREATE_STOCK_TRIGGERS_SQL["TRG_PRODUCT_STOCK_DELETE"])
+    # Outflow queries filter on REASON; keep the time index covering them.
+    connection.execute("DROP INDEX IF EXISTS IDX_STOCK_MOVEMENT_TIME")
+    for statement in CREATE_STOCK_LEDGER_TABLES_SQL:
+        connection.execute(statement)
+    connection.execute(
+        f"""
+        UPDATE {STOCK_MOVEMENT_TABLE} SET REASON = ?
+        WHERE DELTA < 0 AND REASON = ? AND PRODUCT_ID NOT IN (SELECT ID FROM {PRODUCT_TABLE})
+        """,
+        (DELISTED_MOVEMENT_REASON, f"{IMPORT_MOVEMENT_REASON_PREFIX}remove"),
+    )
+
+
+def set_movement_reason(connection: sqlite3.Connection, reason: str) -> bool:
+    """Label the stock movements the triggers record in this transaction.
+
+    Call ``clear_movement_reason`` before committing; a rollback clears it too.
+    Returns ``False`` (and does nothing) for databases without the ledger.
+    """
+
+    if not has_stock_ledger(connection):
+        return False
+    connection.execute(
+        f"INSERT OR REPLACE INTO {STOCK_MOVEMENT_CONTEXT_TABLE} (ID, REASON) VALUES (1, ?)", (reason,)
+    )
+    return True
+
+
+def clear_movement_reason(connection: sqlite3.Connection) -> None:
+    if has_stock_ledger(connection):
+        connection.execute(f"DELETE FROM {STOCK_MOVEMENT_CONTEXT_TABLE}")
+
+
 # Ordered migration steps: (version, function).
 # To evolve the schema append a new tuple with the next version number and a
 # forward-only migration function. Never edit or remove an existing entry —
 # that would break databases already at that version.
 _MIGRATIONS: list[tuple[int, Callable[[sqlite3.Connection], None]]] = [
     (1, _ensure_product_table_matches_current_schema),
+    (2, _create_stock_ledger),
+    (3, _label_delisting_movements),
 ]
 
 
@@ -151,46 +469,27 @@ def _build_fake() -> object:
 def generate_product_name(fake: object) -> str:
     """Generate a realistic product name for the sample dataset."""
 
-    adjectives = [
-        "Premium",
-        "Deluxe",
-        "Advanced",
-        "Smart",
-        "Eco-friendly",
-        "Compact",
-        "Portable",
-        "Professional",
-    ]
-    nouns = ["Device", "Gadget", "Tool", "Appliance", "System", "Kit", "Set", "Solution"]
-    return f"{random.choice(adjectives)} {fake.word().capitalize()} {random.choice(nouns)}"
+    return (
+        f"{random.choice(_PRODUCT_ADJECTIVES)} {fake.word().capitalize()} "
+        f"{random.choice(_PRODUCT_NOUNS)}"
+    )
 
 
 def generate_product_data(num_products: int) -> list[tuple]:
     """Build a sample inventory dataset matching the PRODUCT schema."""
 
     fake = _build_fake()
-    categories = [
-        "Electronics",
-        "Clothing",
-        "Home & Garden",
-        "Sports & Outdoors",
-        "Books",
-        "Toys",
-        "Beauty",
-        "Food & Beverage",
-    ]
-    sizes = ["XS", "S", "M", "L", "XL", "XXL", "N/A"]
     product_data = []
 
     for _ in range(num_products):
         product_data.append(
             (
                 generate_product_name(fake),
-                random.choice(categories),
+                random.choice(_PRODUCT_CATEGORIES),
                 fake.company(),
                 round(random.uniform(1.0, 1000.0), 2),
                 random.randint(0, 1000),
-                random.choice(sizes),
+                random.choice(_PRODUCT_SIZES),
                 fake.color_name(),
                 round(random.uniform(0.1, 50.0), 2),
                 fake.text(max_nb_chars=200),
@@ -200,6 +499,90 @@ def generate_product_data(num_products: int) -> list[tuple]:
     return product_data
 
 
+def _vectorized_product_chunk(rng, size: int, vocab: dict[str, object]) -> list[tuple]:
+    names = vocab["names"][rng.integers(0, len(vocab["names"]), size)]
+    categories = vocab["categories"][rng.integers(0, len(vocab["categories"]), size)]
+    brands = vocab["brands"][rng.integers(0, len(vocab["brands"]), size)]
+    prices = _np.round(rng.uniform(1.0, 1000.0, size), 2)
+    stock = rng.integers(0, 1001, size)
+    sizes = vocab["sizes"][rng.integers(0, len(vocab["sizes"]), size)]
+    colors = vocab["colors"][rng.integers(0, len(vocab["colors"]), size)]
+    weights = _np.round(rng.uniform(0.1, 50.0, size), 2)
+    specifications = vocab["specifications"][rng.integers(0, len(vocab["specifications"]), size)]
+    # tolist() converts to native Python scalars in C, which sqlite3 binds
+    # without any per-value adaptation.
+    return list(
+        zip(
+            names.tolist(),
+            categories.tolist(),
+            brands.tolist(),
+            prices.tolist(),
+            stock.tolist(),
+            sizes.tolist(),
+            colors.tolist(),
+            weights.tolist(),
+            specifications.tolist(),
+        )
+    )
+
+
+def _build_vector_vocab() -> dict[str, object]:
+    names = [
+        f"{adjective} {word} {noun}"
+        for adjective in _PRODUCT_ADJECTIVES
+        for word in _VECTOR_WORDS
+        for noun in _PRODUCT_NOUNS
+    ]
+    specifications = [
+        f"{opener} {closer}" for opener in _VECTOR_SPEC_OPENERS for closer in _VECTOR_SPEC_CLOSERS
+    ]
+    return {
+        "names": _np.array(names, dtype=object),
+        "categories": _np.array(_PRODUCT_CATEGORIES, dtype=object),
+        "brands": _np.array(_VECTOR_BRANDS, dtype=object),
+        "sizes": _np.array(_PRODUCT_SIZES, dtype=object),
+        "colors": _np.array(_VECTOR_COLORS, dtype=object),
+        "specifications": _np.array(specifications, dtype=object),
+    }
+
+
+def generate_product_chunks(
+    num_products: int,
+    *,
+    chunk_size: int = DEFAULT_SEED_CHUNK_SIZE,
+    seed: Any = None,
+) -> Iterator[list[tuple]]:
+    """Yield demo PRODUCT rows in chunks of at most ``chunk_size``.
+
+    Uses NumPy vectorized draws over pre-built vocabularies, so generation
+    cost is dominated by the final ``tolist`` conversion and memory stays
+    bounded by one chunk regardless of ``num_products``. ``seed`` (an int or a
+    ``numpy.random.SeedSequence``) makes the output reproducible. Without
+    NumPy the row-by-row generator is used.
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    if _np is None:
+        if seed is not None:
+            random.seed(seed)
+        remaining = num_products
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield generate_product_data(size)
+            remaining -= size
+        return
+
+    rng = _np.random.default_rng(seed)
+    vocab = _build_vector_vocab()
+    remaining = num_products
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield _vectorized_product_chunk(rng, size, vocab)
+        remaining -= size
+
+
 def ensure_schema(db_path: str | Path = DATABASE_PATH) -> None:
     """Apply any pending schema migrations in version order.
 
@@ -227,7 +610,10 @@ def seed_database(
     num_products: int = 10000,
     *,
     force: bool = False,
-) -> None:
+    chunk_size: int = DEFAULT_SEED_CHUNK_SIZE,
+    seed: int | None = None,
+    workers: int = 1,
+) -> SeedReport | None:
     """Populate the PRODUCT table with generated demo rows.
 
     This is an explicit, opt-in step — it must not be called automatically
@@ -235,28 +621,105 @@ def seed_database(
     table already contains rows, preventing accidental duplication on repeated
     invocations. Pass ``force=True`` to insert rows regardless.
 
-    Must be called after ``ensure_schema``.
+    Rows are streamed from ``generate_product_chunks`` into ``executemany``
+    inside a single transaction, so tens of millions of rows can be seeded
+    with memory bounded by ``chunk_size``. With ``workers > 1`` the rows are
+    generated by a process pool into at most ``MAX_SEED_SHARDS`` temporary
+    shard databases, which are merged with ``ATTACH`` + ``INSERT ... SELECT``
+    in one transaction, so a failed merge adds no rows at all.
+
+    Must be called after ``ensure_schema``. Returns ``None`` when seeding was
+    skipped, otherwise a ``SeedReport`` with the achieved rows per second.
     """
 
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
     with get_connection(db_path) as connection:
         if not force:
             existing = connection.execute(
                 f"SELECT COUNT(*) FROM {PRODUCT_TABLE}"
             ).fetchone()[0]
             if existing > 0:
-                return
+                return None
 
-    product_data = generate_product_data(num_products)
-    with get_connection(db_path) as connection:
-        cursor = connection.cursor()
-        cursor.executemany(
-            f"""
-            INSERT INTO {PRODUCT_TABLE}
-            (NAME, CATEGORY, BRAND, PRICE, {INVENTORY_VALUE_COLUMN}, SIZE, COLOR, WEIGHT, SPECIFICATIONS)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            product_data,
-        )
+    started = time.perf_counter()
+    if workers > 1 and num_products > 1:
+        _seed_in_parallel(db_path, num_products, workers=workers, chunk_size=chunk_size, seed=seed)
+    else:
+        workers = 1
+        with get_connection(db_path) as connection:
+            cursor = connection.cursor()
+
+            def load() -> None:
+                for chunk in generate_product_chunks(num_products, chunk_size=chunk_size, seed=seed):
+                    cursor.executemany(_INSERT_PRODUCT_SQL, chunk)
+
+            _bulk_load_products(connection, load)
+    return SeedReport(rows=num_products, seconds=time.perf_counter() - started, workers=workers)
+
+
+def _seed_shard(shard_path: str, num_products: int, chunk_size: int, seed: Any) -> int:
+    """Process-pool worker: generate one partition into its own SQLite file."""
+
+    with sqlite3.connect(shard_path) as connection:
+        # Shards are throwaway files, so durability is traded for speed.
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute(CREATE_PRODUCT_TABLE_SQL)
+        for chunk in generate_product_chunks(num_products, chunk_size=chunk_size, seed=seed):
+            connection.executemany(_INSERT_PRODUCT_SQL, chunk)
+    return num_products
+
+
+def _partition_seeds(seed: int | None, partitions: int) -> list[Any]:
+    if _np is not None:
+        return list(_np.random.SeedSequence(seed).spawn(partitions))
+    return [None if seed is None else seed + index for index in range(partitions)]
+
+
+def _seed_in_parallel(
+    db_path: str | Path,
+    num_products: int,
+    *,
+    workers: int,
+    chunk_size: int,
+    seed: int | None,
+) -> None:
+    partitions = min(workers, num_products, MAX_SEED_SHARDS)
+    base, extra = divmod(num_products, partitions)
+    sizes = [base + (1 if index < extra else 0) for index in range(partitions)]
+    seeds = _partition_seeds(seed, partitions)
+
+    # Shards live next to the target database so the merge reads from the
+    # same filesystem rather than a potentially small tmpfs.
+    with tempfile.TemporaryDirectory(dir=Path(db_path).resolve().parent, prefix=".seed-shards-") as shard_dir:
+        shard_paths = [str(Path(shard_dir) / f"shard-{index}.db") for index in range(partitions)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_seed_shard, shard_paths, sizes, [chunk_size] * partitions, seeds))
+
+        # DETACH is refused inside a transaction, so every shard is attached
+        # up front and merged by a single load that commits all or nothing.
+        connection = get_connection(db_path)
+        attached: list[str] = []
+        try:
+            for index, shard_path in enumerate(shard_paths):
+                connection.execute(f"ATTACH DATABASE ? AS shard{index}", (shard_path,))
+                attached.append(f"shard{index}")
+
+            def merge_shards() -> None:
+                for alias in attached:
+                    connection.execute(
+                        f"INSERT INTO {PRODUCT_TABLE} ({_SEED_COLUMNS}) "
+                        f"SELECT {_SEED_COLUMNS} FROM {alias}.{PRODUCT_TABLE} ORDER BY ID"
+                    )
+
+            with connection:
+                _bulk_load_products(connection, merge_shards)
+        finally:
+            for alias in attached:
+                connection.execute(f"DETACH DATABASE {alias}")
+            connection.close()
 
 
 def initialize_database(db_path: str | Path = DATABASE_PATH, num_products: int = 10000) -> None:
@@ -309,12 +772,46 @@ if __name__ == "__main__":
         metavar="N",
         help="Number of demo rows to generate (default: 10 000). Requires --seed or --force-seed.",
     )
+    parser.add_argument(
+        "--seed-chunk-size",
+        type=int,
+        default=DEFAULT_SEED_CHUNK_SIZE,
+        metavar="N",
+        help="Rows generated and inserted per batch; bounds peak memory (default: 50 000).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Generate rows in N processes into temporary shards, then merge them (default: 1).",
+    )
+    parser.add_argument(
+        "--random-seed",
+        type=int,
+        default=None,
+        metavar="SEED",
+        help="Seed for the demo-data generator so runs are reproducible.",
+    )
     args = parser.parse_args()
 
     ensure_schema()
     print(f"Schema is up to date at {DATABASE_PATH}.")
 
     if args.seed or args.force_seed:
-        seed_database(num_products=args.seed_count, force=args.force_seed)
+        report = seed_database(
+            num_products=args.seed_count,
+            force=args.force_seed,
+            chunk_size=args.seed_chunk_size,
+            seed=args.random_seed,
+            workers=args.workers,
+        )
         print_sample_rows()
-        print(f"Demo data loaded into {DATABASE_PATH}.")
+        if report is None:
+            print(f"{PRODUCT_TABLE} already contains rows; use --force-seed to add more.")
+        else:
+            print(
+                f"Demo data loaded into {DATABASE_PATH}: {report.rows:,} rows in "
+                f"{report.seconds:.2f}s ({report.rows_per_second:,.0f} rows/sec, "
+                f"{report.workers} worker(s))."
+            )
@@ -2,23 +2,186 @@
 excel_processing.py
 
 This module handles the processing of uploaded Excel files and updates the database accordingly.
+CSV/TSV and Parquet uploads go through the same mapping, guardrail and audit path; see
+``upload_formats`` for how they are detected and streamed.
 """
 
+import hashlib
+import json
 import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
 import pandas as pd
 
 from audit import append_audit_event
+from coercion import coerce_frame, infer_sqlite_type, iter_records
+from database import INVENTORY_VALUE_COLUMN, clear_movement_reason, set_movement_reason
 from guardrails import (
+    DuplicateKeyViolation,
     GuardrailViolation,
+    ImportResumeConflict,
     enforce_destructive_action_policy,
     enforce_schema_change_policy,
     quote_identifier,
     review_column_mappings,
 )
+from mapping_memory import recall_mapping, remember_mapping
+from metrics import IMPORT_ROWS, IMPORT_SECONDS
 from prompt import get_column_mapping_prompt_metadata, get_gemini_response
+from stock_ledger import checkpoint_if_due
+from tracing import observe, span
+from upload_formats import (
+    EXCEL,
+    count_upload_rows,
+    iter_upload_chunks,
+    read_upload_sample,
+    sniff_upload_format,
+)
 from utils import _normalize_identifier, map_columns
 
+IMPORT_STATE_TABLE = "_import_state"
+_IMPORT_IN_PROGRESS = "in_progress"
+_IMPORT_COMPLETED = "completed"
+DIFF_SAMPLE_SIZE = 5
+DUPLICATES_LAST_WINS = "last"
+DUPLICATES_SUM_STOCK = "sum"
+DUPLICATES_REJECT = "reject"
+DUPLICATE_POLICIES = (DUPLICATES_LAST_WINS, DUPLICATES_SUM_STOCK, DUPLICATES_REJECT)
+
+
+@dataclass(frozen=True)
+class ImportState:
+    """Last committed batch of a checkpointed import, keyed by upload content."""
+
+    content_hash: str
+    action: str
+    duplicate_policy: str
+    rows_committed: int
+    total_rows: int | None
+    status: str
+    column_mappings: dict
+    updated_at: str
+
+
+_IMPORT_STATE_COLUMNS = (
+    "content_hash, action, duplicate_policy, rows_committed, total_rows, status, column_mappings, updated_at"
+)
+
+
+def _ensure_import_state_table(conn):
+    # Resume offsets count rows after duplicate consolidation, so the policy is part of the key.
+    existing = [row[1] for row in conn.execute(f"PRAGMA table_info({IMPORT_STATE_TABLE})")]
+    if existing and "duplicate_policy" not in existing:
+        conn.execute(f"ALTER TABLE {IMPORT_STATE_TABLE} RENAME TO {IMPORT_STATE_TABLE}_old")
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {IMPORT_STATE_TABLE} (
+            content_hash TEXT NOT NULL,
+            action TEXT NOT NULL,
+            duplicate_policy TEXT NOT NULL,
+            rows_committed INTEGER NOT NULL,
+            total_rows INTEGER,
+            status TEXT NOT NULL,
+            column_mappings TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (content_hash, action, duplicate_policy)
+        )
+        """
+    )
+    if existing and "duplicate_policy" not in existing:
+        # Checkpoints written before the policy was recorded used the default one.
+        conn.execute(
+            f"""
+            INSERT INTO {IMPORT_STATE_TABLE} ({_IMPORT_STATE_COLUMNS})
+            SELECT content_hash, action, ?, rows_committed, total_rows, status, column_mappings, updated_at
+            FROM {IMPORT_STATE_TABLE}_old
+            """,
+            (DUPLICATES_LAST_WINS,),
+        )
+        conn.execute(f"DROP TABLE {IMPORT_STATE_TABLE}_old")
+
+
+def _save_import_state(
+    conn, content_hash, action, duplicate_policy, rows_committed, total_rows, status, column_mappings
+):
+    _ensure_import_state_table(conn)
+    conn.execute(
+        f"""
+        INSERT INTO {IMPORT_STATE_TABLE} ({_IMPORT_STATE_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (content_hash, action, duplicate_policy) DO UPDATE SET
+            rows_committed = excluded.rows_committed,
+            total_rows = excluded.total_rows,
+            status = excluded.status,
+            column_mappings = excluded.column_mappings,
+            updated_at = excluded.updated_at
+        """,
+        (
+            content_hash,
+            action,
+            duplicate_policy,
+            rows_committed,
+            total_rows,
+            status,
+            json.dumps(column_mappings, sort_keys=True),
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    )
+
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def get_upload_content_hash(uploaded_file):
+    """Return the SHA-256 of an upload's bytes, or ``None`` if they cannot be read.
+
+    Seekable uploads are hashed in 1 MiB chunks so large files are never
+    copied into a second buffer.
+    """
+
+    digest = hashlib.sha256()
+    if hasattr(uploaded_file, "read") and hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+        while chunk := uploaded_file.read(_HASH_CHUNK_BYTES):
+            digest.update(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        uploaded_file.seek(0)
+    elif hasattr(uploaded_file, "getvalue"):
+        data = uploaded_file.getvalue()
+        digest.update(data.encode("utf-8") if isinstance(data, str) else data)
+    else:
+        return None
+    return digest.hexdigest()
+
+
+def get_import_state(db_path, content_hash, action, duplicate_policy=DUPLICATES_LAST_WINS):
+    """Return the checkpoint recorded for this upload, action and duplicate policy, if any."""
+
+    with sqlite3.connect(db_path) as conn:
+        _ensure_import_state_table(conn)
+        row = conn.execute(
+            f"""
+            SELECT {_IMPORT_STATE_COLUMNS}
+            FROM {IMPORT_STATE_TABLE}
+            WHERE content_hash = ? AND action = ? AND duplicate_policy = ?
+            """,
+            (content_hash, action, duplicate_policy),
+        ).fetchone()
+    if row is None:
+        return None
+    return ImportState(
+        content_hash=row[0],
+        action=row[1],
+        duplicate_policy=row[2],
+        rows_committed=row[3],
+        total_rows=row[4],
+        status=row[5],
+        column_mappings=json.loads(row[6]),
+        updated_at=row[7],
+    )
+
 
 def _read_excel_frame(uploaded_file):
     if hasattr(uploaded_file, "seek"):
@@ -26,161 +189,778 @@ def _read_excel_frame(uploaded_file):
     return pd.read_excel(uploaded_file)
 
 
-def preview_excel_import(uploaded_file, db_path, *, emit_audit_event=False):
-    """Return the AI-produced column mapping and any pending schema changes."""
+def _read_preview_frame(uploaded_file, upload_format):
+    if upload_format.streamed:
+        return read_upload_sample(uploaded_file, upload_format)
+    return _read_excel_frame(uploaded_file)
 
-    df = _read_excel_frame(uploaded_file)
 
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(PRODUCT)")
-        existing_columns = [info[1] for info in cursor.fetchall()]
-
-    column_mappings = map_columns(df.columns, existing_columns, get_gemini_response)
-    review = review_column_mappings(column_mappings, existing_columns)
-    preview = {
-        "dataframe": df,
-        "existing_columns": existing_columns,
-        "column_mappings": review.sanitized_mapping,
-        "proposed_new_columns": list(review.proposed_new_columns),
-        "review": review,
+def _coerced_chunks(chunks, column_mappings, column_types, stats=None):
+    """Convert each chunk's mapped columns to their PRODUCT types (see ``coercion``).
+
+    ``column_types`` maps PRODUCT columns to declared types; conversion failures
+    accumulate in ``stats["coercion_failures"]`` keyed by PRODUCT column.
+    """
+
+    header_types = {
+        header: column_types[target] for header, target in column_mappings.items() if target in column_types
     }
-    if emit_audit_event:
-        append_audit_event(
-            db_path,
-            "excel_import_preview",
-            {
-                **get_column_mapping_prompt_metadata(),
-                "action": None,
-                "uploaded_filename": getattr(uploaded_file, "name", None),
-                "column_mappings": review.sanitized_mapping,
-                "proposed_new_columns": list(review.proposed_new_columns),
-            },
+    failures = {}
+    for chunk in chunks:
+        yield coerce_frame(chunk, header_types, failures)
+        if stats is not None:
+            stats["coercion_failures"] = {column_mappings[header]: entry for header, entry in failures.items()}
+
+
+def _upload_chunks(uploaded_file, preview):
+    """Excel rows come from the preview's frame; CSV/TSV and Parquet uploads are
+    streamed from the file chunk by chunk because the preview holds only a sample."""
+
+    upload_format = preview.get("upload_format", EXCEL)
+    if upload_format.streamed:
+        return iter_upload_chunks(uploaded_file, upload_format)
+    return [preview["dataframe"]]
+
+
+def _iter_import_rows(uploaded_file, preview, duplicate_policy=None, stats=None, column_types=None):
+    """Yield ``(row_index, row)`` for every row of the upload.
+
+    Excel rows come from the preview's frame; CSV/TSV and Parquet uploads are
+    streamed from the file chunk by chunk because the preview holds only a sample.
+    With ``column_types`` each chunk is first converted in bulk to the PRODUCT
+    column types. With a ``duplicate_policy`` the rows are then consolidated by
+    product NAME (see ``_consolidate_rows``).
+    """
+
+    chunks = _upload_chunks(uploaded_file, preview)
+    if column_types is not None:
+        chunks = _coerced_chunks(chunks, preview["column_mappings"], column_types, stats)
+    if duplicate_policy is not None:
+        chunks = _consolidate_rows(chunks, preview["column_mappings"], duplicate_policy, stats)
+    else:
+        chunks = (row for chunk in chunks for row in iter_records(chunk))
+    yield from enumerate(chunks)
+
+
+def _mapped_header(column_mappings, target):
+    return next((header for header, mapped in column_mappings.items() if mapped == target), None)
+
+
+def find_duplicate_keys(frame, column_mappings):
+    """Return ``{NAME: occurrences}`` for product names the frame repeats."""
+
+    name_header = _mapped_header(column_mappings, "NAME")
+    if name_header is None:
+        return {}
+    if hasattr(frame, "value_counts") and hasattr(frame, "columns") and name_header in frame.columns:
+        counts = frame[name_header].value_counts(sort=False)
+        repeated = counts[counts > 1]
+        return {_sql_value(name): int(count) for name, count in repeated.items()}
+    counts = {}
+    for _, row in frame.iterrows():
+        counts[row[name_header]] = counts.get(row[name_header], 0) + 1
+    return {name: count for name, count in counts.items() if count > 1}
+
+
+def _add_stock(total, value):
+    if value is None or value != value:  # None or NaN adds nothing
+        return total
+    return value if total is None else total + value
+
+
+def _consolidate_rows(chunks, column_mappings, duplicate_policy, stats=None):
+    """Yield each chunk's rows with repeated product NAMEs consolidated.
+
+    Within a pandas chunk, repeats are folded with a vectorized group-by, so each
+    name is written once: ``last`` keeps the final row, ``sum`` keeps it with the
+    STOCK values summed, and ``reject`` raises ``DuplicateKeyViolation``. A name
+    that reappears in a later streamed chunk carries its running STOCK total
+    forward, so the sequential UPDATE still ends at the same result.
+    """
+
+    if duplicate_policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"duplicate_policy must be one of: {', '.join(DUPLICATE_POLICIES)}.")
+    name_header = _mapped_header(column_mappings, "NAME")
+    stock_header = _mapped_header(column_mappings, INVENTORY_VALUE_COLUMN)
+    stats = stats if stats is not None else {}
+    stats.setdefault("duplicate_rows", 0)
+    seen = {}  # product name -> STOCK written so far
+    for chunk in chunks:
+        if name_header is None:
+            yield from iter_records(chunk)
+            continue
+        if duplicate_policy == DUPLICATES_REJECT:
+            duplicates = find_duplicate_keys(chunk, column_mappings)
+            if duplicates:
+                raise DuplicateKeyViolation(duplicates)
+        if hasattr(chunk, "drop_duplicates"):
+            consolidated = chunk.drop_duplicates(subset=[name_header], keep="last")
+            if duplicate_policy == DUPLICATES_SUM_STOCK and stock_header is not None:
+                totals = chunk.groupby(name_header, sort=False)[stock_header].sum(min_count=1)
+                consolidated = consolidated.assign(**{stock_header: consolidated[name_header].map(totals)})
+            stats["duplicate_rows"] += len(chunk) - len(consolidated)
+            chunk = consolidated
+        for row in iter_records(chunk):
+            name = row[name_header]
+            if name in seen:
+                stats["duplicate_rows"] += 1
+                if duplicate_policy == DUPLICATES_REJECT:
+                    raise DuplicateKeyViolation({name: 2})
+                if duplicate_policy == DUPLICATES_SUM_STOCK and stock_header is not None:
+                    row = dict(row.items())
+                    row[stock_header] = _add_stock(seen[name], row[stock_header])
+            seen[name] = row[stock_header] if stock_header is not None else None
+            yield row
+
+
+def preview_excel_import(
+    uploaded_file,
+    db_path,
+    *,
+    emit_audit_event=False,
+    column_mappings=None,
+    cache=None,
+):
+    """Return the AI-produced column mapping and any pending schema changes.
+
+    For CSV/TSV and Parquet uploads ``dataframe`` holds only the first
+    ``upload_formats.PREVIEW_SAMPLE_ROWS`` rows; ``total_rows`` is the full
+    count when known.
+
+    Pass ``column_mappings`` to reuse a mapping that was already reviewed (for
+    example by a background job) instead of asking the model again; it is
+    still re-checked against the current schema.
+
+    Pass a ``preview_cache.PreviewCache`` as ``cache`` to look the upload up by
+    content hash and schema first and to store fresh previews for later
+    sessions.
+
+    Otherwise the mapping is recalled from ``mapping_memory`` when this header
+    layout was imported successfully before, and the model is asked only for
+    layouts it has not seen against the current schema.
+    """
+
+    uploaded_filename = getattr(uploaded_file, "name", None)
+    with span("preview_excel_import", uploaded_filename=uploaded_filename) as preview_span:
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA table_info(PRODUCT)")
+            declared_types = {info[1]: info[2] for info in cursor.fetchall()}
+        existing_columns = list(declared_types)
+        upload_format = sniff_upload_format(uploaded_file)
+        preview_span.set_attribute("upload_format", upload_format.name)
+
+        cache_key = None
+        cached = None
+        if cache is not None and column_mappings is None:
+            with span("preview_cache.lookup"):
+                content_hash = get_upload_content_hash(uploaded_file)
+                if content_hash is not None:
+                    cache_key = cache.key(content_hash, existing_columns)
+                    cached = cache.get(cache_key)
+            preview_span.set_attribute("preview_cache", "hit" if cached else "miss")
+
+        if cached is not None and cached.frame is not None:
+            df = cached.frame
+        else:
+            with span("parse_upload"):
+                df = _read_preview_frame(uploaded_file, upload_format)
+        if upload_format.streamed:
+            total_rows = count_upload_rows(uploaded_file, upload_format)
+        else:
+            try:
+                total_rows = len(df)
+            except TypeError:
+                total_rows = None
+        if total_rows is not None:
+            preview_span.count("rows", total_rows)
+
+        if cached is not None:
+            mapping_source = "cache"
+            column_mappings = cached.column_mappings
+        elif column_mappings is not None:
+            mapping_source = "provided"
+        else:
+            with span("mapping_memory.recall"):
+                column_mappings = recall_mapping(db_path, df.columns, existing_columns)
+            mapping_source = "memory"
+            if column_mappings is None:
+                mapping_source = "model"
+                with span("map_columns"):
+                    column_mappings = map_columns(df.columns, existing_columns, get_gemini_response)
+        preview_span.set_attribute("mapping_source", mapping_source)
+        review = review_column_mappings(column_mappings, existing_columns)
+        if cache_key is not None and cached is None:
+            with span("preview_cache.store"):
+                cache.put(cache_key, df, review.sanitized_mapping, uploaded_filename)
+        duplicate_keys = find_duplicate_keys(df, review.sanitized_mapping)
+        new_column_types = infer_new_column_types(df, review.sanitized_mapping, review.proposed_new_columns)
+        coercion_stats = {}
+        with span("coerce_preview"):
+            for _ in _coerced_chunks(
+                [df], review.sanitized_mapping, {**declared_types, **new_column_types}, coercion_stats
+            ):
+                pass
+        coercion_failures = coercion_stats.get("coercion_failures", {})
+        preview = {
+            "dataframe": df,
+            "upload_format": upload_format,
+            "total_rows": total_rows,
+            "existing_columns": existing_columns,
+            "column_mappings": review.sanitized_mapping,
+            "proposed_new_columns": list(review.proposed_new_columns),
+            "new_column_types": new_column_types,
+            "duplicate_keys": duplicate_keys,
+            "coercion_failures": coercion_failures,
+            "review": review,
+        }
+        if emit_audit_event:
+            append_audit_event(
+                db_path,
+                "excel_import_preview",
+                {
+                    **get_column_mapping_prompt_metadata(),
+                    "action": None,
+                    "uploaded_filename": uploaded_filename,
+                    "upload_format": upload_format.name,
+                    "column_mappings": review.sanitized_mapping,
+                    "proposed_new_columns": list(review.proposed_new_columns),
+                    "mapping_source": mapping_source,
+                    "duplicate_keys": len(duplicate_keys),
+                    "coercion_failures": {column: entry["failed"] for column, entry in coercion_failures.items()},
+                    **({"preview_cache": "hit" if cached else "miss"} if cache_key else {}),
+                },
+            )
+        return preview
+
+
+def import_movement_reason(action):
+    """Ledger reason for the stock movements an import with ``action`` writes."""
+
+    return f"import:{action}"
+
+
+def _new_column_type(normalized):
+    if normalized in {"ID", "STOCK", "QUANTITY", "COUNT"}:
+        return "INTEGER"
+    if normalized in {"PRICE", "WEIGHT", "COST", "AMOUNT"}:
+        return "REAL"
+    return "TEXT"
+
+
+def infer_new_column_types(frame, column_mappings, proposed_new_columns):
+    """Type each proposed column from the values mapped onto it, falling back to its name."""
+
+    types = {}
+    for db_col in proposed_new_columns:
+        normalized = _normalize_identifier(db_col)
+        header = _mapped_header(column_mappings, db_col)
+        inferred = None
+        if header is not None and hasattr(frame, "dtypes") and header in frame.columns:
+            inferred = infer_sqlite_type(frame[header])
+        types[normalized] = inferred or _new_column_type(normalized)
+    return types
+
+
+def _add_proposed_columns(cursor, existing_columns, proposed_new_columns, column_types=None):
+    existing = {_normalize_identifier(name): name for name in existing_columns}
+    column_types = column_types or {}
+    for db_col in proposed_new_columns:
+        normalized = _normalize_identifier(db_col)
+        if normalized not in existing:
+            column_type = column_types.get(normalized) or _new_column_type(normalized)
+            cursor.execute(f'ALTER TABLE PRODUCT ADD COLUMN "{normalized}" {column_type}')
+            existing[normalized] = normalized
+
+
+def _declared_types(cursor):
+    return {info[1]: info[2] for info in cursor.execute("PRAGMA table_info(PRODUCT)").fetchall()}
+
+
+def apply_import_rows(
+    connection,
+    action,
+    chunks,
+    column_mappings,
+    *,
+    existing_columns,
+    proposed_new_columns=(),
+    new_column_types=None,
+    duplicate_policy=DUPLICATES_LAST_WINS,
+    stats=None,
+    start_row=0,
+    on_row=None,
+):
+    """Write one sheet's rows to PRODUCT inside the caller's transaction.
+
+    Adds the approved ``proposed_new_columns``, converts each chunk to the
+    declared column types, consolidates repeated names per
+    ``duplicate_policy`` and applies ``action`` row by row. Rows before
+    ``start_row`` (counted after consolidation) are skipped, since a resumed
+    import committed them already. ``on_row(row_index)`` runs after each
+    applied row, for progress and batch commits. Returns the rows applied.
+
+    Guardrails, movement reasons and commits stay with the caller; both
+    ``process_excel_file`` and ``batch_import`` write through here.
+    """
+
+    cursor = connection.cursor()
+    # New columns go in through the same connection/transaction, so a failure while
+    # writing rows does not leave orphan columns behind.
+    _add_proposed_columns(cursor, existing_columns, proposed_new_columns, new_column_types)
+    coerced = _coerced_chunks(chunks, column_mappings, _declared_types(cursor), stats)
+    applied = 0
+    for row_index, row in enumerate(_consolidate_rows(coerced, column_mappings, duplicate_policy, stats)):
+        if row_index < start_row:
+            continue  # committed by an earlier, interrupted run
+        row_started = time.perf_counter()
+        _apply_row(cursor, action, _map_row(row, column_mappings, action))
+        applied += 1
+        observe("row_ms", (time.perf_counter() - row_started) * 1000)
+        if on_row is not None:
+            on_row(row_index)
+    return applied
+
+
+def _map_row(row, column_mappings, action):
+    unmapped = [str(col) for col in row.keys() if str(col) not in column_mappings]
+    if unmapped:
+        raise ValueError(
+            f"AI column mapping is incomplete — no mapping for: {', '.join(unmapped)}"
         )
-    return preview
+    mapped_row = {column_mappings[str(col)]: value for col, value in row.items()}
 
+    if "NAME" not in mapped_row:
+        raise ValueError(
+            f"Row is missing a NAME mapping; cannot determine which product to {action}."
+        )
+    return mapped_row
 
-def process_excel_file(
+
+def _apply_row(cursor, action, mapped_row):
+    if action == "remove":
+        cursor.execute(
+            f"DELETE FROM PRODUCT WHERE {quote_identifier('NAME')}=?",
+            (mapped_row.get('NAME'),),
+        )
+    elif action == "modify":
+        set_clause = ", ".join([f"{quote_identifier(col)}=?" for col in mapped_row.keys()])
+        values = tuple(mapped_row.values())
+        cursor.execute(
+            f"UPDATE PRODUCT SET {set_clause} WHERE {quote_identifier('NAME')}=?",
+            values + (mapped_row.get('NAME'),),
+        )
+    else:  # add action (or update if product exists)
+        cursor.execute(
+            f"SELECT * FROM PRODUCT WHERE {quote_identifier('NAME')}=?",
+            (mapped_row.get('NAME'),),
+        )
+        existing_product = cursor.fetchone()
+        if existing_product:
+            set_clause = ", ".join([f"{quote_identifier(col)}=?" for col in mapped_row.keys()])
+            values = tuple(mapped_row.values())
+            cursor.execute(
+                f"UPDATE PRODUCT SET {set_clause} WHERE {quote_identifier('NAME')}=?",
+                values + (mapped_row.get('NAME'),),
+            )
+        else:
+            columns = ", ".join(quote_identifier(col) for col in mapped_row.keys())
+            placeholders = ", ".join(["?" for _ in mapped_row])
+            values = tuple(mapped_row.values())
+            cursor.execute(f"INSERT INTO PRODUCT ({columns}) VALUES ({placeholders})", values)
+
+
+@dataclass
+class ImportDiff:
+    """What an import would change, computed without writing to PRODUCT."""
+
+    action: str
+    total_rows: int = 0
+    inserts: int = 0
+    updates: int = 0
+    unchanged: int = 0
+    deletes: int = 0
+    not_found: int = 0
+    duplicate_rows: int = 0
+    changed_columns: dict = field(default_factory=dict)
+    coercion_failures: dict = field(default_factory=dict)
+    samples: dict = field(
+        default_factory=lambda: {"inserts": [], "updates": [], "deletes": [], "not_found": []}
+    )
+
+    def counts(self):
+        return {
+            "total_rows": self.total_rows,
+            "inserts": self.inserts,
+            "updates": self.updates,
+            "unchanged": self.unchanged,
+            "deletes": self.deletes,
+            "not_found": self.not_found,
+            "duplicate_rows": self.duplicate_rows,
+            "changed_columns": dict(self.changed_columns),
+        }
+
+    def _sample(self, kind, sample, sample_size):
+        if len(self.samples[kind]) < sample_size:
+            self.samples[kind].append(sample)
+
+
+def _sql_value(value):
+    # numpy scalars expose .item(); sqlite3 only binds the Python builtins.
+    item = getattr(value, "item", None)
+    return item() if callable(item) else value
+
+
+def diff_excel_import(
     uploaded_file,
     db_path,
     action,
-    allow_schema_changes=False,
-    allow_destructive_actions=False,
     preview=None,
+    sample_size=DIFF_SAMPLE_SIZE,
+    duplicate_policy=DUPLICATES_LAST_WINS,
 ):
-    """
-    Processes an uploaded Excel file to update the PRODUCT table in the database.
+    """Return an ``ImportDiff`` describing what ``process_excel_file`` would do.
 
-    Args:
-        uploaded_file: The uploaded Excel file.
-        db_path (str): The path to the database.
-        action (str): The action to perform ("add", "remove", or "modify").
+    The mapped rows are staged in a temporary table whose columns carry the
+    PRODUCT column types, so values compare the way they would be stored. One
+    LEFT JOIN against PRODUCT on NAME classifies every staged row as an
+    insert or not-found row, and every matched PRODUCT row as an update (with
+    the changed columns), unchanged row or delete. Nothing is written to the
+    database.
     """
-    preview = preview or preview_excel_import(uploaded_file, db_path)
-    df = preview["dataframe"]
+
+    if preview is None:
+        preview = preview_excel_import(uploaded_file, db_path)
     column_mappings = preview["column_mappings"]
-    audit_details = {
-        **get_column_mapping_prompt_metadata(),
-        "action": action,
-        "uploaded_filename": getattr(uploaded_file, "name", None),
-        "column_mappings": column_mappings,
-        "proposed_new_columns": list(preview["proposed_new_columns"]),
-        "allow_schema_changes": allow_schema_changes,
-        "allow_destructive_actions": allow_destructive_actions,
-    }
-    processed_rows = 0
+    targets = list(dict.fromkeys(column_mappings.values()))
+    if "NAME" not in targets:
+        raise ValueError(f"Row is missing a NAME mapping; cannot determine which product to {action}.")
+    diff = ImportDiff(action=str(action))
+    import_stats = {}
 
-    try:
-        enforce_destructive_action_policy(
-            action,
-            allow_destructive_actions=allow_destructive_actions,
-        )
-        enforce_schema_change_policy(
-            preview["review"],
-            allow_schema_changes=allow_schema_changes,
+    with span("diff_excel_import", action=str(action)), closing(sqlite3.connect(db_path)) as conn:
+        column_types = _declared_types(conn)
+        stage_types = {**preview.get("new_column_types", {}), **column_types}
+        stage_columns = ", ".join(
+            f"{quote_identifier(col)} {stage_types.get(col) or _new_column_type(col)}" for col in targets
         )
+        conn.execute(f"CREATE TEMP TABLE _import_stage (row_index INTEGER PRIMARY KEY, {stage_columns})")
+        placeholders = ", ".join("?" for _ in range(len(targets) + 1))
+        staged_columns = ", ".join(quote_identifier(col) for col in targets)
 
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
+        def staged_rows():
+            rows = _iter_import_rows(uploaded_file, preview, duplicate_policy, import_stats, stage_types)
+            for row_index, row in rows:
+                mapped_row = _map_row(row, column_mappings, action)
+                yield (row_index, *(mapped_row.get(col) for col in targets))
 
-            # Add new columns within the same connection/transaction so that
-            # a failure during row processing does not leave the database with
-            # orphan columns added by a separate connection.
-            existing = {_normalize_identifier(name): name for name in preview["existing_columns"]}
-            for db_col in preview["proposed_new_columns"]:
-                normalized = _normalize_identifier(db_col)
-                if normalized not in existing:
-                    col_type = "TEXT"
-                    if normalized in {"ID", "STOCK", "QUANTITY", "COUNT"}:
-                        col_type = "INTEGER"
-                    elif normalized in {"PRICE", "WEIGHT", "COST", "AMOUNT"}:
-                        col_type = "REAL"
-                    cursor.execute(f'ALTER TABLE PRODUCT ADD COLUMN "{normalized}" {col_type}')
-                    existing[normalized] = normalized
-
-            # Process each row in the Excel file
-            for _, row in df.iterrows():
-                unmapped = [str(col) for col in row.keys() if str(col) not in column_mappings]
-                if unmapped:
-                    raise ValueError(
-                        f"AI column mapping is incomplete — no mapping for: {', '.join(unmapped)}"
-                    )
-                mapped_row = {column_mappings[str(col)]: value for col, value in row.items()}
+        with span("stage_rows"):
+            conn.executemany(
+                f"INSERT INTO temp._import_stage (row_index, {staged_columns}) VALUES ({placeholders})",
+                staged_rows(),
+            )
 
-                if "NAME" not in mapped_row:
-                    raise ValueError(
-                        f"Row is missing a NAME mapping; cannot determine which product to {action}."
-                    )
+        name = quote_identifier("NAME")
+        compared = [col for col in targets if col != "NAME"]
+        selects = [f"s.{name}", "p.rowid"]
+        for col in compared:
+            quoted = quote_identifier(col)
+            old = f"p.{quoted}" if col in column_types else "NULL"
+            selects += [old, f"s.{quoted}"]
+        query = (
+            f"SELECT s.row_index, {', '.join(selects)} FROM temp._import_stage AS s "
+            f"LEFT JOIN PRODUCT AS p ON p.{name} = s.{name} ORDER BY s.row_index"
+        )
 
+        seen_rows = set()
+        inserted_names = set()
+        deleted_rowids = set()
+        with span("join_product"):
+            for result in conn.execute(query):
+                row_index, product_name, product_rowid = result[0], result[1], result[2]
+                if row_index not in seen_rows:
+                    seen_rows.add(row_index)
+                    diff.total_rows += 1
+                elif product_rowid is None:
+                    continue
+                changes = {
+                    col: [result[3 + 2 * offset], result[4 + 2 * offset]]
+                    for offset, col in enumerate(compared)
+                    if result[3 + 2 * offset] != result[4 + 2 * offset]
+                    and not (result[3 + 2 * offset] is None and result[4 + 2 * offset] is None)
+                }
                 if action == "remove":
-                    cursor.execute(
-                        f"DELETE FROM PRODUCT WHERE {quote_identifier('NAME')}=?",
-                        (mapped_row.get('NAME'),),
-                    )
-                elif action == "modify":
-                    set_clause = ", ".join([f"{quote_identifier(col)}=?" for col in mapped_row.keys()])
-                    values = tuple(mapped_row.values())
-                    cursor.execute(
-                        f"UPDATE PRODUCT SET {set_clause} WHERE {quote_identifier('NAME')}=?",
-                        values + (mapped_row.get('NAME'),),
-                    )
-                else:  # add action (or update if product exists)
-                    cursor.execute(
-                        f"SELECT * FROM PRODUCT WHERE {quote_identifier('NAME')}=?",
-                        (mapped_row.get('NAME'),),
+                    if product_rowid is None:
+                        diff.not_found += 1
+                        diff._sample("not_found", {"NAME": product_name}, sample_size)
+                    elif product_rowid not in deleted_rowids:
+                        deleted_rowids.add(product_rowid)
+                        diff.deletes += 1
+                        diff._sample("deletes", {"NAME": product_name}, sample_size)
+                    continue
+                if product_rowid is None and action == "add" and product_name not in inserted_names:
+                    inserted_names.add(product_name)
+                    diff.inserts += 1
+                    diff._sample(
+                        "inserts",
+                        {"NAME": product_name, **{col: new for col, (_, new) in changes.items()}},
+                        sample_size,
                     )
-                    existing_product = cursor.fetchone()
-                    if existing_product:
-                        set_clause = ", ".join([f"{quote_identifier(col)}=?" for col in mapped_row.keys()])
-                        values = tuple(mapped_row.values())
-                        cursor.execute(
-                            f"UPDATE PRODUCT SET {set_clause} WHERE {quote_identifier('NAME')}=?",
-                            values + (mapped_row.get('NAME'),),
-                        )
-                    else:
-                        columns = ", ".join(quote_identifier(col) for col in mapped_row.keys())
-                        placeholders = ", ".join(["?" for _ in mapped_row])
-                        values = tuple(mapped_row.values())
-                        cursor.execute(f"INSERT INTO PRODUCT ({columns}) VALUES ({placeholders})", values)
-                processed_rows += 1
-        append_audit_event(
-            db_path,
-            "excel_import_processed",
-            {
-                **audit_details,
-                "processed_rows": processed_rows,
-                "status": "success",
-            },
-        )
-    except Exception as exc:
+                elif product_rowid is None and action == "add":
+                    # A repeat of a name inserted earlier in the same file updates that row.
+                    diff.updates += 1
+                elif product_rowid is None:
+                    diff.not_found += 1
+                    diff._sample("not_found", {"NAME": product_name}, sample_size)
+                elif changes:
+                    diff.updates += 1
+                    for col in changes:
+                        diff.changed_columns[col] = diff.changed_columns.get(col, 0) + 1
+                    diff._sample("updates", {"NAME": product_name, "changes": changes}, sample_size)
+                else:
+                    diff.unchanged += 1
+    diff.duplicate_rows = import_stats.get("duplicate_rows", 0)
+    diff.coercion_failures = import_stats.get("coercion_failures", {})
+    return diff
+
+
+def process_excel_file(
+    uploaded_file,
+    db_path,
+    action,
+    allow_schema_changes=False,
+    allow_destructive_actions=False,
+    preview=None,
+    progress_callback=None,
+    batch_size=None,
+    dry_run=False,
+    duplicate_policy=DUPLICATES_LAST_WINS,
+):
+    """
+    Processes an uploaded file to update the PRODUCT table in the database.
+
+    Args:
+        uploaded_file: The uploaded Excel, CSV/TSV or Parquet file. CSV/TSV and
+            Parquet rows are streamed in chunks rather than loaded at once.
+        db_path (str): The path to the database.
+        action (str): The action to perform ("add", "remove", or "modify").
+        progress_callback: Optional ``callback(processed_rows, total_rows)`` called
+            after each row; ``total_rows`` is ``None`` when the frame has no length.
+        batch_size (int | None): Commit every ``batch_size`` rows and checkpoint the
+            progress under the upload's content hash. A retry of the same file, action
+            and ``duplicate_policy`` resumes after the last committed batch, reusing the
+            recorded column mapping; a ``preview`` with a different mapping raises
+            ``ImportResumeConflict``. ``None`` applies the whole file in one transaction.
+        duplicate_policy (str): How rows repeating a product NAME are consolidated before
+            they are written: ``"last"`` (last row wins), ``"sum"`` (last row wins, STOCK
+            values summed) or ``"reject"`` (raise ``DuplicateKeyViolation``).
+        dry_run (bool): Compute what the import would change instead of applying it.
+            Approvals are not required, so operators can review a destructive import
+            before approving it.
+
+    Returns:
+        int: The number of spreadsheet rows applied by this call, or an ``ImportDiff``
+        when ``dry_run`` is set.
+    """
+    if dry_run:
+        diff = diff_excel_import(uploaded_file, db_path, action, preview=preview, duplicate_policy=duplicate_policy)
         append_audit_event(
             db_path,
-            "excel_import_processed",
+            "excel_import_dry_run",
             {
-                **audit_details,
-                "processed_rows": processed_rows,
-                "status": "blocked" if isinstance(exc, GuardrailViolation) else "failed",
-                "error": str(exc),
+                **get_column_mapping_prompt_metadata(),
+                "action": action,
+                "uploaded_filename": getattr(uploaded_file, "name", None),
+                **diff.counts(),
+                "coercion_failures": diff.coercion_failures,
             },
         )
-        raise
+        return diff
+
+    content_hash = None
+    resume_state = None
+    if batch_size is not None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        content_hash = get_upload_content_hash(uploaded_file)
+        if content_hash is None:
+            raise ValueError("Checkpointed imports need an upload whose bytes can be read.")
+        resume_state = get_import_state(db_path, content_hash, action, duplicate_policy)
+        if resume_state is not None and resume_state.status == _IMPORT_COMPLETED:
+            resume_state = None  # uploading a finished file again applies it again
+
+    with (
+        span("process_excel_file", action=str(action)) as process_span,
+        IMPORT_SECONDS.time(action=str(action)) as import_labels,
+    ):
+        if preview is None:
+            preview = preview_excel_import(
+                uploaded_file,
+                db_path,
+                column_mappings=resume_state.column_mappings if resume_state else None,
+            )
+        df = preview["dataframe"]
+        column_mappings = preview["column_mappings"]
+        audit_details = {
+            **get_column_mapping_prompt_metadata(),
+            "action": action,
+            "uploaded_filename": getattr(uploaded_file, "name", None),
+            "upload_format": preview.get("upload_format", EXCEL).name,
+            "column_mappings": column_mappings,
+            "proposed_new_columns": list(preview["proposed_new_columns"]),
+            "allow_schema_changes": allow_schema_changes,
+            "allow_destructive_actions": allow_destructive_actions,
+            "duplicate_policy": duplicate_policy,
+        }
+        start_row = resume_state.rows_committed if resume_state else 0
+        if batch_size is not None:
+            audit_details.update(
+                {"content_hash": content_hash, "batch_size": batch_size, "resumed_from_row": start_row}
+            )
+        committed_rows = start_row
+        import_stats = {}
+        processed_rows = 0
+        if "total_rows" in preview:
+            total_rows = preview["total_rows"]
+        else:
+            try:
+                total_rows = len(df)
+            except TypeError:
+                total_rows = None
+
+        try:
+            enforce_destructive_action_policy(
+                action,
+                allow_destructive_actions=allow_destructive_actions,
+            )
+            enforce_schema_change_policy(
+                preview["review"],
+                allow_schema_changes=allow_schema_changes,
+            )
+            if resume_state is not None and column_mappings != resume_state.column_mappings:
+                raise ImportResumeConflict(resume_state.column_mappings, column_mappings)
+
+            with sqlite3.connect(db_path) as conn:
+                # STOCK changes land in the ledger through triggers; label them as this import's.
+                set_movement_reason(conn, import_movement_reason(action))
+
+                def on_row(row_index):
+                    nonlocal processed_rows, committed_rows
+                    processed_rows += 1
+                    if progress_callback is not None:
+                        progress_callback(start_row + processed_rows, total_rows)
+                    if batch_size is not None and (row_index + 1) % batch_size == 0:
+                        committed_rows = _commit_import_batch(
+                            conn, db_path, audit_details, row_index + 1, total_rows, column_mappings
+                        )
+
+                apply_import_rows(
+                    conn,
+                    action,
+                    _upload_chunks(uploaded_file, preview),
+                    column_mappings,
+                    existing_columns=preview["existing_columns"],
+                    proposed_new_columns=preview["proposed_new_columns"],
+                    new_column_types=preview.get("new_column_types"),
+                    duplicate_policy=duplicate_policy,
+                    stats=import_stats,
+                    start_row=start_row,
+                    on_row=on_row,
+                )
+                clear_movement_reason(conn)
+                if batch_size is not None:
+                    _save_import_state(
+                        conn,
+                        content_hash,
+                        action,
+                        duplicate_policy,
+                        start_row + processed_rows,
+                        total_rows,
+                        _IMPORT_COMPLETED,
+                        column_mappings,
+                    )
+                    if start_row + processed_rows > committed_rows:
+                        conn.commit()
+                        committed_rows = _audit_import_batch(
+                            db_path, audit_details, start_row + processed_rows, total_rows
+                        )
+                # Remember the accepted mapping in the same transaction as the
+                # rows, so only layouts that imported cleanly are recalled.
+                remember_mapping(
+                    conn,
+                    df.columns,
+                    preview["existing_columns"],
+                    column_mappings,
+                    source=getattr(uploaded_file, "name", None),
+                )
+            process_span.count("rows", processed_rows)
+            with span("stock_ledger.checkpoint"):
+                checkpoint_if_due(db_path)
+            import_labels["status"] = "success"
+            IMPORT_ROWS.inc(processed_rows, action=str(action), status="success")
+            append_audit_event(
+                db_path,
+                "excel_import_processed",
+                {
+                    **audit_details,
+                    "processed_rows": processed_rows,
+                    "duplicate_rows": import_stats.get("duplicate_rows", 0),
+                    "coercion_failures": import_stats.get("coercion_failures", {}),
+                    "status": "success",
+                },
+            )
+            return processed_rows
+        except Exception as exc:
+            status = "blocked" if isinstance(exc, GuardrailViolation) else "failed"
+            import_labels["status"] = status
+            IMPORT_ROWS.inc(processed_rows, action=str(action), status=status)
+            append_audit_event(
+                db_path,
+                "excel_import_processed",
+                {
+                    **audit_details,
+                    "processed_rows": processed_rows,
+                    "duplicate_rows": import_stats.get("duplicate_rows", 0),
+                    "coercion_failures": import_stats.get("coercion_failures", {}),
+                    **({"rows_committed": committed_rows} if batch_size is not None else {}),
+                    "status": status,
+                    "error": str(exc),
+                },
+            )
+            raise
+
+
+def _commit_import_batch(conn, db_path, audit_details, rows_committed, total_rows, column_mappings):
+    """Checkpoint and commit the rows applied so far, then audit the batch."""
+
+    _save_import_state(
+        conn,
+        audit_details["content_hash"],
+        audit_details["action"],
+        audit_details["duplicate_policy"],
+        rows_committed,
+        total_rows,
+        _IMPORT_IN_PROGRESS,
+        column_mappings,
+    )
+    clear_movement_reason(conn)
+    conn.commit()
+    set_movement_reason(conn, import_movement_reason(audit_details["action"]))
+    return _audit_import_batch(db_path, audit_details, rows_committed, total_rows)
+
+
+def _audit_import_batch(db_path, audit_details, rows_committed, total_rows):
+    batch_size = audit_details["batch_size"]
+    append_audit_event(
+        db_path,
+        "excel_import_batch",
+        {
+            "action": audit_details["action"],
+            "uploaded_filename": audit_details["uploaded_filename"],
+            "content_hash": audit_details["content_hash"],
+            "batch_index": (rows_committed - 1) // batch_size,
+            "rows_committed": rows_committed,
+            "total_rows": total_rows,
+        },
+    )
+    return rows_committed
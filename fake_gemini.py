@@ -0,0 +1,202 @@
+"""Offline stand-in for ``google.generativeai`` with realistic timing.
+
+Set ``INVENTORY_GEMINI_BACKEND=fake`` and ``prompt`` and ``analytics`` use
+this module instead of the SDK. No API key or network is needed, and no quota
+is spent. It exposes the SDK surface the app uses (``configure`` and
+``GenerativeModel.generate_content`` with or without ``stream=True``).
+Answers are templated by prompt kind:
+
+* SQL generation returns the deterministic SQL for the question.
+* Column mapping returns the fuzzy-matched mapping as JSON.
+* Bulk categorization returns one category per product as a JSON array.
+* Analytics prompts return a short summary quoting the figures they were given.
+
+Latency is drawn from a log-normal distribution set by its median and 95th
+percentile (``FAKE_GEMINI_LATENCY_MS="median,p95"``, or a single number for a
+fixed delay). A fraction ``FAKE_GEMINI_ERROR_RATE`` of requests fails with a
+503 or 429 error named like ``google.api_core``'s, so the retry and circuit
+breaker paths run too. ``FAKE_GEMINI_SEED`` makes the draws repeatable.
+Streams yield words in a few chunks. The first arrives after
+``FAKE_GEMINI_FIRST_CHUNK`` of the total latency (default 0.3).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+LATENCY_ENV = "FAKE_GEMINI_LATENCY_MS"
+ERROR_RATE_ENV = "FAKE_GEMINI_ERROR_RATE"
+SEED_ENV = "FAKE_GEMINI_SEED"
+FIRST_CHUNK_ENV = "FAKE_GEMINI_FIRST_CHUNK"
+
+DEFAULT_LATENCY_MS = (600.0, 2000.0)
+DEFAULT_FIRST_CHUNK = 0.3
+STREAM_CHUNKS = 8
+FALLBACK_CATEGORY = "General"
+_Z_95 = 1.645
+
+
+class ServiceUnavailable(Exception):
+    """Mirrors ``google.api_core.exceptions.ServiceUnavailable``."""
+
+    code = 503
+
+
+class ResourceExhausted(Exception):
+    """Mirrors ``google.api_core.exceptions.ResourceExhausted`` (quota exceeded)."""
+
+    code = 429
+
+
+@dataclass(frozen=True)
+class FakeSettings:
+    median_ms: float = DEFAULT_LATENCY_MS[0]
+    p95_ms: float = DEFAULT_LATENCY_MS[1]
+    error_rate: float = 0.0
+    first_chunk: float = DEFAULT_FIRST_CHUNK
+    seed: int | None = None
+
+    @classmethod
+    def from_env(cls) -> FakeSettings:
+        latency = [float(part) for part in os.getenv(LATENCY_ENV, "").split(",") if part.strip()]
+        median, p95 = (latency + latency[-1:])[:2] if latency else DEFAULT_LATENCY_MS
+        seed = os.getenv(SEED_ENV)
+        return cls(
+            median_ms=median,
+            p95_ms=max(p95, median),
+            error_rate=float(os.getenv(ERROR_RATE_ENV) or 0.0),
+            first_chunk=float(os.getenv(FIRST_CHUNK_ENV) or DEFAULT_FIRST_CHUNK),
+            seed=int(seed) if seed else None,
+        )
+
+
+_settings: FakeSettings | None = None
+_random = random.Random()
+_lock = threading.Lock()
+
+
+def settings() -> FakeSettings:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = FakeSettings.from_env()
+            _random.seed(_settings.seed)
+        return _settings
+
+
+def reset(new_settings: FakeSettings | None = None) -> None:
+    """Replace the active settings (``None`` re-reads the environment on next use)."""
+
+    global _settings
+    with _lock:
+        _settings = new_settings
+        if new_settings is not None:
+            _random.seed(new_settings.seed)
+
+
+def configure(*args: Any, **kwargs: Any) -> None:
+    """Accepts and ignores ``api_key`` and friends, like ``genai.configure``."""
+
+
+def _draw() -> tuple[float, bool]:
+    """Return ``(latency seconds, fails)`` for one request."""
+
+    active = settings()
+    with _lock:
+        if active.median_ms <= 0:
+            latency_ms = 0.0
+        else:
+            sigma = math.log(active.p95_ms / active.median_ms) / _Z_95
+            latency_ms = active.median_ms * math.exp(_random.gauss(0.0, sigma))
+        fails = _random.random() < active.error_rate
+    return latency_ms / 1000, fails
+
+
+def _error() -> Exception:
+    with _lock:
+        quota = _random.random() < 0.5
+    return ResourceExhausted("429 Quota exceeded (fake)") if quota else ServiceUnavailable(
+        "503 The model is overloaded (fake)"
+    )
+
+
+def _categorize(prompt: str) -> str:
+    known_match = re.search(r"Known categories: (.*)", prompt)
+    products_match = re.search(r"Products \(JSON\): (.*)", prompt)
+    known = [] if not known_match else [name.strip() for name in known_match.group(1).split(",")]
+    known = [name for name in known if name and name != "(none yet)"]
+    items = json.loads(products_match.group(1)) if products_match else []
+    answers = []
+    for item in items:
+        text = f"{item.get('name', '')} {item.get('description', '')}".lower()
+        category = next((name for name in known if name.lower() in text), None)
+        answers.append({"id": item.get("id"), "category": category or FALLBACK_CATEGORY})
+    return json.dumps(answers)
+
+
+def _summarize(prompt: str) -> str:
+    figure_line = re.compile(r"^-? ?[A-Z][\w -]+: \S")
+    figures = [line.strip("- ").strip() for line in prompt.splitlines() if figure_line.match(line)]
+    quoted = "; ".join(figures[:4]) if figures else "the inventory data provided"
+    return (
+        f"Summary (offline fake model): based on {quoted}, review the lowest-stock "
+        "products first and confirm replenishment for anything at risk."
+    )
+
+
+def respond(prompt: str) -> str:
+    """Return the templated answer for ``prompt``."""
+
+    import prompt as prompt_module
+
+    lowered = prompt.lower()
+    if "excel columns" in lowered and "database columns" in lowered:
+        return prompt_module._fallback_column_mapping(prompt)
+    if "generate a single sql query" in lowered:
+        question = re.search(r"Question: (.*)", prompt)
+        return prompt_module._fallback_sql(question.group(1) if question else prompt)
+    if "you categorize inventory products" in lowered:
+        return _categorize(prompt)
+    return _summarize(prompt)
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GenerativeModel:
+    def __init__(self, model_name: str = "fake", *args: Any, **kwargs: Any):
+        self.model_name = model_name
+
+    def generate_content(self, contents: Any, *, stream: bool = False, **kwargs: Any):
+        latency, fails = _draw()
+        if stream:
+            return self._stream(str(contents), latency, fails)
+        time.sleep(latency)
+        if fails:
+            raise _error()
+        return FakeResponse(respond(str(contents)))
+
+    def _stream(self, prompt: str, latency: float, fails: bool) -> Iterator[FakeResponse]:
+        first = latency * settings().first_chunk
+        time.sleep(first)
+        if fails:
+            raise _error()
+        words = re.split(r"(?<=\s)", respond(prompt))
+        size = max(1, math.ceil(len(words) / STREAM_CHUNKS))
+        chunks = ["".join(words[start:start + size]) for start in range(0, len(words), size)]
+        pause = (latency - first) / max(1, len(chunks) - 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(pause)
+            yield FakeResponse(chunk)
@@ -0,0 +1,176 @@
+"""Stock-out forecasts for the whole catalog from the STOCK_MOVEMENT ledger.
+
+Outflow (the consuming movements in ``STOCK_MOVEMENT``, see ``daily_outflow``)
+is bucketed per product and day in one indexed query and scattered into a
+products x days NumPy matrix. Simple exponential smoothing then reduces to one matrix-vector
+product with the smoothing weights. That gives every product's consumption
+rate, plus an exponentially weighted spread for safety stock, in a single
+batch. Days to stock-out and reorder points follow elementwise. The result is
+deterministic and covers every SKU; ``analytics.predict_stock_needs`` only
+asks the model to summarize it.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from database import (
+    INVENTORY_VALUE_COLUMN,
+    STOCK_MOVEMENT_TABLE,
+    has_stock_ledger,
+    outflow_condition_sql,
+)
+
+DEFAULT_HISTORY_DAYS = 90
+DEFAULT_SMOOTHING = 0.3
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_HORIZON_DAYS = 30
+SERVICE_LEVEL_Z = 1.65  # ~95% of lead-time demand is covered by the safety stock
+MAX_STOCKOUT_DAYS = 36_500  # later stock-outs (and never) get no STOCKOUT_DATE
+
+FORECAST_COLUMNS = (
+    "ID",
+    "NAME",
+    INVENTORY_VALUE_COLUMN,
+    "DAILY_RATE",
+    "DAYS_TO_STOCKOUT",
+    "STOCKOUT_DATE",
+    "REORDER_POINT",
+    "AT_RISK",
+)
+
+
+def _utc(moment: datetime) -> datetime:
+    # Naive datetimes are taken as UTC, like the ledger's timestamps.
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _ledger_day(moment: datetime) -> str:
+    return _utc(moment).strftime("%Y-%m-%d")
+
+
+def daily_outflow(
+    db_path: str | Path,
+    product_ids: Any,
+    *,
+    days: int = DEFAULT_HISTORY_DAYS,
+    until: datetime | None = None,
+) -> np.ndarray:
+    """Return a ``len(product_ids) x days`` matrix of units taken out of stock per day.
+
+    The last column is the day of ``until`` (default: today, UTC). Outflow is
+    what ``database.outflow_condition_sql`` selects: negative movements other
+    than deletions, imports and recounts, which set levels rather than
+    consume stock. Products and days without outflow are zero, as is
+    everything for databases without the ledger.
+    """
+
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    outflow = np.zeros((len(product_ids), days))
+    if not len(product_ids) or days <= 0:
+        return outflow
+    until = until or datetime.now(timezone.utc)
+    first_day = np.datetime64(_ledger_day(until - timedelta(days=days - 1)), "D")
+    with closing(sqlite3.connect(db_path)) as connection:
+        if not has_stock_ledger(connection):
+            return outflow
+        rows = connection.execute(
+            f"""
+            SELECT PRODUCT_ID, substr(MOVED_AT, 1, 10) AS DAY, -SUM(DELTA)
+            FROM {STOCK_MOVEMENT_TABLE}
+            WHERE MOVED_AT >= ? AND MOVED_AT < ? AND {outflow_condition_sql()}
+            GROUP BY PRODUCT_ID, DAY
+            """,
+            (str(first_day), _ledger_day(until + timedelta(days=1))),
+        ).fetchall()
+    if not rows:
+        return outflow
+    ids, day_labels, units = zip(*rows)
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(product_ids)
+    positions = np.searchsorted(product_ids, ids, sorter=order)
+    positions = np.minimum(positions, len(product_ids) - 1)
+    rows_index = order[positions]
+    known = product_ids[rows_index] == ids  # movements of deleted products are dropped
+    day_index = (np.asarray(day_labels, dtype="datetime64[D]") - first_day).astype(np.int64)
+    np.add.at(outflow, (rows_index[known], day_index[known]), np.asarray(units, dtype=float)[known])
+    return outflow
+
+
+def smoothing_weights(days: int, alpha: float = DEFAULT_SMOOTHING) -> np.ndarray:
+    """Weights that turn a daily series into its simple-exponential-smoothing level.
+
+    Equivalent to ``level = alpha * x_t + (1 - alpha) * level`` seeded with
+    the first day, so the weights sum to one.
+    """
+
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1].")
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+    if days:
+        weights[0] = (1 - alpha) ** (days - 1)
+    return weights
+
+
+def forecast_stock_needs(
+    df: Any,
+    db_path: str | Path | None = None,
+    *,
+    history_days: int = DEFAULT_HISTORY_DAYS,
+    alpha: float = DEFAULT_SMOOTHING,
+    lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    until: datetime | None = None,
+):
+    """Rank every product in ``df`` (needs ``ID`` and ``STOCK``) by days to stock-out.
+
+    ``DAILY_RATE`` is the smoothed outflow per day and ``REORDER_POINT`` is
+    lead-time demand plus safety stock. ``AT_RISK`` flags products that run
+    out within ``horizon_days`` or sit at or below their reorder point.
+    Products with no outflow never run out (``DAYS_TO_STOCKOUT`` is infinite)
+    unless they are already at zero.
+    """
+
+    import pandas as pd
+
+    product_ids = pd.to_numeric(df["ID"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+    stock = pd.to_numeric(df[INVENTORY_VALUE_COLUMN], errors="coerce").fillna(0).to_numpy(dtype=float)
+    until = until or datetime.now(timezone.utc)
+    if db_path is None:
+        outflow = np.zeros((len(product_ids), history_days))
+    else:
+        outflow = daily_outflow(db_path, product_ids, days=history_days, until=until)
+
+    weights = smoothing_weights(history_days, alpha)
+    rate = outflow @ weights
+    spread = np.sqrt(((outflow - rate[:, None]) ** 2) @ weights)
+    reorder_point = rate * lead_time_days + SERVICE_LEVEL_Z * spread * np.sqrt(lead_time_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(stock <= 0, 0.0, np.where(rate > 0, stock / rate, np.inf))
+    dated = days_left <= MAX_STOCKOUT_DAYS
+    offsets = np.where(dated, np.floor(days_left), 0).astype("timedelta64[D]")
+    offsets[~dated] = np.timedelta64("NaT")
+    stockout = pd.Timestamp(_utc(until)).tz_convert(None).normalize() + pd.to_timedelta(offsets)
+    names = df["NAME"] if "NAME" in df.columns else pd.Series([None] * len(df), index=df.index)
+    forecast = pd.DataFrame(
+        {
+            "ID": product_ids,
+            "NAME": names.to_numpy(),
+            INVENTORY_VALUE_COLUMN: stock,
+            "DAILY_RATE": rate.round(3),
+            "DAYS_TO_STOCKOUT": days_left.round(1),
+            "STOCKOUT_DATE": stockout.date,
+            "REORDER_POINT": np.ceil(reorder_point),
+            "AT_RISK": (days_left <= horizon_days) | ((stock <= reorder_point) & (rate > 0)),
+        },
+        columns=list(FORECAST_COLUMNS),
+    )
+    return forecast.sort_values(["DAYS_TO_STOCKOUT", "NAME"], kind="stable").reset_index(drop=True)
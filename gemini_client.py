@@ -0,0 +1,376 @@
+"""Shared guard around every Gemini request: rate limit, retries and a circuit breaker.
+
+All sessions of an app process share one ``GeminiGateway``. Each request
+first takes a token from a process-wide token bucket, so concurrent sessions
+queue instead of bursting past the quota together. Errors that are worth
+retrying (rate limiting, 5xx, timeouts, dropped connections) are retried a
+bounded number of times with full-jitter exponential backoff. Consecutive
+failures open a circuit breaker. While it is open, requests fail fast with
+``GeminiUnavailable`` and callers use their deterministic fallbacks instead
+of waiting on a dead backend. After a cool-down, one probe request is let
+through to decide whether to close it again.
+
+Limits come from the environment (``GEMINI_REQUESTS_PER_SECOND``,
+``GEMINI_MAX_ATTEMPTS``, ``GEMINI_CIRCUIT_FAILURES``,
+``GEMINI_CIRCUIT_RESET_SECONDS``) when the shared gateway is first used.
+
+``load_sdk`` picks the backend: the real SDK, or ``fake_gemini`` when
+``INVENTORY_GEMINI_BACKEND=fake`` (offline tests, benchmarks and load runs).
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from metrics import REGISTRY
+
+T = TypeVar("T")
+
+BACKEND_ENV = "INVENTORY_GEMINI_BACKEND"
+GEMINI_BACKEND = "gemini"
+FAKE_BACKEND = "fake"
+REQUESTS_PER_SECOND_ENV = "GEMINI_REQUESTS_PER_SECOND"
+MAX_ATTEMPTS_ENV = "GEMINI_MAX_ATTEMPTS"
+CIRCUIT_FAILURES_ENV = "GEMINI_CIRCUIT_FAILURES"
+CIRCUIT_RESET_SECONDS_ENV = "GEMINI_CIRCUIT_RESET_SECONDS"
+
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_CIRCUIT_FAILURES = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+DEFAULT_RATE_LIMIT_TIMEOUT = 30.0
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# google.api_core exception names (and HTTP codes) that mean "try again later".
+_RETRYABLE_ERROR_NAMES = frozenset(
+    {
+        "ResourceExhausted",
+        "TooManyRequests",
+        "ServiceUnavailable",
+        "InternalServerError",
+        "DeadlineExceeded",
+        "GatewayTimeout",
+        "Aborted",
+    }
+)
+_RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+GEMINI_CIRCUIT_STATE = REGISTRY.gauge(
+    "inventory_gemini_circuit_state",
+    "Gemini circuit breaker state: 0 closed, 1 half-open, 2 open.",
+)
+GEMINI_CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "inventory_gemini_circuit_transitions_total",
+    "Gemini circuit breaker state changes, by new state.",
+    ("state",),
+)
+GEMINI_REJECTED = REGISTRY.counter(
+    "inventory_gemini_rejected_total",
+    "Gemini requests refused without being sent, by caller and reason.",
+    ("caller", "reason"),
+)
+GEMINI_RETRIES = REGISTRY.counter(
+    "inventory_gemini_retries_total",
+    "Gemini requests retried after a retryable error, by caller and error.",
+    ("caller", "error"),
+)
+GEMINI_RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "inventory_gemini_rate_limit_wait_seconds",
+    "Time Gemini requests waited for a rate-limiter token.",
+    ("caller",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class GeminiUnavailable(RuntimeError):
+    """Raised instead of calling Gemini while the circuit is open or the rate limit is saturated."""
+
+
+def backend_name() -> str:
+    """Return ``"fake"`` when ``INVENTORY_GEMINI_BACKEND=fake``, else ``"gemini"``."""
+
+    return FAKE_BACKEND if os.getenv(BACKEND_ENV, "").strip().lower() == FAKE_BACKEND else GEMINI_BACKEND
+
+
+def load_sdk() -> Any:
+    """Import the generative backend module: ``google.generativeai`` or ``fake_gemini``."""
+
+    if backend_name() == FAKE_BACKEND:
+        import fake_gemini
+
+        return fake_gemini
+    import google.generativeai as genai
+
+    return genai
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by concurrent model requests."""
+
+    def __init__(self, rate_per_second: float, capacity: float | None = None):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate = float(rate_per_second)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate_per_second))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """Block until ``tokens`` are available, then consume them.
+
+        Returns ``False`` without consuming anything if that would take longer
+        than ``timeout`` seconds.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; probes again after ``reset_seconds``."""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_CIRCUIT_FAILURES,
+        reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        self._probing = False
+        GEMINI_CIRCUIT_STATE.set(_STATE_VALUES[state])
+        GEMINI_CIRCUIT_TRANSITIONS.inc(state=state)
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent now; half-open lets one probe through."""
+
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._transition(CLOSED)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot that was admitted but never sent."""
+
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+                self._opened_at = self._clock()
+            self._probing = False
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether ``exc`` is a transient Gemini/transport error worth retrying."""
+
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(exc).__mro__):
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code in _RETRYABLE_STATUS_CODES
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number ``attempt`` (1-based)."""
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class GeminiGateway:
+    """Runs Gemini requests behind a rate limiter, retries and a circuit breaker."""
+
+    def __init__(
+        self,
+        *,
+        limiter: TokenBucket | None = None,
+        breaker: CircuitBreaker | None = None,
+        retry: RetryPolicy | None = None,
+        rate_limit_timeout: float = DEFAULT_RATE_LIMIT_TIMEOUT,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.limiter = limiter or TokenBucket(DEFAULT_REQUESTS_PER_SECOND)
+        self.breaker = breaker or CircuitBreaker()
+        self.retry = retry or RetryPolicy()
+        self.rate_limit_timeout = rate_limit_timeout
+        self._sleep = sleep
+
+    def _admit(self, caller: str) -> None:
+        if not self.breaker.allow():
+            GEMINI_REJECTED.inc(caller=caller, reason="circuit_open")
+            raise GeminiUnavailable("Gemini is unavailable (circuit open); try again shortly.")
+        started = time.perf_counter()
+        acquired = self.limiter.acquire(timeout=self.rate_limit_timeout)
+        GEMINI_RATE_LIMIT_WAIT_SECONDS.observe(time.perf_counter() - started, caller=caller)
+        if not acquired:
+            self.breaker.release_probe()
+            GEMINI_REJECTED.inc(caller=caller, reason="rate_limited")
+            raise GeminiUnavailable("Gemini request rate limit saturated; try again shortly.")
+
+    def _record_error(self, exc: Exception) -> bool:
+        """Feed ``exc`` to the breaker; returns whether it was a transient error."""
+
+        if is_retryable(exc):
+            self.breaker.record_failure()
+            return True
+        # Rejected requests (bad prompt, safety block, bad key, ...) say nothing about the
+        # backend's health either way, so the breaker keeps its state and failure count.
+        self.breaker.release_probe()
+        return False
+
+    def _should_retry(self, exc: Exception, attempt: int, caller: str) -> bool:
+        if not self._record_error(exc) or attempt >= self.retry.max_attempts:
+            return False
+        if self.breaker.state != CLOSED:
+            return False
+        GEMINI_RETRIES.inc(caller=caller, error=type(exc).__name__)
+        self._sleep(self.retry.delay(attempt))
+        return True
+
+    def call(self, request: Callable[[], T], *, caller: str) -> T:
+        """Run ``request`` with admission control and retries; raises its last error."""
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self._admit(caller)
+            try:
+                result = request()
+            except Exception as exc:
+                if self._should_retry(exc, attempt, caller):
+                    continue
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stream(self, request: Callable[[], Iterable[T]], *, caller: str) -> Iterator[T]:
+        """Like ``call`` for streaming requests; only failures before the first chunk are retried."""
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self._admit(caller)
+            started = False
+            try:
+                for chunk in request():
+                    started = True
+                    yield chunk
+            except Exception as exc:
+                if started:
+                    self._record_error(exc)
+                elif self._should_retry(exc, attempt, caller):
+                    continue
+                raise
+            except BaseException:
+                # Abandoned by the consumer (``close()``, a Streamlit rerun or stop): a
+                # half-open probe must not stay claimed, or the circuit never closes.
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return
+
+
+_gateway: GeminiGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def get_gateway() -> GeminiGateway:
+    """Return the process-wide gateway, configured from the environment on first use."""
+
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = GeminiGateway(
+                limiter=TokenBucket(_env_number(REQUESTS_PER_SECOND_ENV, DEFAULT_REQUESTS_PER_SECOND)),
+                breaker=CircuitBreaker(
+                    int(_env_number(CIRCUIT_FAILURES_ENV, DEFAULT_CIRCUIT_FAILURES)),
+                    _env_number(CIRCUIT_RESET_SECONDS_ENV, DEFAULT_CIRCUIT_RESET_SECONDS),
+                ),
+                retry=RetryPolicy(max_attempts=int(_env_number(MAX_ATTEMPTS_ENV, DEFAULT_MAX_ATTEMPTS))),
+            )
+        return _gateway
+
+
+def reset_gateway(gateway: GeminiGateway | None = None) -> None:
+    """Replace the shared gateway (``None`` rebuilds it from the environment on next use)."""
+
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
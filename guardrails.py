@@ -6,6 +6,8 @@ import re
 from dataclasses import dataclass
 from typing import Iterable, Mapping
 
+from tracing import span
+
 _SQL_MAX_LENGTH = 100_000  # guard against ReDoS on pathological input
 
 _DESTRUCTIVE_ACTIONS = frozenset({"remove", "modify"})
@@ -87,6 +89,29 @@ class DestructiveActionApprovalRequired(GuardrailViolation):
         self.action = normalized_action
 
 
+class DuplicateKeyViolation(GuardrailViolation):
+    """Raised when an upload repeats a product NAME under the reject policy."""
+
+    def __init__(self, duplicate_keys: Mapping[object, int]):
+        keys = dict(duplicate_keys)
+        shown = ", ".join(f"{key} (x{count})" for key, count in list(keys.items())[:10])
+        more = f" and {len(keys) - 10} more" if len(keys) > 10 else ""
+        super().__init__(f"The upload repeats product names: {shown}{more}.")
+        self.duplicate_keys = keys
+
+
+class ImportResumeConflict(GuardrailViolation):
+    """Raised when a resumed import's mapping differs from the one its committed batches used."""
+
+    def __init__(self, checkpointed_mapping: Mapping[str, str], requested_mapping: Mapping[str, str]):
+        self.checkpointed_mapping = dict(checkpointed_mapping)
+        self.requested_mapping = dict(requested_mapping)
+        super().__init__(
+            "This upload was partly imported with a different column mapping. "
+            f"Resume it with the checkpointed mapping {self.checkpointed_mapping}."
+        )
+
+
 @dataclass(frozen=True)
 class ColumnMappingReview:
     sanitized_mapping: dict[str, str]
@@ -210,6 +235,11 @@ def _extract_cte_names(sql: str) -> set[str]:
 def validate_read_only_sql(sql: str, allowed_tables: Iterable[str]) -> str:
     """Allow only single-statement, read-only queries over approved tables."""
 
+    with span("validate_read_only_sql", sql_chars=len(sql)):
+        return _validate_read_only_sql(sql, allowed_tables)
+
+
+def _validate_read_only_sql(sql: str, allowed_tables: Iterable[str]) -> str:
     candidate = sql.strip()
     if not candidate:
         raise SqlGuardrailViolation("The model did not return a SQL statement.")
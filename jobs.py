@@ -0,0 +1,572 @@
+"""Persistent background jobs for long-running imports, reports and bulk categorization.
+
+Jobs are rows in a ``jobs`` table stored in a sidecar SQLite file next to the
+inventory database (``background_jobs.db``), so they survive Streamlit reruns,
+browser disconnects and app restarts. Keeping the queue out of the inventory
+database means a worker can report progress while its import transaction
+holds the inventory write lock.
+
+Worker processes claim queued jobs one at a time, run the registered handler
+for the job's kind and record progress, result or error. The UI submits jobs
+and polls ``list_jobs``; ``python jobs.py`` runs workers in the foreground for
+deployments that keep them out of the Streamlit process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from audit import append_audit_event
+from database import DATABASE_PATH, PRODUCT_TABLE
+
+JOBS_DB_FILENAME = "background_jobs.db"
+JOB_FILES_DIRNAME = "job_files"
+JOBS_TABLE = "jobs"
+WORKERS_ENV = "INVENTORY_JOB_WORKERS"
+DEFAULT_WORKERS = 2
+DEFAULT_POLL_INTERVAL = 1.0
+MAX_ATTEMPTS = 3
+PROGRESS_WRITE_INTERVAL = 0.5  # seconds between progress writes
+DEFAULT_IMPORT_BATCH_SIZE = 5_000
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+EXCEL_IMPORT_JOB = "excel_import"
+REPORT_JOB = "report"
+CATEGORIZATION_JOB = "bulk_categorization"
+
+ProgressCallback = Callable[[int, int | None], None]
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    kind: str
+    status: str
+    db_path: str
+    payload: dict[str, Any]
+    result: dict[str, Any] | None
+    error: str | None
+    progress_current: int
+    progress_total: int | None
+    attempts: int
+    worker_pid: int | None
+    created_at: str
+    started_at: str | None
+    finished_at: str | None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in {JOB_SUCCEEDED, JOB_FAILED}
+
+    @property
+    def progress_fraction(self) -> float | None:
+        if self.status == JOB_SUCCEEDED:
+            return 1.0
+        if not self.progress_total:
+            return None
+        return min(1.0, self.progress_current / self.progress_total)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_jobs_db_path(db_path: str | Path) -> Path:
+    """Store the job queue alongside the active database."""
+
+    return Path(db_path).resolve().with_name(JOBS_DB_FILENAME)
+
+
+def _connect(db_path: str | Path) -> sqlite3.Connection:
+    jobs_db = get_jobs_db_path(db_path)
+    jobs_db.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(jobs_db, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            db_path TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            progress_current INTEGER NOT NULL DEFAULT 0,
+            progress_total INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker_pid INTEGER,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+        """
+    )
+    connection.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{JOBS_TABLE}_status_id ON {JOBS_TABLE} (status, id)"
+    )
+    return connection
+
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    return Job(
+        id=row["id"],
+        kind=row["kind"],
+        status=row["status"],
+        db_path=row["db_path"],
+        payload=json.loads(row["payload"]),
+        result=json.loads(row["result"]) if row["result"] else None,
+        error=row["error"],
+        progress_current=row["progress_current"],
+        progress_total=row["progress_total"],
+        attempts=row["attempts"],
+        worker_pid=row["worker_pid"],
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+    )
+
+
+def _insert_job(connection: sqlite3.Connection, db_path: str | Path, kind: str, payload: dict[str, Any]) -> int:
+    cursor = connection.execute(
+        f"INSERT INTO {JOBS_TABLE} (kind, status, db_path, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+        (kind, JOB_QUEUED, str(Path(db_path).resolve()), json.dumps(payload), _now()),
+    )
+    return int(cursor.lastrowid)
+
+
+def submit_job(db_path: str | Path, kind: str, payload: dict[str, Any] | None = None) -> int:
+    """Queue a job of a registered ``kind`` and return its ID."""
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    connection = _connect(db_path)
+    try:
+        return _insert_job(connection, db_path, kind, payload or {})
+    finally:
+        connection.close()
+
+
+def get_job(db_path: str | Path, job_id: int) -> Job | None:
+    connection = _connect(db_path)
+    try:
+        row = connection.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        connection.close()
+    return _row_to_job(row) if row is not None else None
+
+
+def list_jobs(db_path: str | Path, *, limit: int = 20) -> list[Job]:
+    """Return the most recent jobs, newest first."""
+
+    connection = _connect(db_path)
+    try:
+        rows = connection.execute(
+            f"SELECT * FROM {JOBS_TABLE} ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    finally:
+        connection.close()
+    return [_row_to_job(row) for row in rows]
+
+
+def claim_next_job(db_path: str | Path, *, worker_pid: int | None = None) -> Job | None:
+    """Atomically move the oldest queued job to ``running`` and return it."""
+
+    connection = _connect(db_path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            f"SELECT id FROM {JOBS_TABLE} WHERE status = ? ORDER BY id LIMIT 1", (JOB_QUEUED,)
+        ).fetchone()
+        if row is None:
+            connection.execute("COMMIT")
+            return None
+        connection.execute(
+            f"""
+            UPDATE {JOBS_TABLE}
+            SET status = ?, worker_pid = ?, attempts = attempts + 1, started_at = ?, error = NULL
+            WHERE id = ?
+            """,
+            (JOB_RUNNING, worker_pid or os.getpid(), _now(), row["id"]),
+        )
+        claimed = connection.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = ?", (row["id"],)).fetchone()
+        connection.execute("COMMIT")
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    return _row_to_job(claimed)
+
+
+def update_progress(db_path: str | Path, job_id: int, current: int, total: int | None = None) -> None:
+    connection = _connect(db_path)
+    try:
+        connection.execute(
+            f"UPDATE {JOBS_TABLE} SET progress_current = ?, progress_total = COALESCE(?, progress_total) WHERE id = ?",
+            (current, total, job_id),
+        )
+    finally:
+        connection.close()
+
+
+def _finish_job(
+    db_path: str | Path,
+    job_id: int,
+    status: str,
+    *,
+    result: dict[str, Any] | None = None,
+    error: str | None = None,
+) -> None:
+    connection = _connect(db_path)
+    try:
+        connection.execute(
+            f"UPDATE {JOBS_TABLE} SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, _now(), job_id),
+        )
+    finally:
+        connection.close()
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_orphaned_jobs(db_path: str | Path) -> int:
+    """Requeue running jobs whose worker process has died.
+
+    Imports commit every ``DEFAULT_IMPORT_BATCH_SIZE`` rows, so an interrupted
+    import may have committed some batches. A requeued import resumes after
+    the last one, using the ``_import_state`` checkpoint recorded under the
+    file's content hash, action and duplicate policy. Jobs that already used
+    ``MAX_ATTEMPTS`` are marked failed instead. Returns the number of jobs
+    touched. Worker liveness is checked by PID, so this assumes the workers
+    run on the same host as the caller.
+    """
+
+    connection = _connect(db_path)
+    try:
+        rows = connection.execute(
+            f"SELECT id, worker_pid, attempts FROM {JOBS_TABLE} WHERE status = ?", (JOB_RUNNING,)
+        ).fetchall()
+        orphaned = [row for row in rows if not _pid_alive(row["worker_pid"])]
+        for row in orphaned:
+            if row["attempts"] >= MAX_ATTEMPTS:
+                connection.execute(
+                    f"UPDATE {JOBS_TABLE} SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (JOB_FAILED, "Worker exited before finishing the job.", _now(), row["id"]),
+                )
+            else:
+                connection.execute(
+                    f"UPDATE {JOBS_TABLE} SET status = ?, worker_pid = NULL WHERE id = ? AND status = ?",
+                    (JOB_QUEUED, row["id"], JOB_RUNNING),
+                )
+    finally:
+        connection.close()
+    return len(orphaned)
+
+
+# -- job kinds ------------------------------------------------------------------------
+
+
+def get_job_files_dir(db_path: str | Path) -> Path:
+    return Path(db_path).resolve().with_name(JOB_FILES_DIRNAME)
+
+
+class _StoredUpload(io.BytesIO):
+    """File-like view of a stored upload with the ``name`` Streamlit files have."""
+
+    def __init__(self, data: bytes, name: str | None):
+        super().__init__(data)
+        self.name = name
+
+
+def submit_import_job(
+    db_path: str | Path,
+    data: bytes,
+    *,
+    filename: str | None,
+    action: str,
+    column_mappings: dict[str, str],
+    allow_schema_changes: bool = False,
+    allow_destructive_actions: bool = False,
+    batch_size: int | None = DEFAULT_IMPORT_BATCH_SIZE,
+    duplicate_policy: str = "last",
+) -> int:
+    """Store the uploaded workbook and queue an import using the reviewed mapping.
+
+    Imports commit every ``batch_size`` rows, so re-queueing the same file
+    after a failure resumes from the last committed batch.
+    """
+
+    files_dir = get_job_files_dir(db_path)
+    files_dir.mkdir(parents=True, exist_ok=True)
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", filename or "upload")[:80]
+    file_path = files_dir / f"{uuid.uuid4().hex}-{safe_name}"
+    file_path.write_bytes(data)
+    return submit_job(
+        db_path,
+        EXCEL_IMPORT_JOB,
+        {
+            "file_path": str(file_path),
+            "filename": filename,
+            "action": action,
+            "column_mappings": dict(column_mappings),
+            "allow_schema_changes": allow_schema_changes,
+            "allow_destructive_actions": allow_destructive_actions,
+            "batch_size": batch_size,
+            "duplicate_policy": duplicate_policy,
+        },
+    )
+
+
+def submit_report_job(db_path: str | Path) -> int:
+    return submit_job(db_path, REPORT_JOB)
+
+
+def submit_categorization_job(db_path: str | Path) -> int:
+    """Queue bulk categorization, or return the ID of the run already queued.
+
+    Runs share one checkpoint, so a second concurrent run would only repeat
+    the first one's requests. The lookup and the insert share one write
+    transaction, so concurrent submissions cannot both queue a run.
+    """
+
+    connection = _connect(db_path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            f"SELECT id FROM {JOBS_TABLE} WHERE kind = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+            (CATEGORIZATION_JOB, JOB_QUEUED, JOB_RUNNING),
+        ).fetchone()
+        job_id = int(row["id"]) if row is not None else _insert_job(connection, db_path, CATEGORIZATION_JOB, {})
+        connection.execute("COMMIT")
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    return job_id
+
+
+def _run_excel_import(job: Job, progress: ProgressCallback) -> dict[str, Any]:
+    from excel_processing import preview_excel_import, process_excel_file
+
+    payload = job.payload
+    file_path = Path(payload["file_path"])
+    upload = _StoredUpload(file_path.read_bytes(), payload.get("filename"))
+    try:
+        preview = preview_excel_import(upload, job.db_path, column_mappings=payload["column_mappings"])
+        processed_rows = process_excel_file(
+            upload,
+            job.db_path,
+            payload["action"],
+            allow_schema_changes=payload.get("allow_schema_changes", False),
+            allow_destructive_actions=payload.get("allow_destructive_actions", False),
+            preview=preview,
+            progress_callback=progress,
+            batch_size=payload.get("batch_size"),
+            duplicate_policy=payload.get("duplicate_policy", "last"),
+        )
+    finally:
+        # Only a worker crash (not an exception) leaves the file for a retry.
+        file_path.unlink(missing_ok=True)
+    return {"processed_rows": processed_rows, "action": payload["action"]}
+
+
+def _run_report(job: Job, progress: ProgressCallback) -> dict[str, Any]:
+    from analytics import generate_report
+    from reporting import build_report
+    from utils import read_sql_query
+
+    progress(0, 1)
+    df = read_sql_query(f"SELECT * FROM {PRODUCT_TABLE}", job.db_path)
+    report = build_report(job.db_path)
+    return {"text": generate_report(df, report=report), "figures": report.to_dict()}
+
+
+def _run_categorization(job: Job, progress: ProgressCallback) -> dict[str, Any]:
+    from categorization import categorize_uncategorized_products
+
+    progress(0, None)
+    result = categorize_uncategorized_products(job.db_path, progress_callback=progress)
+    return {
+        "rows_selected": result.rows_selected,
+        "rows_categorized": result.rows_categorized,
+        "chunks_processed": result.chunks_processed,
+        "failed_batches": result.failed_batches,
+        "completed": result.completed,
+    }
+
+
+JOB_HANDLERS: dict[str, Callable[[Job, ProgressCallback], dict[str, Any]]] = {
+    EXCEL_IMPORT_JOB: _run_excel_import,
+    REPORT_JOB: _run_report,
+    CATEGORIZATION_JOB: _run_categorization,
+}
+
+
+# -- workers ----------------------------------------------------------------------------
+
+
+def run_job(db_path: str | Path, job: Job) -> Job:
+    """Run a claimed job to completion and record its outcome."""
+
+    last_write = 0.0
+
+    def progress(current: int, total: int | None = None) -> None:
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_WRITE_INTERVAL or (total is not None and current >= total):
+            update_progress(db_path, job.id, current, total)
+            last_write = now
+
+    try:
+        result = JOB_HANDLERS[job.kind](job, progress)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        _finish_job(db_path, job.id, JOB_FAILED, error=error)
+        append_audit_event(
+            job.db_path,
+            "background_job",
+            {"job_id": job.id, "kind": job.kind, "status": JOB_FAILED, "error": error},
+        )
+    else:
+        _finish_job(db_path, job.id, JOB_SUCCEEDED, result=result)
+        append_audit_event(
+            job.db_path,
+            "background_job",
+            {"job_id": job.id, "kind": job.kind, "status": JOB_SUCCEEDED},
+        )
+    return get_job(db_path, job.id)
+
+
+def run_worker(
+    db_path: str | Path,
+    *,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    stop_event: Any | None = None,
+    max_jobs: int | None = None,
+) -> int:
+    """Claim and run jobs until stopped; return how many jobs ran.
+
+    With ``max_jobs`` set the worker returns once it has run that many jobs
+    or the queue is empty, which is how tests and one-shot runs drain it.
+    """
+
+    completed = 0
+    while stop_event is None or not stop_event.is_set():
+        job = claim_next_job(db_path)
+        if job is None:
+            if max_jobs is not None:
+                break
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        run_job(db_path, job)
+        completed += 1
+        if max_jobs is not None and completed >= max_jobs:
+            break
+    return completed
+
+
+_pools: dict[str, tuple[Any, list[multiprocessing.process.BaseProcess]]] = {}
+
+
+def start_workers(db_path: str | Path = DATABASE_PATH, processes: int | None = None) -> int:
+    """Ensure a pool of worker processes is serving ``db_path``'s queue.
+
+    Safe to call on every Streamlit rerun: live workers are reused and dead
+    ones replaced. The pool size defaults to ``INVENTORY_JOB_WORKERS`` (2);
+    ``0`` leaves jobs for an external ``python jobs.py`` runner. Returns the
+    number of live workers.
+    """
+
+    if processes is None:
+        processes = int(os.getenv(WORKERS_ENV, DEFAULT_WORKERS))
+    if processes <= 0:
+        return 0
+    key = str(get_jobs_db_path(db_path))
+    context = multiprocessing.get_context("spawn")
+    stop_event, workers = _pools.get(key) or (context.Event(), [])
+    workers = [worker for worker in workers if worker.is_alive()]
+    if len(workers) < processes:
+        recover_orphaned_jobs(db_path)
+    while len(workers) < processes:
+        worker = context.Process(
+            target=run_worker,
+            args=(str(db_path),),
+            kwargs={"stop_event": stop_event},
+            name=f"inventory-job-worker-{len(workers)}",
+            daemon=True,
+        )
+        worker.start()
+        workers.append(worker)
+    _pools[key] = (stop_event, workers)
+    return len(workers)
+
+
+def stop_workers(timeout: float = 10.0) -> None:
+    """Signal every pool started by this process to stop and wait for it."""
+
+    for stop_event, workers in _pools.values():
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout)
+    _pools.clear()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run background job workers in the foreground.")
+    parser.add_argument("--db-path", type=Path, default=DATABASE_PATH, help="Inventory database to serve.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes (default: 2).")
+    args = parser.parse_args(argv)
+
+    import config  # noqa: F401 - loads .env so report jobs can reach Gemini
+
+    recover_orphaned_jobs(args.db_path)
+    if args.workers <= 1:
+        run_worker(args.db_path)
+        return 0
+    start_workers(args.db_path, processes=args.workers)
+    try:
+        while True:
+            time.sleep(DEFAULT_POLL_INTERVAL)
+            start_workers(args.db_path, processes=args.workers)
+    except KeyboardInterrupt:
+        stop_workers()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
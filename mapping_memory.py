@@ -0,0 +1,198 @@
+"""Persistent memory of accepted Excel column mappings.
+
+Suppliers tend to send the same header layout every week. After an import
+succeeds, its reviewed mapping is stored in ``_column_mapping_memory`` keyed
+by the normalized header set and the PRODUCT schema the mapping targets.
+``preview_excel_import`` recalls from here before asking the model, so a
+known layout costs one indexed lookup instead of a Gemini call. Entries are
+listed and evicted from the admin section of the UI.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from guardrails import normalize_identifier
+from metrics import REGISTRY
+
+MAPPING_MEMORY_TABLE = "_column_mapping_memory"
+
+MAPPING_MEMORY_LOOKUPS = REGISTRY.counter(
+    "inventory_mapping_memory_lookups_total",
+    "Column-mapping memory lookups made before calling the model, by result.",
+    ("result",),
+)
+
+
+@dataclass(frozen=True)
+class MappingMemoryEntry:
+    signature: str
+    headers: list[str]
+    column_mappings: dict[str, str]
+    hit_count: int
+    source: str | None
+    created_at: str
+    last_used_at: str
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _normalized_headers(headers: Iterable[object]) -> list[str] | None:
+    """Return normalized headers, or ``None`` when two collapse to the same key."""
+
+    normalized = [normalize_identifier(str(header)) for header in headers]
+    if len(set(normalized)) != len(normalized) or "" in normalized:
+        return None
+    return normalized
+
+
+def layout_signature(headers: Iterable[object], schema_columns: Iterable[str]) -> str | None:
+    """Key a header layout together with the PRODUCT columns it maps onto.
+
+    Both sides are normalized and sorted, so header order, case and
+    punctuation do not matter. Returns ``None`` for ambiguous layouts.
+    """
+
+    normalized = _normalized_headers(headers)
+    if normalized is None:
+        return None
+    schema = sorted({normalize_identifier(column) for column in schema_columns})
+    payload = json.dumps({"headers": sorted(normalized), "schema": schema})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _ensure_table(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MAPPING_MEMORY_TABLE} (
+            signature TEXT PRIMARY KEY,
+            headers TEXT NOT NULL,
+            column_mappings TEXT NOT NULL,
+            hit_count INTEGER NOT NULL DEFAULT 0,
+            source TEXT,
+            created_at TEXT NOT NULL,
+            last_used_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def remember_mapping(
+    connection: sqlite3.Connection,
+    headers: Iterable[object],
+    existing_columns: Iterable[str],
+    column_mappings: Mapping[str, str],
+    *,
+    source: str | None = None,
+) -> str | None:
+    """Store an accepted mapping using the caller's connection (and transaction).
+
+    The schema side of the key is the existing columns plus any new columns
+    the mapping introduced, i.e. the schema the next upload of this layout
+    will see. Returns the signature, or ``None`` if the layout is ambiguous.
+    """
+
+    headers = [str(header) for header in headers]
+    normalized = _normalized_headers(headers)
+    if normalized is None or set(headers) - set(column_mappings):
+        return None
+    target_schema = [*existing_columns, *column_mappings.values()]
+    signature = layout_signature(headers, target_schema)
+    by_normalized_header = {
+        normalized_header: column_mappings[header] for header, normalized_header in zip(headers, normalized)
+    }
+    _ensure_table(connection)
+    now = _now()
+    connection.execute(
+        f"""
+        INSERT INTO {MAPPING_MEMORY_TABLE}
+            (signature, headers, column_mappings, source, created_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (signature) DO UPDATE SET
+            headers = excluded.headers,
+            column_mappings = excluded.column_mappings,
+            source = excluded.source,
+            last_used_at = excluded.last_used_at
+        """,
+        (signature, json.dumps(headers), json.dumps(by_normalized_header, sort_keys=True), source, now, now),
+    )
+    return signature
+
+
+def recall_mapping(
+    db_path: str | Path,
+    headers: Iterable[object],
+    existing_columns: Iterable[str],
+) -> dict[str, str] | None:
+    """Return the remembered mapping for this header layout and schema, if any.
+
+    The stored mapping is keyed by normalized header, so it is translated
+    back onto this upload's exact header spellings.
+    """
+
+    headers = [str(header) for header in headers]
+    signature = layout_signature(headers, existing_columns)
+    if signature is None:
+        MAPPING_MEMORY_LOOKUPS.inc(result="skipped")
+        return None
+    with sqlite3.connect(db_path) as connection:
+        _ensure_table(connection)
+        row = connection.execute(
+            f"SELECT column_mappings FROM {MAPPING_MEMORY_TABLE} WHERE signature = ?",
+            (signature,),
+        ).fetchone()
+        if row is None:
+            MAPPING_MEMORY_LOOKUPS.inc(result="miss")
+            return None
+        connection.execute(
+            f"UPDATE {MAPPING_MEMORY_TABLE} SET hit_count = hit_count + 1, last_used_at = ? WHERE signature = ?",
+            (_now(), signature),
+        )
+    MAPPING_MEMORY_LOOKUPS.inc(result="hit")
+    by_normalized_header = json.loads(row[0])
+    return {header: by_normalized_header[normalize_identifier(header)] for header in headers}
+
+
+def list_mappings(db_path: str | Path) -> list[MappingMemoryEntry]:
+    """Return remembered layouts, most recently used first."""
+
+    with sqlite3.connect(db_path) as connection:
+        _ensure_table(connection)
+        rows = connection.execute(
+            f"""
+            SELECT signature, headers, column_mappings, hit_count, source, created_at, last_used_at
+            FROM {MAPPING_MEMORY_TABLE}
+            ORDER BY last_used_at DESC
+            """
+        ).fetchall()
+    return [
+        MappingMemoryEntry(
+            signature=row[0],
+            headers=json.loads(row[1]),
+            column_mappings=json.loads(row[2]),
+            hit_count=row[3],
+            source=row[4],
+            created_at=row[5],
+            last_used_at=row[6],
+        )
+        for row in rows
+    ]
+
+
+def forget_mapping(db_path: str | Path, signature: str) -> bool:
+    """Evict one remembered layout; returns whether it existed."""
+
+    with sqlite3.connect(db_path) as connection:
+        _ensure_table(connection)
+        cursor = connection.execute(
+            f"DELETE FROM {MAPPING_MEMORY_TABLE} WHERE signature = ?", (signature,)
+        )
+    return cursor.rowcount > 0
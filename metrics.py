@@ -0,0 +1,383 @@
+"""Process-wide metrics registry with a Prometheus text exporter.
+
+Counters, gauges and histograms are registered on ``REGISTRY`` and updated
+from the app's hot paths (SQL queries, Gemini calls, Excel imports, audit
+writes). ``start_exporter()`` serves the registry in the Prometheus text
+exposition format from a daemon thread so each Streamlit replica can be
+scraped independently; it only starts when ``INVENTORY_METRICS_PORT`` is set
+(or a port is passed explicitly) and is safe to call on every script rerun.
+
+Everything here is stdlib-only so it can be imported from any module.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+import warnings
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT_ENV = "INVENTORY_METRICS_PORT"
+METRICS_HOST_ENV = "INVENTORY_METRICS_HOST"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_LabelKey = tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_key(self, labels: dict[str, object]) -> _LabelKey:
+        unknown = set(labels) - set(self.label_names)
+        if unknown:
+            raise ValueError(f"Unknown label(s) for {self.name}: {', '.join(sorted(unknown))}")
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> list[tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for sample_name, names, values, value in self._samples():
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[_LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts.")
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._label_key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self.label_names, key, value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally split by labels."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[_LabelKey, float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._label_key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self.label_names, key, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with ``_sum`` and ``_count`` series."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        if "le" in self.label_names:
+            raise ValueError("Histograms cannot use the reserved 'le' label.")
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (math.inf,)
+        self._series: dict[_LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._label_key(labels)
+        with self._lock:
+            # Layout: one slot per bucket, then sum, then count.
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[dict[str, object]]:
+        """Observe the block's wall time in seconds.
+
+        Yields the label dict so the block can fill in labels that are only
+        known at the end (for example which backend answered). A ``status``
+        label left unset is filled with ``ok`` or ``error``.
+        """
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield labels
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if "status" in self.label_names:
+                labels.setdefault("status", "error" if failed else "ok")
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            series = self._series.get(self._label_key(labels))
+            return int(series[-1]) if series else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        samples = []
+        bucket_names = self.label_names + ("le",)
+        for key, series in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", bucket_names, key + (_format_value(bound),), cumulative))
+            samples.append((f"{self.name}_sum", self.label_names, key, series[-2]))
+            samples.append((f"{self.name}_count", self.label_names, key, series[-1]))
+        return samples
+
+
+class Registry:
+    """Named collection of metrics rendered together for one scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered with a different shape.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))  # type: ignore[return-value]
+
+    def get(self, name: str) -> _Metric | None:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+
+REGISTRY = Registry()
+
+SQL_QUERY_SECONDS = REGISTRY.histogram(
+    "inventory_sql_query_seconds",
+    "Wall time of read_sql_query calls.",
+    ("status",),
+)
+SQL_QUERY_ROWS = REGISTRY.counter(
+    "inventory_sql_query_rows_total",
+    "Rows returned by read_sql_query.",
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "inventory_llm_request_seconds",
+    "Wall time of Gemini requests, labelled by the backend that answered.",
+    ("caller", "source"),
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "inventory_llm_first_token_seconds",
+    "Time from sending a streamed Gemini request to its first text chunk.",
+    ("caller", "source"),
+)
+LLM_ERRORS = REGISTRY.counter(
+    "inventory_llm_errors_total",
+    "Gemini calls that raised before a deterministic fallback was used.",
+    ("error",),
+)
+IMPORT_SECONDS = REGISTRY.histogram(
+    "inventory_excel_import_seconds",
+    "Wall time of process_excel_file calls.",
+    ("action", "status"),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+IMPORT_ROWS = REGISTRY.counter(
+    "inventory_excel_import_rows_total",
+    "Spreadsheet rows written by process_excel_file.",
+    ("action", "status"),
+)
+IMPORT_PREVIEW_CACHE = REGISTRY.counter(
+    "inventory_import_preview_cache_total",
+    "Import preview lookups in the UI, by cache result.",
+    ("result",),
+)
+AUDIT_EVENTS = REGISTRY.counter(
+    "inventory_audit_events_total",
+    "Audit events appended to the JSONL log.",
+    ("event_type",),
+)
+AUDIT_WRITE_SECONDS = REGISTRY.histogram(
+    "inventory_audit_write_seconds",
+    "Wall time of append_audit_event calls.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+AUDIT_LOG_BYTES = REGISTRY.gauge(
+    "inventory_audit_log_bytes",
+    "Size of the most recently written audit log.",
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] not in {"/", "/metrics"}:
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - http.server signature
+        return  # scrapes every few seconds would flood the Streamlit console
+
+
+_exporter: ThreadingHTTPServer | None = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(
+    port: int | None = None,
+    *,
+    host: str | None = None,
+    registry: Registry = REGISTRY,
+) -> ThreadingHTTPServer | None:
+    """Serve ``registry`` over HTTP from a daemon thread.
+
+    The port defaults to ``INVENTORY_METRICS_PORT``; with neither set the
+    exporter stays off and ``None`` is returned. Repeated calls return the
+    already running server. A port that is already taken only warns, so a
+    misconfigured replica still serves the UI.
+    """
+
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            return _exporter
+        if port is None:
+            configured = os.getenv(METRICS_PORT_ENV)
+            if not configured:
+                return None
+            try:
+                port = int(configured)
+            except ValueError:
+                warnings.warn(f"Ignoring non-integer {METRICS_PORT_ENV}={configured!r}.", stacklevel=2)
+                return None
+        bind_host = host or os.getenv(METRICS_HOST_ENV) or DEFAULT_METRICS_HOST
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        try:
+            server = ThreadingHTTPServer((bind_host, port), handler)
+        except OSError as exc:
+            warnings.warn(f"Metrics exporter could not bind {bind_host}:{port}: {exc}", stacklevel=2)
+            return None
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="inventory-metrics", daemon=True)
+        thread.start()
+        _exporter = server
+        return server
+
+
+def stop_exporter() -> None:
+    """Shut down the exporter started by ``start_exporter`` (used by tests)."""
+
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            return
+        _exporter.shutdown()
+        _exporter.server_close()
+        _exporter = None
@@ -0,0 +1,201 @@
+"""Shared on-disk cache of Excel import previews.
+
+Previews are keyed by the upload's SHA-256 plus a signature of the PRODUCT
+columns the mapping was made against, so the same supplier file uploaded by
+another session, another replica on the same disk, or after a restart skips
+both the parse and the column-mapping model call, while a schema change
+invalidates every entry. Each entry is a small JSON file holding the reviewed
+mapping and, when pyarrow can encode the frame, a Parquet copy of the parsed
+rows. Otherwise only the mapping is cached and the file is re-parsed on a hit.
+
+Entries live in ``preview_cache/`` next to the database and are evicted least
+recently used first once the entry count or total size exceeds its limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Sequence
+
+from metrics import REGISTRY
+
+PREVIEW_CACHE_DIRNAME = "preview_cache"
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_FORMAT_VERSION = 1
+
+PREVIEW_CACHE_LOOKUPS = REGISTRY.counter(
+    "inventory_preview_cache_lookups_total",
+    "Shared on-disk import preview cache lookups, by result.",
+    ("result",),
+)
+PREVIEW_CACHE_EVICTIONS = REGISTRY.counter(
+    "inventory_preview_cache_evictions_total",
+    "Entries evicted from the shared import preview cache.",
+)
+
+
+@dataclass(frozen=True)
+class CachedPreview:
+    column_mappings: dict[str, str]
+    frame: Any | None
+    uploaded_filename: str | None
+    created_at: str
+
+
+def schema_signature(existing_columns: Sequence[str]) -> str:
+    """Return a short digest of the PRODUCT columns a mapping was made against."""
+
+    joined = "\x1f".join(str(column) for column in existing_columns)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+
+class PreviewCache:
+    """Directory of preview entries with size- and count-bounded LRU eviction."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def key(self, content_hash: str, existing_columns: Sequence[str]) -> str:
+        return f"{content_hash}-{schema_signature(existing_columns)}-v{CACHE_FORMAT_VERSION}"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _frame_path(self, key: str) -> Path:
+        return self.directory / f"{key}.parquet"
+
+    def get(self, key: str) -> CachedPreview | None:
+        meta_path = self._meta_path(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            frame = None
+            if meta.get("has_frame"):
+                import pandas as pd
+
+                frame = pd.read_parquet(self._frame_path(key))
+        except (OSError, ValueError, ImportError):
+            # Missing, half-evicted or unreadable entries are plain misses.
+            PREVIEW_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        try:
+            os.utime(meta_path)  # mark as recently used for LRU eviction
+        except OSError:
+            pass
+        PREVIEW_CACHE_LOOKUPS.inc(result="hit")
+        return CachedPreview(
+            column_mappings=dict(meta["column_mappings"]),
+            frame=frame,
+            uploaded_filename=meta.get("uploaded_filename"),
+            created_at=meta["created_at"],
+        )
+
+    def put(
+        self,
+        key: str,
+        frame: Any,
+        column_mappings: dict[str, str],
+        uploaded_filename: str | None = None,
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        has_frame = self._write_frame(key, frame)
+        meta = {
+            "column_mappings": column_mappings,
+            "has_frame": has_frame,
+            "uploaded_filename": uploaded_filename,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # The metadata file is written last, so readers never see an entry
+        # whose frame is still being written.
+        _atomic_write(self._meta_path(key), json.dumps(meta, sort_keys=True).encode("utf-8"))
+        self.evict()
+
+    def _write_frame(self, key: str, frame: Any) -> bool:
+        to_parquet = getattr(frame, "to_parquet", None)
+        if not callable(to_parquet):
+            return False
+        temp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            to_parquet(temp_path)
+            os.replace(temp_path, self._frame_path(key))
+        except Exception:
+            # No Parquet engine, or mixed-type / non-string columns pyarrow
+            # cannot encode: cache the mapping only.
+            temp_path.unlink(missing_ok=True)
+            return False
+        return True
+
+    def evict(self) -> int:
+        """Drop least recently used entries until both limits hold."""
+
+        with self._lock:
+            entries = []
+            for meta_path in self.directory.glob("*.json"):
+                frame_path = meta_path.with_suffix(".parquet")
+                try:
+                    stat = meta_path.stat()
+                    size = stat.st_size + (frame_path.stat().st_size if frame_path.exists() else 0)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, size, meta_path, frame_path))
+            entries.sort()
+            total = sum(size for _, size, _, _ in entries)
+            evicted = 0
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, meta_path, frame_path = entries.pop(0)
+                meta_path.unlink(missing_ok=True)
+                frame_path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+        if evicted:
+            PREVIEW_CACHE_EVICTIONS.inc(evicted)
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*"):
+                if path.suffix in {".json", ".parquet", ".tmp"}:
+                    path.unlink(missing_ok=True)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+_caches: dict[Path, PreviewCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_preview_cache_dir(db_path: str | Path) -> Path:
+    """Store cached previews in a directory beside the database."""
+
+    return Path(db_path).resolve().with_name(PREVIEW_CACHE_DIRNAME)
+
+
+def get_preview_cache(db_path: str | Path) -> PreviewCache:
+    """Return the process-wide cache instance for ``db_path``'s directory."""
+
+    directory = get_preview_cache_dir(db_path)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = PreviewCache(directory)
+        return cache
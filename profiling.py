@@ -0,0 +1,168 @@
+"""Opt-in cProfile and tracemalloc capture for individual UI actions.
+
+Profiling is off unless ``INVENTORY_PROFILE`` is set: ``1``/``all`` profiles
+every action, otherwise it is a comma-separated list of action names (for
+example ``generate_sql_query,generate_report``). Each profiled action writes
+a ``.prof`` file (open with ``python -m pstats`` or snakeviz) and a
+top-allocations text report into a ``profiles/`` directory next to the
+audit log, and records both paths in a ``ui_action_profile`` audit event.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from audit import append_audit_event, get_audit_log_path
+
+PROFILE_ENV = "INVENTORY_PROFILE"
+PROFILE_DIRNAME = "profiles"
+TOP_ALLOCATIONS = 25
+_ENABLE_ALL = {"1", "true", "yes", "all", "*"}
+
+
+def profiling_enabled(action: str) -> bool:
+    """Return whether ``INVENTORY_PROFILE`` selects ``action``."""
+
+    setting = os.getenv(PROFILE_ENV, "").strip().lower()
+    if not setting or setting in {"0", "false", "no", "off"}:
+        return False
+    if setting in _ENABLE_ALL:
+        return True
+    return action.lower() in {part.strip() for part in setting.split(",") if part.strip()}
+
+
+def get_profile_dir(db_path: str | Path) -> Path:
+    """Store profiles in a directory beside the audit log."""
+
+    return get_audit_log_path(db_path).with_name(PROFILE_DIRNAME)
+
+
+def _write_allocation_report(
+    path: Path,
+    action: str,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+) -> None:
+    filters = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    )
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    lines = [
+        f"Top {TOP_ALLOCATIONS} allocation sites for {action} (net change during the action)",
+        f"Peak traced memory: {peak / 1024:.1f} KiB",
+        "",
+    ]
+    lines.extend(str(stat) for stat in stats[:TOP_ALLOCATIONS])
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_owns_tracing = False
+
+
+def _start_tracing() -> None:
+    # Concurrent sessions share tracemalloc; only the last one out stops it, and only
+    # if profiling started it.
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracing = True
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+@contextmanager
+def profile_action(action: str, db_path: str | Path) -> Iterator[None]:
+    """Profile the enclosed block when ``INVENTORY_PROFILE`` selects ``action``.
+
+    Artifacts are written and the audit event appended even when the block
+    raises, since slow failures are often the ones worth profiling. Python
+    3.12+ allows one active profiler per process, so when another session is
+    already being profiled the block simply runs unprofiled.
+    """
+
+    if not profiling_enabled(action):
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # "Another profiling tool is already active"
+        yield None
+        return
+
+    status = "success"
+    tracing = False
+    try:
+        _start_tracing()
+        tracing = True
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        try:
+            yield None
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - started
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            _write_artifacts(profiler, action, db_path, status, seconds, before, after, peak)
+    finally:
+        profiler.disable()
+        if tracing:
+            _stop_tracing()
+
+
+def _write_artifacts(
+    profiler: cProfile.Profile,
+    action: str,
+    db_path: str | Path,
+    status: str,
+    seconds: float,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+) -> None:
+    profile_dir = get_profile_dir(db_path)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}-{action}"
+    profile_path = profile_dir / f"{stem}.prof"
+    allocations_path = profile_dir / f"{stem}-allocations.txt"
+    profiler.dump_stats(profile_path)
+    _write_allocation_report(allocations_path, action, before, after, peak)
+    append_audit_event(
+        db_path,
+        "ui_action_profile",
+        {
+            "action": action,
+            "status": status,
+            "seconds": round(seconds, 6),
+            "peak_memory_bytes": peak,
+            "profile_path": profile_path,
+            "allocations_path": allocations_path,
+        },
+    )
@@ -9,16 +9,21 @@ from __future__ import annotations
 import json
 import os
 import re
+import time
+from collections.abc import Iterator
+
+from column_matching import match_columns
+from gemini_client import FAKE_BACKEND, backend_name, get_gateway, load_sdk
+from metrics import LLM_ERRORS, LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS
+from tracing import span
 
 _DEFAULT_SQL_LIMIT = 100
 SQL_GENERATION_PROMPT_NAME = "sql_generation"
 SQL_GENERATION_PROMPT_VERSION = "v1"
 COLUMN_MAPPING_PROMPT_NAME = "column_mapping"
 COLUMN_MAPPING_PROMPT_VERSION = "v1"
-
-
-def _normalize_token(value: str) -> str:
-    return re.sub(r"[^A-Z0-9]+", "", value.upper())
+BULK_CATEGORIZATION_PROMPT_NAME = "bulk_categorization"
+BULK_CATEGORIZATION_PROMPT_VERSION = "v1"
 
 
 def _fallback_sql(question: str) -> str:
@@ -56,40 +61,8 @@ def _fallback_column_mapping(prompt: str) -> str:
     if database_match:
         database_columns = [value.strip() for value in database_match.group(1).split(",") if value.strip()]
 
-    mapping: dict[str, str] = {}
-    db_lookup = {_normalize_token(column): column for column in database_columns}
-
-    aliases = {
-        "NAME": ("NAME", "PRODUCTNAME", "ITEMNAME", "PRODUCT"),
-        "CATEGORY": ("CATEGORY", "TYPE", "GROUP"),
-        "BRAND": ("BRAND",),
-        "PRICE": ("PRICE", "COST", "AMOUNT", "RATE"),
-        "STOCK": ("STOCK", "QUANTITY", "QTY", "INVENTORY"),
-        "QUANTITY": ("QUANTITY", "STOCK", "QTY", "INVENTORY"),
-        "COLOR": ("COLOR", "COLOUR"),
-        "SIZE": ("SIZE",),
-        "WEIGHT": ("WEIGHT",),
-        "SPECIFICATIONS": ("SPECIFICATIONS", "SPECIFICATION", "DETAILS", "DESCRIPTION", "SPEC"),
-        "ID": ("ID", "PRODUCTID"),
-    }
-
-    for excel_column in excel_columns:
-        normalized = _normalize_token(excel_column)
-        if normalized in db_lookup:
-            mapping[excel_column] = db_lookup[normalized]
-            continue
-
-        mapped_column = None
-        for target, candidates in aliases.items():
-            if normalized in candidates:
-                mapped_column = db_lookup.get(_normalize_token(target), target)
-                break
-
-        if mapped_column is None:
-            mapped_column = re.sub(r"[^A-Z0-9]+", "_", excel_column.upper()).strip("_") or "COLUMN"
-
-        mapping[excel_column] = mapped_column
-
+    matches = match_columns(excel_columns, database_columns)
+    mapping = {column: match.target for column, match in matches.items()}
     return json.dumps(mapping)
 
 
@@ -107,6 +80,13 @@ def get_column_mapping_prompt_metadata() -> dict[str, str]:
     }
 
 
+def get_bulk_categorization_prompt_metadata() -> dict[str, str]:
+    return {
+        "prompt_name": BULK_CATEGORIZATION_PROMPT_NAME,
+        "prompt_version": BULK_CATEGORIZATION_PROMPT_VERSION,
+    }
+
+
 def build_sql_generation_prompt(db_description: str, question: str) -> str:
     """Build the versioned SQL-generation prompt."""
 
@@ -129,38 +109,142 @@ def build_column_mapping_prompt(excel_columns: list[str], existing_columns: list
     )
 
 
-def get_gemini_response(prompt: str, model_name: str = "gemini-1.5-flash") -> str:
-    """Return a Gemini response when available, otherwise a deterministic fallback."""
-
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if api_key:
-        try:
-            import google.generativeai as genai
-
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            text = getattr(response, "text", None)
-            if text:
-                return text.strip()
-        except Exception:
-            pass
+def build_bulk_categorization_prompt(
+    items: list[dict[str, object]],
+    known_categories: list[str],
+) -> str:
+    """Build the versioned prompt that categorizes many products in one request.
+
+    ``items`` are ``{"id", "name", "description"}`` records. The model must
+    answer with a JSON array so the response can be parsed without guessing.
+    """
 
+    categories = ", ".join(known_categories) if known_categories else "(none yet)"
+    return (
+        "You categorize inventory products. Prefer one of the known categories; "
+        "propose a short new category only when none fits.\n"
+        f"Known categories: {categories}\n"
+        f"Products (JSON): {json.dumps(items, ensure_ascii=False)}\n"
+        'Return only a JSON array of objects shaped like {"id": <id>, "category": "<category>"}, '
+        "one per product."
+    )
+
+
+def get_gemini_response(prompt: str, model_name: str = "gemini-1.5-flash") -> str:
+    """Return a Gemini response when available, otherwise a deterministic fallback.
+
+    Requests go through the shared ``gemini_client`` gateway, so they are rate
+    limited and retried, and fall back at once while its circuit is open.
+    """
+
+    with (
+        span("get_gemini_response", model=model_name, prompt_chars=len(prompt)) as call_span,
+        LLM_REQUEST_SECONDS.time(caller="get_gemini_response") as llm_labels,
+    ):
+        api_key = os.getenv("GOOGLE_API_KEY")
+        backend = backend_name()
+        if api_key or backend == FAKE_BACKEND:
+            try:
+                genai = load_sdk()
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(model_name)
+                with span("gemini.generate_content"):
+                    response = get_gateway().call(
+                        lambda: model.generate_content(prompt), caller="get_gemini_response"
+                    )
+                text = getattr(response, "text", None)
+                if text:
+                    call_span.set_attribute("source", backend)
+                    llm_labels["source"] = backend
+                    return text.strip()
+            except Exception as exc:
+                call_span.set_attribute("gemini_error", type(exc).__name__)
+                LLM_ERRORS.inc(error=type(exc).__name__)
+
+        call_span.set_attribute("source", "fallback")
+        llm_labels["source"] = "fallback"
+        return _fallback_response(prompt)
+
+
+def _fallback_response(prompt: str) -> str:
     if "excel columns" in prompt.lower() and "database columns" in prompt.lower():
         return _fallback_column_mapping(prompt)
 
     return _fallback_sql(prompt)
 
 
-def generate_sql_query(db_description: str, question: str) -> str:
-    """Generate a SQL query for the question, using Gemini when available."""
-
-    prompt = build_sql_generation_prompt(db_description, question)
+def stream_gemini_response(prompt: str, model_name: str = "gemini-1.5-flash") -> Iterator[str]:
+    """Yield a Gemini response in chunks as it is generated.
+
+    Without a key, or when Gemini fails before producing any text, the
+    deterministic fallback is yielded as a single chunk. A failure after
+    partial output ends the stream; callers validate what they received.
+    """
+
+    started = time.perf_counter()
+    with (
+        span("stream_gemini_response", model=model_name, prompt_chars=len(prompt)) as call_span,
+        LLM_REQUEST_SECONDS.time(caller="stream_gemini_response") as llm_labels,
+    ):
+        api_key = os.getenv("GOOGLE_API_KEY")
+        backend = backend_name()
+        if api_key or backend == FAKE_BACKEND:
+            response_chars = 0
+            try:
+                genai = load_sdk()
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(model_name)
+                chunks = get_gateway().stream(
+                    lambda: model.generate_content(prompt, stream=True), caller="stream_gemini_response"
+                )
+                for chunk in chunks:
+                    try:
+                        text = getattr(chunk, "text", None)
+                    except ValueError:  # chunks without text parts
+                        continue
+                    if not text:
+                        continue
+                    if not response_chars:
+                        first_token = time.perf_counter() - started
+                        LLM_FIRST_TOKEN_SECONDS.observe(
+                            first_token, caller="stream_gemini_response", source=backend
+                        )
+                        call_span.set_attribute("first_token_seconds", round(first_token, 3))
+                    response_chars += len(text)
+                    yield text
+            except Exception as exc:
+                call_span.set_attribute("gemini_error", type(exc).__name__)
+                LLM_ERRORS.inc(error=type(exc).__name__)
+            if response_chars:
+                call_span.set_attribute("source", backend)
+                call_span.set_attribute("response_chars", response_chars)
+                llm_labels["source"] = backend
+                return
+
+        call_span.set_attribute("source", "fallback")
+        llm_labels["source"] = "fallback"
+        yield _fallback_response(prompt)
+
+
+def finalize_sql_query(response: str, question: str) -> str:
+    """Turn a model response into the SQL to run, falling back when it is not a query."""
 
-    response = get_gemini_response(prompt)
     sql = response.strip().strip("`")
 
     if sql.upper().startswith("SELECT") or sql.upper().startswith("WITH"):
         return sql
 
     return _fallback_sql(question)
+
+
+def generate_sql_query(db_description: str, question: str) -> str:
+    """Generate a SQL query for the question, using Gemini when available."""
+
+    prompt = build_sql_generation_prompt(db_description, question)
+    return finalize_sql_query(get_gemini_response(prompt), question)
+
+
+def stream_sql_query(db_description: str, question: str) -> Iterator[str]:
+    """Yield the generated SQL as it streams in; pass the joined text to ``finalize_sql_query``."""
+
+    return stream_gemini_response(build_sql_generation_prompt(db_description, question))
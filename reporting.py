@@ -0,0 +1,294 @@
+"""Deterministic inventory report figures, computed over the whole PRODUCT table.
+
+Totals, value by category, the most valuable lines, low-stock alerts, price
+and stock outliers and (when the stock movement ledger exists) the best
+sellers are computed with SQL aggregates plus one pandas pass. The results go
+into an ``InventoryReport``. ``analytics.generate_report`` makes one model
+call to write the narrative around these figures. The model never computes
+a number.
+
+Reports are cached in-process per database version (SQLite's file change
+counter plus the size and mtime of the database file and its WAL) and UTC
+day, since the best sellers cover a window that ends today. Repeated reports
+on an unchanged database skip the queries entirely.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from database import (
+    INVENTORY_VALUE_COLUMN,
+    PRODUCT_TABLE,
+    STOCK_MOVEMENT_TABLE,
+    has_stock_ledger,
+    outflow_condition_sql,
+)
+from metrics import REGISTRY
+
+DEFAULT_TOP_N = 10
+DEFAULT_LOW_STOCK_THRESHOLD = 10
+BEST_SELLER_DAYS = 30
+OUTLIER_FENCE = 1.5  # Tukey fences: beyond 1.5 IQR outside the quartiles
+UNCATEGORIZED = "Uncategorized"
+_CACHE_SIZE = 16
+
+REPORT_CACHE = REGISTRY.counter(
+    "inventory_report_cache_total",
+    "Inventory report figure lookups, by cache result.",
+    ("result",),
+)
+
+
+@dataclass(frozen=True)
+class InventoryReport:
+    """Figures for one inventory report; every list is already ranked."""
+
+    database_version: str
+    generated_at: str
+    product_count: int
+    total_units: int
+    total_value: float
+    out_of_stock: int
+    low_stock_threshold: int
+    value_by_category: list[dict[str, Any]] = field(default_factory=list)
+    top_by_value: list[dict[str, Any]] = field(default_factory=list)
+    low_stock: list[dict[str, Any]] = field(default_factory=list)
+    outliers: list[dict[str, Any]] = field(default_factory=list)
+    best_sellers: list[dict[str, Any]] | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def to_markdown(self) -> str:
+        """Render the figures as Markdown, exactly as computed."""
+
+        lines = [
+            "### Inventory figures",
+            "",
+            f"- Products: {self.product_count}",
+            f"- Units in stock: {self.total_units}",
+            f"- Inventory value: {self.total_value:,.2f}",
+            f"- Out of stock: {self.out_of_stock}",
+        ]
+        sections = [
+            ("Value by category", self.value_by_category, ("CATEGORY", "PRODUCTS", "UNITS", "VALUE")),
+            ("Most valuable products", self.top_by_value, ("NAME", "CATEGORY", "STOCK", "PRICE", "VALUE")),
+            (
+                f"Low stock (at or below {self.low_stock_threshold} units)",
+                self.low_stock,
+                ("NAME", "CATEGORY", "STOCK"),
+            ),
+            ("Outliers", self.outliers, ("NAME", "COLUMN", "VALUE", "LOW_FENCE", "HIGH_FENCE")),
+        ]
+        if self.best_sellers is not None:
+            sections.append(
+                (f"Best sellers (last {BEST_SELLER_DAYS} days)", self.best_sellers, ("NAME", "UNITS_SOLD"))
+            )
+        for title, rows, columns in sections:
+            lines += ["", f"#### {title}", ""]
+            lines += _markdown_table(rows, columns) if rows else ["(none)"]
+        return "\n".join(lines)
+
+
+def _markdown_table(rows: list[dict[str, Any]], columns: tuple[str, ...]) -> list[str]:
+    def cell(value: Any) -> str:
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return "" if value is None else str(value)
+
+    return [
+        "| " + " | ".join(columns) + " |",
+        "|" + "---|" * len(columns),
+        *("| " + " | ".join(cell(row.get(column)) for column in columns) + " |" for row in rows),
+    ]
+
+
+def database_version(db_path: str | Path) -> str:
+    """Return a token that changes whenever the database file (or its WAL) is written.
+
+    Combines SQLite's file change counter (header bytes 24-27, bumped by every
+    committed rollback-journal transaction) with the size and mtime of the
+    database and its WAL, which is where WAL-mode commits land.
+    """
+
+    parts = []
+    for path in (Path(db_path), Path(f"{db_path}-wal")):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    if not parts:
+        return "missing"
+    with open(db_path, "rb") as handle:
+        header = handle.read(28)
+    change_counter = int.from_bytes(header[24:28], "big") if len(header) == 28 else 0
+    return f"{change_counter}/" + "/".join(parts)
+
+
+def _rows(connection: sqlite3.Connection, sql: str, parameters: tuple = ()) -> list[dict[str, Any]]:
+    cursor = connection.execute(sql, parameters)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _outliers(connection: sqlite3.Connection, top_n: int) -> list[dict[str, Any]]:
+    """Products whose PRICE or STOCK lies outside the Tukey fences, most extreme first."""
+
+    import pandas as pd
+
+    frame = pd.read_sql_query(
+        f"SELECT NAME, PRICE, {INVENTORY_VALUE_COLUMN} FROM {PRODUCT_TABLE}", connection
+    )
+    found = []
+    for column in ("PRICE", INVENTORY_VALUE_COLUMN):
+        values = pd.to_numeric(frame[column], errors="coerce")
+        low_quartile, high_quartile = values.quantile([0.25, 0.75])
+        spread = high_quartile - low_quartile
+        if pd.isna(spread) or spread <= 0:
+            continue
+        low, high = low_quartile - OUTLIER_FENCE * spread, high_quartile + OUTLIER_FENCE * spread
+        mask = (values < low) | (values > high)
+        distance = (values[mask] - values[mask].clip(low, high)).abs() / spread
+        for index in distance.sort_values(ascending=False).index:
+            found.append(
+                {
+                    "NAME": frame.at[index, "NAME"],
+                    "COLUMN": column,
+                    "VALUE": float(values[index]),
+                    "LOW_FENCE": float(low),
+                    "HIGH_FENCE": float(high),
+                    "_distance": float(distance[index]),
+                }
+            )
+    found.sort(key=lambda row: row.pop("_distance"), reverse=True)
+    return found[:top_n]
+
+
+def _best_sellers(connection: sqlite3.Connection, top_n: int, day: str) -> list[dict[str, Any]] | None:
+    if not has_stock_ledger(connection):
+        return None
+    since = (datetime.fromisoformat(day) - timedelta(days=BEST_SELLER_DAYS - 1)).strftime("%Y-%m-%d")
+    return _rows(
+        connection,
+        f"""
+        SELECT COALESCE(p.NAME, 'Product #' || m.PRODUCT_ID) AS NAME, -SUM(m.DELTA) AS UNITS_SOLD
+        FROM {STOCK_MOVEMENT_TABLE} AS m
+        LEFT JOIN {PRODUCT_TABLE} AS p ON p.ID = m.PRODUCT_ID
+        WHERE m.MOVED_AT >= ? AND {outflow_condition_sql('m')}
+        GROUP BY m.PRODUCT_ID
+        ORDER BY UNITS_SOLD DESC, NAME
+        LIMIT ?
+        """,
+        (since, top_n),
+    )
+
+
+def _compute_report(
+    db_path: str | Path, version: str, day: str, top_n: int, low_stock_threshold: int
+) -> InventoryReport:
+    value = f"COALESCE(PRICE, 0) * COALESCE({INVENTORY_VALUE_COLUMN}, 0)"
+    category = f"COALESCE(NULLIF(TRIM(CATEGORY), ''), '{UNCATEGORIZED}')"
+    with closing(sqlite3.connect(db_path)) as connection:
+        product_count, total_units, total_value, out_of_stock = connection.execute(
+            f"""
+            SELECT COUNT(*), COALESCE(SUM({INVENTORY_VALUE_COLUMN}), 0), COALESCE(SUM({value}), 0),
+                   COALESCE(SUM(COALESCE({INVENTORY_VALUE_COLUMN}, 0) <= 0), 0)
+            FROM {PRODUCT_TABLE}
+            """
+        ).fetchone()
+        by_category = _rows(
+            connection,
+            f"""
+            SELECT {category} AS CATEGORY, COUNT(*) AS PRODUCTS,
+                   COALESCE(SUM({INVENTORY_VALUE_COLUMN}), 0) AS UNITS, ROUND(SUM({value}), 2) AS VALUE
+            FROM {PRODUCT_TABLE}
+            GROUP BY 1
+            ORDER BY VALUE DESC, CATEGORY
+            """,
+        )
+        top_by_value = _rows(
+            connection,
+            f"""
+            SELECT NAME, {category} AS CATEGORY, {INVENTORY_VALUE_COLUMN} AS STOCK, PRICE,
+                   ROUND({value}, 2) AS VALUE
+            FROM {PRODUCT_TABLE}
+            ORDER BY {value} DESC, NAME
+            LIMIT ?
+            """,
+            (top_n,),
+        )
+        low_stock = _rows(
+            connection,
+            f"""
+            SELECT NAME, {category} AS CATEGORY, {INVENTORY_VALUE_COLUMN} AS STOCK
+            FROM {PRODUCT_TABLE}
+            WHERE COALESCE({INVENTORY_VALUE_COLUMN}, 0) <= ?
+            ORDER BY COALESCE({INVENTORY_VALUE_COLUMN}, 0), NAME
+            LIMIT ?
+            """,
+            (low_stock_threshold, top_n),
+        )
+        outliers = _outliers(connection, top_n)
+        best_sellers = _best_sellers(connection, top_n, day)
+    return InventoryReport(
+        database_version=version,
+        generated_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        product_count=product_count,
+        total_units=int(total_units),
+        total_value=round(float(total_value), 2),
+        out_of_stock=int(out_of_stock),
+        low_stock_threshold=low_stock_threshold,
+        value_by_category=by_category,
+        top_by_value=top_by_value,
+        low_stock=low_stock,
+        outliers=outliers,
+        best_sellers=best_sellers,
+    )
+
+
+_cache: OrderedDict[tuple, InventoryReport] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_report(
+    db_path: str | Path,
+    *,
+    top_n: int = DEFAULT_TOP_N,
+    low_stock_threshold: int = DEFAULT_LOW_STOCK_THRESHOLD,
+    use_cache: bool = True,
+) -> InventoryReport:
+    """Return the report figures for ``db_path``, reusing them while the database is unchanged."""
+
+    version = database_version(db_path)
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    key = (str(Path(db_path).resolve()), version, day, top_n, low_stock_threshold)
+    if use_cache:
+        with _cache_lock:
+            report = _cache.get(key)
+            if report is not None:
+                _cache.move_to_end(key)
+                REPORT_CACHE.inc(result="hit")
+                return report
+        REPORT_CACHE.inc(result="miss")
+    report = _compute_report(db_path, version, day, top_n, low_stock_threshold)
+    if use_cache:
+        with _cache_lock:
+            _cache[key] = report
+            while len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+    return report
+
+
+def clear_report_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,195 @@
+"""Point-in-time stock levels and velocities from the STOCK_MOVEMENT ledger.
+
+Triggers on PRODUCT (see ``database``) append one movement per STOCK change.
+Summing a product's deltas replays its history. To keep "stock as of T"
+cheap after years of movements, ``take_snapshot`` periodically checkpoints
+the running level of every product that moved since the previous snapshot.
+A point-in-time query then reads each product's latest checkpoint at or
+before T and adds only the movements recorded after it. Velocity queries
+aggregate a time window through the ``(PRODUCT_ID, MOVED_AT, DELTA)`` and
+``(MOVED_AT, PRODUCT_ID, DELTA)`` covering indexes and never touch the table.
+
+Snapshots assume movement IDs and timestamps increase together, which holds
+for a single database file written by one clock.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from database import (
+    LEDGER_TIME_FORMAT_SQL,
+    STOCK_MOVEMENT_TABLE,
+    STOCK_SNAPSHOT_LEVEL_TABLE,
+    STOCK_SNAPSHOT_TABLE,
+    has_stock_ledger,
+)
+
+# Take a checkpoint once this many movements have accumulated since the last one.
+SNAPSHOT_EVERY_MOVEMENTS = 10_000
+
+
+@dataclass(frozen=True)
+class StockVelocity:
+    product_id: int
+    units_in: int
+    units_out: int
+    days: float
+
+    @property
+    def net(self) -> int:
+        return self.units_in - self.units_out
+
+    @property
+    def daily_outflow(self) -> float:
+        return self.units_out / self.days if self.days > 0 else 0.0
+
+
+def ledger_time(moment: datetime | str) -> str:
+    """Format a datetime the way the ledger stores it (UTC, millisecond ISO-8601).
+
+    Naive datetimes are taken as UTC. Strings are assumed to be in the ledger
+    format already and are passed through.
+    """
+
+    if isinstance(moment, str):
+        return moment
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def _product_filter(column: str, product_ids: Iterable[int] | None) -> tuple[str, list[int]]:
+    if product_ids is None:
+        return "", []
+    ids = [int(product_id) for product_id in product_ids]
+    return f" AND {column} IN ({', '.join('?' for _ in ids)})", ids
+
+
+def take_snapshot(connection: sqlite3.Connection) -> int | None:
+    """Checkpoint the running level of every product that moved since the last snapshot.
+
+    Runs in the caller's transaction. Returns the new snapshot ID, or ``None``
+    when nothing has moved.
+    """
+
+    previous_id, previous_last = connection.execute(
+        f"SELECT COALESCE(MAX(ID), 0), COALESCE(MAX(LAST_MOVEMENT_ID), 0) FROM {STOCK_SNAPSHOT_TABLE}"
+    ).fetchone()
+    last_movement = connection.execute(f"SELECT COALESCE(MAX(ID), 0) FROM {STOCK_MOVEMENT_TABLE}").fetchone()[0]
+    if last_movement <= previous_last:
+        return None
+    snapshot_id = connection.execute(
+        f"INSERT INTO {STOCK_SNAPSHOT_TABLE} (TAKEN_AT, LAST_MOVEMENT_ID) VALUES ({LEDGER_TIME_FORMAT_SQL}, ?)",
+        (last_movement,),
+    ).lastrowid
+    connection.execute(
+        f"""
+        INSERT INTO {STOCK_SNAPSHOT_LEVEL_TABLE} (PRODUCT_ID, SNAPSHOT_ID, STOCK)
+        SELECT m.PRODUCT_ID, :snapshot, SUM(m.DELTA) + COALESCE((
+            SELECT l.STOCK FROM {STOCK_SNAPSHOT_LEVEL_TABLE} AS l
+            WHERE l.PRODUCT_ID = m.PRODUCT_ID AND l.SNAPSHOT_ID <= :previous
+            ORDER BY l.SNAPSHOT_ID DESC LIMIT 1
+        ), 0)
+        FROM {STOCK_MOVEMENT_TABLE} AS m
+        WHERE m.ID > :after AND m.ID <= :through
+        GROUP BY m.PRODUCT_ID
+        """,
+        {"snapshot": snapshot_id, "previous": previous_id, "after": previous_last, "through": last_movement},
+    )
+    return snapshot_id
+
+
+def checkpoint_if_due(db_path: str | Path, every: int = SNAPSHOT_EVERY_MOVEMENTS) -> int | None:
+    """Take a snapshot when at least ``every`` movements are not yet checkpointed."""
+
+    with closing(sqlite3.connect(db_path)) as connection, connection:
+        if not has_stock_ledger(connection):
+            return None
+        pending = connection.execute(
+            f"SELECT COALESCE(MAX(ID), 0) - (SELECT COALESCE(MAX(LAST_MOVEMENT_ID), 0) FROM {STOCK_SNAPSHOT_TABLE}) "
+            f"FROM {STOCK_MOVEMENT_TABLE}"
+        ).fetchone()[0]
+        if pending < every:
+            return None
+        return take_snapshot(connection)
+
+
+def stock_as_of(
+    db_path: str | Path,
+    moment: datetime | str,
+    product_ids: Iterable[int] | None = None,
+) -> dict[int, int]:
+    """Return ``{product ID: stock}`` as it stood at ``moment``; products at zero are omitted.
+
+    Each product's level is its latest snapshot at or before ``moment`` plus
+    the movements recorded after that snapshot, up to ``moment``.
+    """
+
+    at = ledger_time(moment)
+    level_filter, level_ids = _product_filter("PRODUCT_ID", product_ids)
+    movement_filter, movement_ids = _product_filter("PRODUCT_ID", product_ids)
+    with closing(sqlite3.connect(db_path)) as connection:
+        snapshot_id, last_movement = connection.execute(
+            f"SELECT COALESCE(MAX(ID), 0), COALESCE(MAX(LAST_MOVEMENT_ID), 0) FROM {STOCK_SNAPSHOT_TABLE} "
+            "WHERE TAKEN_AT <= ?",
+            (at,),
+        ).fetchone()
+        # SQLite returns STOCK from the row holding MAX(SNAPSHOT_ID) in each group.
+        rows = connection.execute(
+            f"""
+            SELECT PRODUCT_ID, SUM(STOCK) FROM (
+                SELECT PRODUCT_ID, STOCK FROM (
+                    SELECT PRODUCT_ID, STOCK, MAX(SNAPSHOT_ID)
+                    FROM {STOCK_SNAPSHOT_LEVEL_TABLE}
+                    WHERE SNAPSHOT_ID <= ?{level_filter}
+                    GROUP BY PRODUCT_ID
+                )
+                UNION ALL
+                SELECT PRODUCT_ID, DELTA FROM {STOCK_MOVEMENT_TABLE}
+                WHERE ID > ? AND MOVED_AT <= ?{movement_filter}
+            )
+            GROUP BY PRODUCT_ID
+            HAVING SUM(STOCK) != 0
+            """,
+            (snapshot_id, *level_ids, last_movement, at, *movement_ids),
+        ).fetchall()
+    return {product_id: stock for product_id, stock in rows}
+
+
+def stock_velocity(
+    db_path: str | Path,
+    since: datetime | str,
+    until: datetime | str | None = None,
+    product_ids: Iterable[int] | None = None,
+) -> list[StockVelocity]:
+    """Return units moved in and out per product between ``since`` and ``until`` (default: now)."""
+
+    start = ledger_time(since)
+    end = ledger_time(until if until is not None else datetime.now(timezone.utc))
+    days = (_parse_ledger_time(end) - _parse_ledger_time(start)).total_seconds() / 86_400
+    product_filter, ids = _product_filter("PRODUCT_ID", product_ids)
+    with closing(sqlite3.connect(db_path)) as connection:
+        rows = connection.execute(
+            f"""
+            SELECT PRODUCT_ID,
+                   SUM(CASE WHEN DELTA > 0 THEN DELTA ELSE 0 END),
+                   SUM(CASE WHEN DELTA < 0 THEN -DELTA ELSE 0 END)
+            FROM {STOCK_MOVEMENT_TABLE}
+            WHERE MOVED_AT > ? AND MOVED_AT <= ?{product_filter}
+            GROUP BY PRODUCT_ID
+            ORDER BY PRODUCT_ID
+            """,
+            (start, end, *ids),
+        ).fetchall()
+    return [StockVelocity(product_id, units_in, units_out, days) for product_id, units_in, units_out in rows]
+
+
+def _parse_ledger_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import analytics
+import api
+from audit import get_audit_log_path
+from database import ensure_schema
+
+
+@pytest.fixture
+def api_server(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    with sqlite3.connect(db_path) as connection:
+        connection.executemany(
+            "INSERT INTO PRODUCT (NAME, CATEGORY, PRICE, STOCK) VALUES (?, ?, ?, ?)",
+            [("Widget", "Gadgets", 2.5, 4), ("Gizmo", "Gadgets", 10.0, 1)],
+        )
+
+    server = api.create_server(db_path, port=0, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", db_path
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _call(base_url: str, method: str, path: str, body: bytes | dict | None = None, token: str | None = "secret"):
+    data = json.dumps(body).encode("utf-8") if isinstance(body, dict) else body
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+def _json_call(*args, **kwargs):
+    status, body = _call(*args, **kwargs)
+    return status, json.loads(body)
+
+
+def test_requires_bearer_token_and_serves_dashboard(api_server):
+    base_url, _ = api_server
+
+    assert _json_call(base_url, "GET", "/dashboard", token=None)[0] == 401
+    assert _json_call(base_url, "GET", "/health") == (200, {"status": "ok"})
+    assert _json_call(base_url, "GET", "/dashboard") == (
+        200,
+        {"product_count": 2, "total_inventory_value": 20.0},
+    )
+    assert _json_call(base_url, "GET", "/nope")[0] == 404
+    assert _json_call(base_url, "POST", "/dashboard")[0] == 405
+
+    status, metrics_body = _call(base_url, "GET", "/metrics")
+    assert status == 200
+    assert b"inventory_sql_query_seconds" in metrics_body
+
+
+def test_sql_endpoint_validates_executes_and_audits(api_server):
+    base_url, db_path = api_server
+
+    status, payload = _json_call(base_url, "POST", "/sql", {"question": "show all products", "max_rows": 1})
+
+    assert status == 200
+    assert payload["validated_sql"].upper().startswith("SELECT")
+    assert payload["row_count"] == 2
+    assert len(payload["rows"]) == 1
+    assert payload["truncated"] is True
+    event = json.loads(get_audit_log_path(db_path).read_text(encoding="utf-8").splitlines()[-1])
+    assert event["event_type"] == "sql_query_review"
+    assert event["details"]["channel"] == "api"
+    assert event["details"]["status"] == "executed"
+
+    assert _json_call(base_url, "POST", "/sql", {"question": " "})[0] == 400
+    assert _json_call(base_url, "POST", "/sql", b"not json")[0] == 400
+
+
+def test_import_preview_is_cached_and_processed_by_id(api_server):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    base_url, db_path = api_server
+    workbook = io.BytesIO()
+    pd.DataFrame({"Product Name": ["Doohickey"], "Price": [3.0], "Stock": [7]}).to_excel(workbook, index=False)
+    data = workbook.getvalue()
+
+    status, first = _json_call(base_url, "POST", "/imports/preview?filename=new.xlsx", data)
+    assert status == 200
+    assert first["cached"] is False
+    assert first["row_count"] == 1
+    assert first["column_mappings"] == {"Product Name": "NAME", "Price": "PRICE", "Stock": "STOCK"}
+    assert _json_call(base_url, "POST", "/imports/preview", data)[1]["cached"] is True
+
+    status, processed = _json_call(
+        base_url, "POST", f"/imports/process?action=add&preview_id={first['preview_id']}"
+    )
+    assert (status, processed["processed_rows"]) == (200, 1)
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("SELECT STOCK FROM PRODUCT WHERE NAME = 'Doohickey'").fetchone() == (7,)
+
+    status, blocked = _json_call(
+        base_url, "POST", "/imports/process?action=remove", data
+    )
+    assert status == 422
+    assert "Destructive" in blocked["error"]
+    assert _json_call(base_url, "POST", "/imports/process?preview_id=unknown")[0] == 404
+    assert _json_call(base_url, "POST", "/imports/process?duplicate_policy=first", data)[0] == 400
+
+
+def test_analytics_endpoints_use_the_inventory_frame(api_server, monkeypatch):
+    base_url, _ = api_server
+    prompts = []
+
+    class FakeClient:
+        def generate(self, prompt: str) -> str:
+            prompts.append(prompt)
+            return "analysis"
+
+    monkeypatch.setattr(analytics, "_get_client", FakeClient)
+
+    status, body = _json_call(base_url, "POST", "/analytics/report")
+    assert status == 200
+    assert body["text"].startswith("analysis\n\n### Inventory figures")
+    assert "- Products: 2" in prompts[-1]
+    assert _json_call(
+        base_url, "POST", "/analytics/categorize", {"name": "Widget", "description": "Small part"}
+    ) == (200, {"text": "analysis"})
+    assert _json_call(base_url, "POST", "/analytics/categorize", {"name": "Widget"})[0] == 400
@@ -90,11 +90,21 @@ def test_map_columns_uses_versioned_prompt_builder():
 
     def fake_response(prompt: str) -> str:
         captured["prompt"] = prompt
-        return '{"Name": "NAME", "Price": "PRICE"}'
+        return '{"Brand Name": "BRAND"}'
 
-    mapping = map_columns(["Name", "Price"], ["NAME", "PRICE"], fake_response)
+    mapping = map_columns(["Name", "Brand Name"], ["NAME", "BRAND", "PRICE"], fake_response)
 
-    assert mapping == {"Name": "NAME", "Price": "PRICE"}
-    # The prompt must contain the columns so the model can produce a mapping.
-    assert "Name" in captured["prompt"]
+    assert mapping == {"Name": "NAME", "Brand Name": "BRAND"}
+    # Only the header the local matcher cannot settle is sent to the model,
+    # and the prompt must carry the schema so the model can produce a mapping.
+    assert "Excel columns: Brand Name\n" in captured["prompt"]
     assert "NAME" in captured["prompt"]
+
+
+def test_map_columns_skips_the_model_for_confident_matches():
+    def fail_response(prompt: str) -> str:
+        raise AssertionError("confident headers must not reach the model")
+
+    mapping = map_columns(["Product Name", "Unit Price", "Qty"], ["NAME", "PRICE", "STOCK"], fail_response)
+
+    assert mapping == {"Product Name": "NAME", "Unit Price": "PRICE", "Qty": "STOCK"}
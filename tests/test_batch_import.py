@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import batch_import
+from audit import get_audit_log_path
+from database import ensure_schema
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+
+@pytest.fixture
+def inventory_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    return db_path
+
+
+def _workbook(**sheets: dict[str, list]) -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        for name, rows in sheets.items():
+            pd.DataFrame(rows).to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+
+def _counting_map_columns(monkeypatch) -> list[list[str]]:
+    calls: list[list[str]] = []
+    real_map_columns = batch_import.map_columns
+
+    def counting(headers, existing_columns, response_fn):
+        calls.append(list(headers))
+        return real_map_columns(headers, existing_columns, None)
+
+    monkeypatch.setattr(batch_import, "map_columns", counting)
+    return calls
+
+
+def test_parse_upload_returns_every_sheet():
+    data = _workbook(Tools={"Name": ["Hammer"]}, Parts={"Item": ["Bolt"], "Qty": [9]})
+
+    sheets = batch_import.parse_upload("supplier.xlsx", data)
+
+    assert [sheet.sheet for sheet in sheets] == ["Tools", "Parts"]
+    assert [len(sheet.frame) for sheet in sheets] == [1, 1]
+    assert [sheet.sheet for sheet in batch_import.parse_upload("supplier.xlsx", data, all_sheets=False)] == [None]
+
+
+def test_import_batch_maps_each_layout_once_across_files(inventory_db: Path, monkeypatch):
+    calls = _counting_map_columns(monkeypatch)
+    files = [
+        ("week1.xlsx", _workbook(Tools={"Product Name": ["Hammer"], "Qty": [2]}, Parts={"Item": ["Bolt"]})),
+        ("week2.xlsx", _workbook(Sheet1={"qty": [5], "product-name": ["Saw"]})),
+        ("erp.csv", b"Product Name,Qty\nDrill,7\n"),
+    ]
+
+    results = batch_import.import_batch(inventory_db, files, "add", processes=2)
+
+    assert [(result.filename, result.status, result.processed_rows) for result in results] == [
+        ("week1.xlsx", "success", 2),
+        ("week2.xlsx", "success", 1),
+        ("erp.csv", "success", 1),
+    ]
+    assert sorted(calls) == [["Item"], ["Product Name", "Qty"]]
+    with sqlite3.connect(inventory_db) as connection:
+        stock = dict(connection.execute("SELECT NAME, STOCK FROM PRODUCT"))
+    assert stock == {"Hammer": 2, "Bolt": None, "Saw": 5, "Drill": 7}
+    events = [json.loads(line) for line in get_audit_log_path(inventory_db).read_text(encoding="utf-8").splitlines()]
+    assert [event["details"]["uploaded_filename"] for event in events] == ["week1.xlsx", "week2.xlsx", "erp.csv"]
+    assert [sheet["sheet"] for sheet in events[0]["details"]["sheets"]] == ["Tools", "Parts"]
+
+
+def test_failed_file_rolls_back_all_its_sheets_and_columns(inventory_db: Path):
+    files = [
+        ("good.xlsx", _workbook(Sheet1={"Name": ["Hammer"]})),
+        # The second sheet adds SUPPLIER (approved) and then hits a row without a product name mapping.
+        ("bad.xlsx", _workbook(A={"Name": ["Saw"], "Supplier": ["Acme"]}, B={"Qty": [1]})),
+        ("broken.xlsx", b"PK\x03\x04 not really a zip"),
+    ]
+
+    results = batch_import.import_batch(inventory_db, files, "add", allow_schema_changes=True, processes=1)
+
+    assert [result.status for result in results] == ["success", "failed", "failed"]
+    assert "NAME" in results[1].error
+    assert results[1].processed_rows == 0
+    with sqlite3.connect(inventory_db) as connection:
+        assert [row[0] for row in connection.execute("SELECT NAME FROM PRODUCT")] == ["Hammer"]
+        columns = [info[1] for info in connection.execute("PRAGMA table_info(PRODUCT)")]
+    assert "SUPPLIER" not in columns
+
+
+def test_destructive_batches_need_approval(inventory_db: Path):
+    with pytest.raises(batch_import.GuardrailViolation):
+        batch_import.import_batch(inventory_db, [("x.csv", b"Name\nHammer\n")], "remove")
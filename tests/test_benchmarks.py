@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from benchmarks.cases import CASES, _map_column_sizes  # noqa: E402
+from benchmarks.load import _parse_mix, is_lock_error, run_load  # noqa: E402
+from benchmarks.run import compare_reports, predict_seconds, run_suite  # noqa: E402
+
+
+def test_benchmark_suite_runs_every_case_offline(tmp_path):
+    with mock.patch.dict(sys.modules), mock.patch.dict(os.environ, clear=False):
+        os.environ.pop("GOOGLE_API_KEY", None)
+        report = run_suite(sizes=(40,), repeat=1, workdir=tmp_path, log=lambda line: None)
+
+    measured = {result["case"] for result in report["results"] if "seconds" in result}
+    assert measured == {case.name for case in CASES}
+    assert report["suite"] == "inventory-hot-paths"
+    assert all(result["seconds"]["min"] >= 0 for result in report["results"])
+
+
+def test_benchmark_budget_skips_larger_sizes(tmp_path):
+    with mock.patch.dict(sys.modules), mock.patch.dict(os.environ, clear=False):
+        report = run_suite(
+            sizes=(20, 40),
+            repeat=1,
+            case_names=["seed_database"],
+            budget_seconds=0.0,
+            workdir=tmp_path,
+            log=lambda line: None,
+        )
+
+    assert report["results"][0]["size"] == 20 and "seconds" in report["results"][0]
+    assert report["results"][1] == {"case": "seed_database", "size": 40, "skipped": "over budget"}
+
+
+def test_budget_prediction_follows_the_measured_growth_rate():
+    assert predict_seconds([(10, 0.5)], 100) == pytest.approx(5.0)
+    # Quadratic growth between the last two runs is extrapolated as quadratic.
+    assert predict_seconds([(10, 0.01), (100, 1.0)], 1_000) == pytest.approx(100.0)
+    # Sub-linear runs (warm caches, fixed overhead) are still assumed linear.
+    assert predict_seconds([(10, 1.0), (100, 2.0)], 1_000) == pytest.approx(20.0)
+
+
+def test_map_column_counts_follow_the_selected_sizes():
+    assert _map_column_sizes((1_000,)) == (10,)
+    assert _map_column_sizes((40,)) == (10,)
+    assert _map_column_sizes((1_000, 100_000, 1_000_000)) == (10, 100, 1_000)
+
+
+def test_compare_reports_pairs_results_by_case_and_size():
+    baseline = {"results": [{"case": "a", "size": 10, "seconds": {"min": 2.0}}]}
+    current = {
+        "results": [
+            {"case": "a", "size": 10, "seconds": {"min": 1.0}},
+            {"case": "b", "size": 10, "seconds": {"min": 1.0}},
+        ]
+    }
+
+    assert compare_reports(current, baseline) == [
+        {"case": "a", "size": 10, "baseline_seconds": 2.0, "current_seconds": 1.0, "ratio": 0.5}
+    ]
+
+
+def test_load_harness_runs_every_action_across_sessions(tmp_path):
+    with mock.patch.dict(sys.modules), mock.patch.dict(os.environ, clear=False):
+        os.environ.pop("GOOGLE_API_KEY", None)
+        os.environ["FAKE_GEMINI_LATENCY_MS"] = "0"
+        report = run_load(
+            sessions=3,
+            duration_seconds=None,
+            iterations=8,
+            rows=200,
+            mix={"dashboard": 1, "sql_query": 1, "upload": 1, "analytics": 1},
+            think_seconds=0.0,
+            seed=1,
+            workdir=tmp_path,
+            log=lambda line: None,
+        )
+
+    assert report["suite"] == "inventory-load"
+    assert report["totals"]["count"] == 24
+    assert report["totals"]["errors"] == 0, report["error_types"]
+    for action in ("dashboard", "sql_query", "upload", "analytics"):
+        seconds = report["actions"][action]["seconds"]
+        assert report["actions"][action]["count"] > 0
+        assert 0 <= seconds["p50"] <= seconds["p95"] <= seconds["p99"] <= seconds["max"]
+
+
+def test_load_harness_classifies_lock_errors_and_parses_mixes():
+    assert is_lock_error(sqlite3.OperationalError("database is locked"))
+    assert not is_lock_error(sqlite3.OperationalError("no such table: PRODUCT"))
+    assert not is_lock_error(RuntimeError("database is locked"))
+    assert _parse_mix("dashboard=2, upload") == {"dashboard": 2.0, "upload": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        _parse_mix("checkout=1")
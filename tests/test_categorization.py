@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+import categorization
+
+
+class _JsonClient:
+    """Answer every batch by echoing a category derived from each product name."""
+
+    def __init__(self, fail_on_ids=()):
+        self.fail_on_ids = set(fail_on_ids)
+        self.prompts = []
+        self.generation_configs = []
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, *, generation_config=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.generation_configs.append(generation_config)
+        items = json.loads(re.search(r"Products \(JSON\): (.*)\n", prompt).group(1))
+        if any(item["id"] in self.fail_on_ids for item in items):
+            raise RuntimeError("quota exceeded")
+        return json.dumps([{"id": item["id"], "category": f"Cat-{item['name']}"} for item in items])
+
+
+class _NoWaitLimiter:
+    def __init__(self):
+        self.calls = 0
+
+    def acquire(self, tokens=1.0):
+        self.calls += 1
+
+
+@pytest.fixture
+def uncategorized_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "inventory.db"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(
+            "CREATE TABLE PRODUCT (ID INTEGER PRIMARY KEY AUTOINCREMENT, NAME TEXT, "
+            "CATEGORY TEXT, SPECIFICATIONS TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO PRODUCT (NAME, CATEGORY, SPECIFICATIONS) VALUES (?, ?, ?)",
+            [(f"P{index}", None if index % 2 else "", f"spec {index}") for index in range(1, 11)]
+            + [("Known", "Tools", "already categorized")],
+        )
+    return db_path
+
+
+def _categories(db_path: Path) -> dict[str, str | None]:
+    with sqlite3.connect(db_path) as connection:
+        return dict(connection.execute("SELECT NAME, CATEGORY FROM PRODUCT"))
+
+
+def test_bulk_categorization_packs_batches_and_writes_back(uncategorized_db: Path):
+    client = _JsonClient()
+    limiter = _NoWaitLimiter()
+    progress = []
+
+    result = categorization.categorize_uncategorized_products(
+        uncategorized_db,
+        client=client,
+        chunk_size=4,
+        batch_size=2,
+        max_workers=3,
+        rate_limiter=limiter,
+        progress_callback=lambda current, total: progress.append((current, total)),
+    )
+
+    assert result.completed
+    assert result.rows_selected == 10
+    assert result.rows_categorized == 10
+    assert result.chunks_processed == 3
+    assert len(client.prompts) == limiter.calls == 5
+    assert progress == [(4, 10), (8, 10), (10, 10)]
+    assert all(config == {"response_mime_type": "application/json"} for config in client.generation_configs)
+    assert "Known categories: Tools" in client.prompts[0]
+
+    categories = _categories(uncategorized_db)
+    assert categories["Known"] == "Tools"
+    assert all(categories[f"P{index}"] == f"Cat-P{index}" for index in range(1, 11))
+
+    audit_path = uncategorized_db.with_name("ai_operation_audit.jsonl")
+    event = json.loads(audit_path.read_text(encoding="utf-8").splitlines()[-1])
+    assert event["event_type"] == "bulk_categorization"
+    assert event["details"]["status"] == "completed"
+
+
+def test_bulk_categorization_resumes_after_failed_chunk(uncategorized_db: Path):
+    failing = _JsonClient(fail_on_ids={6})
+
+    first = categorization.categorize_uncategorized_products(
+        uncategorized_db,
+        client=failing,
+        chunk_size=4,
+        batch_size=2,
+        rate_limiter=_NoWaitLimiter(),
+    )
+
+    assert not first.completed
+    assert first.failed_batches == 1
+    assert categorization.get_checkpoint(uncategorized_db) == 4
+    categories = _categories(uncategorized_db)
+    assert categories["P7"] == "Cat-P7"  # successful batch of the failed chunk is kept
+    assert not categories["P6"]
+
+    resumed_client = _JsonClient()
+    second = categorization.categorize_uncategorized_products(
+        uncategorized_db,
+        client=resumed_client,
+        chunk_size=4,
+        batch_size=2,
+        rate_limiter=_NoWaitLimiter(),
+    )
+
+    assert second.completed
+    assert second.rows_selected == 4  # P5, P6, P9 and P10; the rest are already done
+    assert all(value.startswith("Cat-") for name, value in _categories(uncategorized_db).items() if name != "Known")
+
+
+def test_parse_categorization_response_drops_unknown_and_empty_entries():
+    response = '```json\n[{"id": 1, "category": " Tools "}, {"id": 9, "category": "X"}, {"id": 2, "category": ""}]\n```'
+
+    assert categorization.parse_categorization_response(response, {1, 2}) == {1: "Tools"}
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        categorization.TokenBucket(0)
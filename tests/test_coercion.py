@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import coercion
+import excel_processing
+from audit import get_audit_log_path
+from database import ensure_schema
+
+pd = pytest.importorskip("pandas")
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data: bytes, name: str = "stock.csv"):
+        super().__init__(data)
+        self.name = name
+
+
+@pytest.mark.parametrize(
+    ("declared", "affinity"),
+    [
+        ("INTEGER", "INTEGER"),
+        ("BIGINT", "INTEGER"),
+        ("VARCHAR(40)", "TEXT"),
+        ("TEXT", "TEXT"),
+        ("REAL", "REAL"),
+        ("DOUBLE PRECISION", "REAL"),
+        ("DECIMAL(10,2)", "NUMERIC"),
+        ("", "BLOB"),
+        (None, "BLOB"),
+    ],
+)
+def test_sqlite_affinity_follows_the_declared_type_rules(declared, affinity):
+    assert coercion.sqlite_affinity(declared) == affinity
+
+
+def test_coerce_frame_converts_columns_in_bulk_and_reports_failures():
+    frame = pd.DataFrame(
+        {
+            "Stock": ["1,234", "5", None, "lots"],
+            "Price": ["$1.50", "2", None, " "],
+            "Sku": [1001.0, 1002.0, None, 1004.0],
+            "Added": pd.to_datetime(["2024-01-01", None, "2024-02-01 10:30", "2024-03-01"], format="ISO8601"),
+            "Notes": ["a", "b", "c", "d"],
+        }
+    )
+    failures = {}
+
+    coerced = coercion.coerce_frame(
+        frame, {"Stock": "INTEGER", "Price": "REAL", "Sku": "TEXT", "Added": "TEXT"}, failures
+    )
+    rows = list(coercion.iter_records(coerced))
+
+    assert rows[0] == {"Stock": 1234, "Price": 1.5, "Sku": "1001", "Added": "2024-01-01", "Notes": "a"}
+    assert rows[2] == {"Stock": None, "Price": None, "Sku": None, "Added": "2024-02-01 10:30:00", "Notes": "c"}
+    assert rows[3]["Stock"] == "lots"  # kept as SQLite would have stored it
+    assert rows[3]["Price"] is None
+    assert {type(value) for row in rows for value in row.values()} <= {int, float, str, type(None)}
+    assert failures == {"Stock": {"failed": 1, "examples": ["lots"]}}
+
+
+def test_failures_accumulate_across_chunks():
+    failures = {}
+    for chunk in (pd.DataFrame({"Qty": ["x", "1"]}), pd.DataFrame({"Qty": ["y", "z"]})):
+        coercion.coerce_frame(chunk, {"Qty": "INTEGER"}, failures)
+
+    assert failures == {"Qty": {"failed": 3, "examples": ["x", "y", "z"]}}
+
+
+@pytest.mark.parametrize(
+    ("values", "expected"),
+    [
+        ([1, 2, None], "INTEGER"),
+        (["1,000", "20"], "INTEGER"),
+        ([1.5, 2.0], "REAL"),
+        ([True, False], "INTEGER"),
+        (["red", "12"], "TEXT"),
+        ([None, " "], None),
+    ],
+)
+def test_infer_sqlite_type_reads_the_values(values, expected):
+    assert coercion.infer_sqlite_type(pd.Series(values)) == expected
+
+
+def test_import_stores_typed_values_and_types_new_columns_from_data(tmp_path: Path):
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    data = b'Name,Price,Stock,Reorder Level\nWidget,"1,234.50","1,200",10\nGizmo,2,x,\n'
+
+    preview = excel_processing.preview_excel_import(_Upload(data), str(db_path))
+    assert preview["new_column_types"] == {"REORDER_LEVEL": "INTEGER"}
+    assert preview["coercion_failures"] == {"STOCK": {"failed": 1, "examples": ["x"]}}
+
+    excel_processing.process_excel_file(_Upload(data), str(db_path), "add", allow_schema_changes=True)
+
+    with sqlite3.connect(db_path) as connection:
+        declared = {info[1]: info[2] for info in connection.execute("PRAGMA table_info(PRODUCT)")}
+        rows = connection.execute(
+            "SELECT NAME, PRICE, typeof(PRICE), STOCK, typeof(STOCK), REORDER_LEVEL FROM PRODUCT ORDER BY NAME"
+        ).fetchall()
+    assert declared["REORDER_LEVEL"] == "INTEGER"
+    assert rows == [("Gizmo", 2.0, "real", "x", "text", None), ("Widget", 1234.5, "real", 1200, "integer", 10)]
+    event = json.loads(get_audit_log_path(db_path).read_text(encoding="utf-8").splitlines()[-1])
+    assert event["details"]["coercion_failures"] == {"STOCK": {"failed": 1, "examples": ["x"]}}
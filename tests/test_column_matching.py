@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+import column_matching
+from column_matching import ColumnMatcher, match_columns
+
+PRODUCT_COLUMNS = ["ID", "NAME", "CATEGORY", "BRAND", "PRICE", "STOCK", "SIZE", "COLOR", "WEIGHT", "SPECIFICATIONS"]
+
+
+def test_synonyms_and_near_misses_resolve_offline():
+    matches = match_columns(["Product Name", "Unit Price", "QTY", "Colour", "Categry"], PRODUCT_COLUMNS)
+
+    assert {header: match.target for header, match in matches.items()} == {
+        "Product Name": "NAME",
+        "Unit Price": "PRICE",
+        "QTY": "STOCK",
+        "Colour": "COLOR",
+        "Categry": "CATEGORY",
+    }
+    assert all(match.confident for match in matches.values())
+
+
+def test_unrelated_headers_become_new_columns_without_escalation():
+    [match] = match_columns(["Supplier"], PRODUCT_COLUMNS).values()
+
+    assert (match.target, match.new_column, match.confident) == ("SUPPLIER", True, True)
+
+
+def test_assignment_never_maps_two_headers_to_one_column():
+    matches = match_columns(["Name", "Product Name"], PRODUCT_COLUMNS)
+
+    assert matches["Name"].target == "NAME" and matches["Name"].confident
+    assert matches["Product Name"].target != "NAME"
+    assert not matches["Product Name"].confident
+
+
+def test_ties_between_columns_are_ambiguous():
+    matches = match_columns(["Brand Name"], PRODUCT_COLUMNS)
+    assert not matches["Brand Name"].confident
+
+    # With both STOCK and QUANTITY in the schema "Qty" could mean either.
+    assert not match_columns(["Qty"], [*PRODUCT_COLUMNS, "QUANTITY"])["Qty"].confident
+
+
+def test_synonym_targets_defer_to_existing_columns():
+    matcher = ColumnMatcher(["NAME", "STOCK"])
+
+    assert "QUANTITY" not in matcher.targets
+    assert matcher.match(["Quantity"])["Quantity"].target == "STOCK"
+
+
+def test_hungarian_assignment_maximizes_total_score():
+    # Greedy would give row 0 column 0 (0.9) and leave row 1 with 0.1.
+    assert column_matching._hungarian_maximize([[0.9, 0.8], [0.85, 0.1]]) == [1, 0]
+
+
+def test_matchers_are_shared_per_schema():
+    assert column_matching.get_matcher(PRODUCT_COLUMNS) is column_matching.get_matcher(tuple(PRODUCT_COLUMNS))
+
+
+def test_assignment_solves_tall_matrices_transposed():
+    assert sorted(column_matching._assign([[0.9, 0.0], [0.8, 0.7], [0.85, 0.1]])) == [(0, 0), (1, 1)]
+
+
+def test_hundreds_of_headers_match_quickly():
+    headers = [f"{word} {index}" for index in range(150) for word in ("Price", "Attribute")]
+    started = time.perf_counter()
+    matches = match_columns(headers, PRODUCT_COLUMNS)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert sum(match.target == "PRICE" for match in matches.values()) == 1
+    assert all(matches[f"Attribute {index}"].new_column for index in range(150))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import statistics
+
+import pytest
+
+import analytics
+import fake_gemini
+import gemini_client
+import prompt
+from metrics import LLM_REQUEST_SECONDS
+
+
+@pytest.fixture()
+def fake_backend(monkeypatch):
+    monkeypatch.setenv(gemini_client.BACKEND_ENV, "fake")
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    fake_gemini.reset(fake_gemini.FakeSettings(median_ms=0, seed=7))
+    gemini_client.reset_gateway(gemini_client.GeminiGateway(sleep=lambda seconds: None))
+    yield
+    fake_gemini.reset()
+    gemini_client.reset_gateway()
+
+
+def test_settings_read_latency_error_rate_and_seed_from_the_environment(monkeypatch):
+    monkeypatch.setenv(fake_gemini.LATENCY_ENV, "200,900")
+    monkeypatch.setenv(fake_gemini.ERROR_RATE_ENV, "0.1")
+    monkeypatch.setenv(fake_gemini.SEED_ENV, "3")
+    assert fake_gemini.FakeSettings.from_env() == fake_gemini.FakeSettings(200, 900, 0.1, 0.3, 3)
+
+    monkeypatch.setenv(fake_gemini.LATENCY_ENV, "50")
+    fixed = fake_gemini.FakeSettings.from_env()
+    assert (fixed.median_ms, fixed.p95_ms) == (50, 50)
+
+
+def test_latency_follows_the_configured_median_and_p95():
+    fake_gemini.reset(fake_gemini.FakeSettings(median_ms=400, p95_ms=1200, seed=11))
+    try:
+        samples = sorted(fake_gemini._draw()[0] * 1000 for _ in range(4000))
+    finally:
+        fake_gemini.reset()
+
+    assert statistics.median(samples) == pytest.approx(400, rel=0.1)
+    assert samples[int(len(samples) * 0.95)] == pytest.approx(1200, rel=0.15)
+
+
+def test_templated_answers_follow_the_prompt_kind():
+    sql_prompt = prompt.build_sql_generation_prompt("PRODUCT", "How many products are there?")
+    mapping_prompt = prompt.build_column_mapping_prompt(["Product Name", "Qty"], ["NAME", "STOCK"])
+    categorization_prompt = prompt.build_bulk_categorization_prompt(
+        [{"id": 1, "name": "Cordless drill", "description": "Power tools"}, {"id": 2, "name": "Mug"}],
+        ["Power Tools", "Garden"],
+    )
+
+    assert fake_gemini.respond(sql_prompt) == "SELECT COUNT(*) AS product_count FROM PRODUCT"
+    assert json.loads(fake_gemini.respond(mapping_prompt)) == {"Product Name": "NAME", "Qty": "STOCK"}
+    assert json.loads(fake_gemini.respond(categorization_prompt)) == [
+        {"id": 1, "category": "Power Tools"},
+        {"id": 2, "category": fake_gemini.FALLBACK_CATEGORY},
+    ]
+    assert "Products: 12" in fake_gemini.respond("Summarize.\n- Products: 12\n- Out of stock: 1")
+
+
+def test_errors_look_retryable_to_the_gateway():
+    fake_gemini.reset(fake_gemini.FakeSettings(median_ms=0, error_rate=1.0, seed=1))
+    try:
+        with pytest.raises((fake_gemini.ServiceUnavailable, fake_gemini.ResourceExhausted)) as raised:
+            fake_gemini.GenerativeModel().generate_content("hello")
+    finally:
+        fake_gemini.reset()
+
+    assert gemini_client.is_retryable(raised.value)
+
+
+def test_env_var_routes_prompt_and_analytics_to_the_fake_without_a_key(fake_backend):
+    before = LLM_REQUEST_SECONDS.count(caller="get_gemini_response", source="fake")
+
+    sql = prompt.generate_sql_query("PRODUCT", "what is the average price?")
+    streamed = list(prompt.stream_sql_query("PRODUCT", "what is the average price?"))
+    client = analytics.GeminiAnalyticsClient()
+    chunks = list(client.generate_stream("Summarize.\n- Products: 3"))
+
+    assert sql == "SELECT AVG(PRICE) AS average_price FROM PRODUCT"
+    assert "".join(streamed) == sql
+    assert LLM_REQUEST_SECONDS.count(caller="get_gemini_response", source="fake") == before + 1
+    assert len(chunks) > 1 and "Products: 3" in "".join(chunks)
+    assert client.generate("Summarize.").startswith("Summary (offline fake model)")
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import sqlite3
+import warnings
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+import analytics
+import database
+import forecasting
+import stock_ledger
+
+pd = pytest.importorskip("pandas")
+
+NOW = datetime.now(timezone.utc)
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return "summary"
+
+
+@pytest.fixture()
+def db_path(tmp_path: Path) -> Path:
+    path = tmp_path / "inventory.db"
+    database.ensure_schema(path)
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO PRODUCT (NAME, STOCK) VALUES (?, ?)",
+            [("Widget", 20), ("Gizmo", 100), ("Empty", 0), ("Idle", 5)],
+        )
+        for day in range(60):
+            moved_at = stock_ledger.ledger_time(NOW - timedelta(days=day))
+            for product_id, delta in ((1, -2), (2, -1)):
+                connection.execute(
+                    "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (?, ?, 'sale', ?)",
+                    (product_id, delta, moved_at),
+                )
+        # Restocks and movements outside the window are not outflow.
+        connection.execute(
+            "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (4, 50, 'restock', ?)",
+            (stock_ledger.ledger_time(NOW - timedelta(days=1)),),
+        )
+        connection.execute(
+            "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (4, -50, 'sale', ?)",
+            (stock_ledger.ledger_time(NOW - timedelta(days=200)),),
+        )
+    return path
+
+
+def _products(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        return pd.read_sql_query("SELECT * FROM PRODUCT", connection)
+
+
+@pytest.mark.parametrize("days", [1, 7, 90])
+def test_smoothing_weights_sum_to_one_and_favour_recent_days(days):
+    weights = forecasting.smoothing_weights(days, alpha=0.3)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert list(weights[1:]) == sorted(weights[1:])
+
+
+def test_smoothing_weights_match_the_recursive_definition():
+    series = [3.0, 0.0, 5.0, 1.0, 2.0]
+    level = series[0]
+    for value in series[1:]:
+        level = 0.3 * value + 0.7 * level
+
+    assert forecasting.smoothing_weights(len(series), 0.3) @ series == pytest.approx(level)
+
+
+def test_daily_outflow_buckets_negative_deltas_per_product_and_day(db_path: Path):
+    outflow = forecasting.daily_outflow(db_path, [2, 1, 4, 99], days=10, until=NOW)
+
+    assert outflow.shape == (4, 10)
+    assert outflow[0].tolist() == [1.0] * 10
+    assert outflow[1].tolist() == [2.0] * 10
+    assert outflow[2:].sum() == 0
+
+
+def test_daily_outflow_leaves_out_recounts_and_deletions(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        for reason in ("import:modify", "recount", "correction"):
+            connection.execute(
+                "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (1, -30, ?, ?)",
+                (reason, stock_ledger.ledger_time(NOW)),
+            )
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Idle'")
+
+    outflow = forecasting.daily_outflow(db_path, [1, 4], days=10, until=NOW)
+
+    assert outflow[0].tolist() == [2.0] * 10
+    assert outflow[1].sum() == 0
+
+
+def test_forecast_ranks_the_whole_catalog_by_days_to_stockout(db_path: Path):
+    forecast = forecasting.forecast_stock_needs(_products(db_path), db_path, history_days=60, until=NOW)
+
+    assert list(forecast.columns) == list(forecasting.FORECAST_COLUMNS)
+    assert forecast["NAME"].tolist() == ["Empty", "Widget", "Gizmo", "Idle"]
+    widget = forecast.set_index("NAME").loc["Widget"]
+    assert widget["DAILY_RATE"] == pytest.approx(2.0)
+    assert widget["DAYS_TO_STOCKOUT"] == pytest.approx(10.0)
+    assert widget["STOCKOUT_DATE"] == NOW.date() + timedelta(days=10)
+    assert widget["REORDER_POINT"] == 14
+    assert forecast["AT_RISK"].tolist() == [True, True, False, False]
+
+
+def test_predict_stock_needs_asks_the_model_to_summarize_the_forecast(db_path: Path):
+    client = _RecordingClient()
+
+    result = analytics.predict_stock_needs(_products(db_path), db_path=str(db_path), client=client)
+
+    assert result == "summary"
+    (prompt,) = client.prompts
+    assert "Products forecast: 4" in prompt
+    assert "Already out of stock: 1" in prompt
+    assert prompt.index("Empty") < prompt.index("Widget")
+    assert "Gizmo" not in prompt.split("Most urgent products")[1]
+    assert "do not invent figures" in prompt
+
+
+def test_forecast_leaves_distant_and_never_stockouts_undated_without_warnings(db_path: Path):
+    products = _products(db_path)
+    products.loc[products["NAME"] == "Gizmo", "STOCK"] = 10**12
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        forecast = forecasting.forecast_stock_needs(products, db_path, history_days=60, until=NOW)
+
+    dates = forecast.set_index("NAME")["STOCKOUT_DATE"]
+    assert dates["Empty"] == NOW.date()
+    assert pd.isna(dates["Gizmo"]) and pd.isna(dates["Idle"])
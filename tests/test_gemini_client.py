@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import sys
+import types
+
+import pytest
+
+import analytics
+import gemini_client
+import prompt
+
+
+class ServiceUnavailable(Exception):
+    """Named like google.api_core.exceptions.ServiceUnavailable."""
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _gateway(clock=None, **breaker):
+    return gemini_client.GeminiGateway(
+        limiter=gemini_client.TokenBucket(1000),
+        breaker=gemini_client.CircuitBreaker(clock=clock or _Clock(), **breaker),
+        retry=gemini_client.RetryPolicy(max_attempts=3),
+        sleep=lambda seconds: None,
+    )
+
+
+def _flaky(*outcomes):
+    calls = []
+
+    def request():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return request, calls
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_gateway():
+    yield
+    gemini_client.reset_gateway()
+
+
+def test_token_bucket_gives_up_instead_of_waiting_past_the_timeout():
+    bucket = gemini_client.TokenBucket(0.5, capacity=1)
+
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.1)
+    with pytest.raises(ValueError):
+        gemini_client.TokenBucket(0)
+
+
+@pytest.mark.parametrize(
+    ("error", "retryable"),
+    [
+        (ServiceUnavailable("down"), True),
+        (ConnectionResetError(), True),
+        (TimeoutError(), True),
+        (type("HttpError", (Exception,), {"code": 429})(), True),
+        (ValueError("blocked by safety filters"), False),
+        (type("InvalidArgument", (Exception,), {"code": 400})(), False),
+    ],
+)
+def test_is_retryable_recognizes_transient_errors(error, retryable):
+    assert gemini_client.is_retryable(error) is retryable
+
+
+def test_retryable_errors_are_retried_then_succeed():
+    gateway = _gateway()
+    request, calls = _flaky(ServiceUnavailable(), TimeoutError(), "ok")
+
+    assert gateway.call(request, caller="test") == "ok"
+    assert len(calls) == 3
+    assert gateway.breaker.state == gemini_client.CLOSED
+
+
+def test_non_retryable_errors_fail_once_and_leave_the_circuit_closed():
+    gateway = _gateway(failure_threshold=1)
+    request, calls = _flaky(ValueError("bad prompt"))
+
+    with pytest.raises(ValueError):
+        gateway.call(request, caller="test")
+    assert len(calls) == 1
+    assert gateway.breaker.state == gemini_client.CLOSED
+
+
+def test_non_retryable_errors_neither_reset_failures_nor_hold_the_probe():
+    clock = _Clock()
+    gateway = _gateway(clock, failure_threshold=2, reset_seconds=30)
+    request, calls = _flaky(ServiceUnavailable(), ValueError("bad key"), ServiceUnavailable())
+
+    with pytest.raises(ValueError):
+        gateway.call(request, caller="test")
+    with pytest.raises(ServiceUnavailable):
+        gateway.call(request, caller="test")
+    assert gateway.breaker.state == gemini_client.OPEN
+
+    clock.now = 30
+    request, calls = _flaky(ValueError("bad key"), "ok")
+    with pytest.raises(ValueError):
+        gateway.call(request, caller="test")
+    assert gateway.breaker.state == gemini_client.HALF_OPEN
+    assert gateway.call(request, caller="test") == "ok"
+    assert gateway.breaker.state == gemini_client.CLOSED
+
+
+def test_abandoned_half_open_stream_releases_the_probe():
+    clock = _Clock()
+    gateway = _gateway(clock, failure_threshold=1, reset_seconds=30)
+    with pytest.raises(ServiceUnavailable):
+        gateway.call(_flaky(ServiceUnavailable())[0], caller="test")
+    assert gateway.breaker.state == gemini_client.OPEN
+
+    clock.now = 30
+    stream = gateway.stream(lambda: iter(["a", "b"]), caller="test")
+    assert next(stream) == "a"
+    stream.close()
+
+    assert gateway.breaker.state == gemini_client.HALF_OPEN
+    assert gateway.call(lambda: "ok", caller="test") == "ok"
+    assert gateway.breaker.state == gemini_client.CLOSED
+
+
+def test_circuit_opens_short_circuits_and_recovers_after_a_probe():
+    clock = _Clock()
+    gateway = _gateway(clock, failure_threshold=3, reset_seconds=30)
+    request, calls = _flaky(*[ServiceUnavailable()] * 3, ServiceUnavailable(), "ok")
+
+    with pytest.raises(ServiceUnavailable):
+        gateway.call(request, caller="test")
+    assert gateway.breaker.state == gemini_client.OPEN
+    with pytest.raises(gemini_client.GeminiUnavailable):
+        gateway.call(request, caller="test")
+    assert len(calls) == 3
+
+    clock.now = 30
+    with pytest.raises(ServiceUnavailable):  # the half-open probe fails: no retries, open again
+        gateway.call(request, caller="test")
+    assert gateway.breaker.state == gemini_client.OPEN
+    clock.now = 60
+    assert gateway.call(request, caller="test") == "ok"
+    assert gateway.breaker.state == gemini_client.CLOSED
+
+
+def test_streams_are_retried_only_before_the_first_chunk():
+    gateway = _gateway()
+    attempts = []
+
+    def request():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ServiceUnavailable()
+        yield "a"
+        raise ServiceUnavailable()
+
+    stream = gateway.stream(request, caller="test")
+    assert next(stream) == "a"
+    with pytest.raises(ServiceUnavailable):
+        next(stream)
+    assert attempts == [0, 1]
+
+
+def test_open_circuit_sends_prompt_helpers_to_the_deterministic_fallback(monkeypatch):
+    generated = []
+    model = type("Model", (), {"__init__": lambda self, name: None, "generate_content": generated.append})
+    genai = types.SimpleNamespace(configure=lambda **kwargs: None, GenerativeModel=model)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setitem(sys.modules, "google", types.SimpleNamespace(generativeai=genai))
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    gateway = _gateway(failure_threshold=1)
+    gateway.breaker.record_failure()
+    gemini_client.reset_gateway(gateway)
+
+    assert prompt.generate_sql_query("", "how many products") == "SELECT COUNT(*) AS product_count FROM PRODUCT"
+    assert generated == []
+
+
+def test_analytics_answer_from_computed_figures_while_gemini_is_unavailable():
+    class _DownClient:
+        def generate(self, prompt_text):
+            raise gemini_client.GeminiUnavailable("circuit open")
+
+    pd = pytest.importorskip("pandas")
+    df = pd.DataFrame({"ID": [1], "NAME": ["Widget"], "STOCK": [0]})
+
+    text = analytics.predict_stock_needs(df, client=_DownClient())
+
+    assert text.startswith("The AI summary is unavailable")
+    assert "Already out of stock: 1" in text
+    with pytest.raises(gemini_client.GeminiUnavailable):  # nothing computed to fall back on
+        list(analytics.stream_insights(df, client=_DownClient()))
@@ -9,6 +9,7 @@ import types
 import unittest
 from contextlib import contextmanager
 from pathlib import Path
+from unittest import mock
 
 
 @contextmanager
@@ -124,13 +125,15 @@ class HelperSmokeTests(unittest.TestCase):
 
             with patched_modules({"streamlit": fake_streamlit, "pandas": fake_pandas}):
                 excel_processing = importlib.import_module("excel_processing")
-                excel_processing.pd.read_excel = lambda uploaded_file: FakeFrame()
-                excel_processing.process_excel_file(
-                    object(),
-                    str(db_path),
-                    "add",
-                    allow_schema_changes=True,
-                )
+                # excel_processing may already be bound to the real pandas, so
+                # patch through mock to restore read_excel for later tests.
+                with mock.patch.object(excel_processing.pd, "read_excel", lambda uploaded_file: FakeFrame()):
+                    excel_processing.process_excel_file(
+                        object(),
+                        str(db_path),
+                        "add",
+                        allow_schema_changes=True,
+                    )
 
             with sqlite3.connect(db_path) as connection:
                 columns = [row[1] for row in connection.execute("PRAGMA table_info(PRODUCT)")]
@@ -163,6 +166,7 @@ class HelperSmokeTests(unittest.TestCase):
         fake_streamlit.text_input = lambda *args, **kwargs: ""
         fake_streamlit.pyplot = lambda *args, **kwargs: None
         fake_streamlit.write = lambda *args, **kwargs: None
+        fake_streamlit.write_stream = lambda stream: "".join(stream)
         fake_streamlit.error = lambda *args, **kwargs: None
         fake_streamlit.success = lambda *args, **kwargs: None
         fake_streamlit.warning = lambda *args, **kwargs: None
@@ -180,10 +184,19 @@ class HelperSmokeTests(unittest.TestCase):
         fake_database.INVENTORY_VALUE_COLUMN = "STOCK"
         fake_database.PRODUCT_TABLE = "PRODUCT"
         fake_database.validate_product_schema = lambda path: None
+        fake_database.set_movement_reason = lambda connection, reason: False
+        fake_database.clear_movement_reason = lambda connection: None
+        fake_database.has_stock_ledger = lambda connection: False
+        fake_database.LEDGER_TIME_FORMAT_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+        fake_database.STOCK_MOVEMENT_TABLE = "STOCK_MOVEMENT"
+        fake_database.STOCK_SNAPSHOT_TABLE = "STOCK_SNAPSHOT"
+        fake_database.STOCK_SNAPSHOT_LEVEL_TABLE = "STOCK_SNAPSHOT_LEVEL"
 
         fake_analytics = types.ModuleType("analytics")
         fake_analytics.generate_insights = lambda df: "insights"
-        fake_analytics.predict_stock_needs = lambda df: "predictions"
+        fake_analytics.stream_insights = lambda df, **kwargs: iter(["insights"])
+        fake_analytics.predict_stock_needs = lambda df, **kwargs: "predictions"
+        fake_analytics.stream_stock_needs = lambda df, **kwargs: iter(["predictions"])
         fake_analytics.categorize_product = lambda df, name, description: "category"
         fake_analytics.generate_report = lambda df: "report"
 
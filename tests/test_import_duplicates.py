@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import excel_processing
+from audit import get_audit_log_path
+from batch_import import import_batch
+from database import ensure_schema
+from guardrails import DuplicateKeyViolation
+
+pd = pytest.importorskip("pandas")
+
+DUPLICATED_CSV = b"Name,Price,Stock\nWidget,1.0,2\nGizmo,5.0,1\nWidget,1.5,3\nWidget,2.0,4\n"
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data: bytes, name: str = "stock.csv"):
+        super().__init__(data)
+        self.name = name
+
+
+@pytest.fixture()
+def db_path(tmp_path: Path) -> Path:
+    path = tmp_path / "inventory.db"
+    ensure_schema(path)
+    return path
+
+
+def _products(db_path: Path) -> list[tuple]:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute("SELECT NAME, PRICE, STOCK FROM PRODUCT ORDER BY NAME").fetchall()
+
+
+def test_preview_reports_repeated_names(db_path: Path):
+    preview = excel_processing.preview_excel_import(_Upload(DUPLICATED_CSV), str(db_path))
+
+    assert preview["duplicate_keys"] == {"Widget": 3}
+
+
+def test_find_duplicate_keys_without_pandas_frames():
+    class RowsOnly:
+        def iterrows(self):
+            yield from enumerate([{"Item": "a"}, {"Item": "b"}, {"Item": "a"}])
+
+    assert excel_processing.find_duplicate_keys(RowsOnly(), {"Item": "NAME"}) == {"a": 2}
+    assert excel_processing.find_duplicate_keys(RowsOnly(), {"Item": "BRAND"}) == {}
+
+
+def test_last_wins_writes_each_name_once(db_path: Path, monkeypatch):
+    writes = []
+    real_apply_row = excel_processing._apply_row
+    monkeypatch.setattr(
+        excel_processing, "_apply_row", lambda cursor, action, row: writes.append(row) or real_apply_row(cursor, action, row)
+    )
+
+    processed = excel_processing.process_excel_file(_Upload(DUPLICATED_CSV), str(db_path), "add")
+
+    assert processed == 2
+    assert [row["NAME"] for row in writes] == ["Gizmo", "Widget"]
+    assert _products(db_path) == [("Gizmo", 5.0, 1), ("Widget", 2.0, 4)]
+    event = json.loads(get_audit_log_path(db_path).read_text(encoding="utf-8").splitlines()[-1])
+    assert event["details"]["duplicate_policy"] == "last"
+    assert event["details"]["duplicate_rows"] == 2
+
+
+def test_sum_policy_adds_up_stock(db_path: Path):
+    excel_processing.process_excel_file(_Upload(DUPLICATED_CSV), str(db_path), "add", duplicate_policy="sum")
+
+    assert _products(db_path) == [("Gizmo", 5.0, 1), ("Widget", 2.0, 9)]
+
+
+def test_sum_policy_carries_totals_across_streamed_chunks():
+    frames = [
+        pd.DataFrame({"Name": ["Widget", "Gizmo"], "Stock": [2, 1]}),
+        pd.DataFrame({"Name": ["Widget", "Widget"], "Stock": [3, 4]}),
+    ]
+    stats = {}
+
+    rows = list(excel_processing._consolidate_rows(frames, {"Name": "NAME", "Stock": "STOCK"}, "sum", stats))
+
+    assert [(row["Name"], row["Stock"]) for row in rows] == [("Widget", 2), ("Gizmo", 1), ("Widget", 9)]
+    assert stats["duplicate_rows"] == 2
+
+
+def test_reject_policy_blocks_the_import(db_path: Path):
+    with pytest.raises(DuplicateKeyViolation, match=r"Widget \(x3\)") as excinfo:
+        excel_processing.process_excel_file(_Upload(DUPLICATED_CSV), str(db_path), "add", duplicate_policy="reject")
+
+    assert excinfo.value.duplicate_keys == {"Widget": 3}
+    assert _products(db_path) == []
+
+
+def test_dry_run_counts_consolidated_rows(db_path: Path):
+    diff = excel_processing.process_excel_file(_Upload(DUPLICATED_CSV), str(db_path), "add", dry_run=True)
+
+    assert (diff.inserts, diff.duplicate_rows) == (2, 2)
+
+
+def test_batch_import_applies_the_duplicate_policy(db_path: Path):
+    (result,) = import_batch(db_path, [("stock.csv", DUPLICATED_CSV)], "add", processes=1, duplicate_policy="sum")
+
+    assert (result.status, result.processed_rows) == ("success", 2)
+    assert _products(db_path) == [("Gizmo", 5.0, 1), ("Widget", 2.0, 9)]
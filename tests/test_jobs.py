@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import analytics
+import categorization
+import excel_processing
+import jobs
+from audit import get_audit_log_path
+from database import ensure_schema
+
+
+@pytest.fixture
+def inventory_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("INSERT INTO PRODUCT (NAME, PRICE, STOCK) VALUES ('Widget', 2.5, 4)")
+    return db_path
+
+
+def _workbook(rows: dict[str, list]) -> bytes:
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_report_job_runs_and_stores_result(inventory_db: Path, monkeypatch):
+    monkeypatch.setattr(analytics, "generate_report", lambda df, report: f"{len(df)} products")
+    job_id = jobs.submit_report_job(inventory_db)
+
+    assert jobs.get_job(inventory_db, job_id).status == jobs.JOB_QUEUED
+    assert jobs.run_worker(inventory_db, max_jobs=5) == 1
+
+    job = jobs.get_job(inventory_db, job_id)
+    assert job.status == jobs.JOB_SUCCEEDED
+    assert job.result["text"] == "1 products"
+    assert job.result["figures"]["product_count"] == 1
+    assert job.progress_fraction == 1.0
+    assert jobs.get_jobs_db_path(inventory_db).exists()
+    event = json.loads(get_audit_log_path(inventory_db).read_text(encoding="utf-8").splitlines()[-1])
+    assert event["details"] == {"job_id": job_id, "kind": "report", "status": "succeeded"}
+
+
+def test_categorization_job_runs_once_and_reports_progress(inventory_db: Path, monkeypatch):
+    def fake_categorize(db_path, *, progress_callback):
+        progress_callback(3, 3)
+        return categorization.BulkCategorizationResult(
+            job_name="bulk_categorization",
+            chunks_processed=1,
+            rows_selected=3,
+            rows_categorized=2,
+            failed_batches=0,
+            last_id=3,
+            completed=True,
+        )
+
+    monkeypatch.setattr(categorization, "categorize_uncategorized_products", fake_categorize)
+    job_id = jobs.submit_categorization_job(inventory_db)
+
+    assert jobs.submit_categorization_job(inventory_db) == job_id
+    assert jobs.run_worker(inventory_db, max_jobs=5) == 1
+
+    job = jobs.get_job(inventory_db, job_id)
+    assert job.status == jobs.JOB_SUCCEEDED
+    assert job.result == {
+        "rows_selected": 3,
+        "rows_categorized": 2,
+        "chunks_processed": 1,
+        "failed_batches": 0,
+        "completed": True,
+    }
+    assert job.progress_fraction == 1.0
+    assert jobs.submit_categorization_job(inventory_db) != job_id
+
+
+def test_concurrent_categorization_submissions_queue_one_job(inventory_db: Path):
+    jobs.submit_report_job(inventory_db)  # creates the jobs table before the race
+    barrier = threading.Barrier(8)
+    job_ids = []
+
+    def submit():
+        barrier.wait()
+        job_ids.append(jobs.submit_categorization_job(inventory_db))
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(job_ids)) == 1
+    queued = [job for job in jobs.list_jobs(inventory_db) if job.kind == jobs.CATEGORIZATION_JOB]
+    assert [job.id for job in queued] == job_ids[:1]
+
+
+def test_import_job_reuses_reviewed_mapping_and_reports_progress(inventory_db: Path, monkeypatch):
+    data = _workbook({"Item": ["Gizmo", "Doohickey"], "Qty": [3, 8]})
+
+    def _no_model_call(*args, **kwargs):
+        raise AssertionError("the reviewed mapping must be reused")
+
+    monkeypatch.setattr(excel_processing, "map_columns", _no_model_call)
+    job_id = jobs.submit_import_job(
+        inventory_db,
+        data,
+        filename="stock update.xlsx",
+        action="add",
+        column_mappings={"Item": "NAME", "Qty": "STOCK"},
+    )
+    stored_file = Path(jobs.get_job(inventory_db, job_id).payload["file_path"])
+    assert stored_file.parent == jobs.get_job_files_dir(inventory_db)
+    assert stored_file.read_bytes() == data
+
+    jobs.run_worker(inventory_db, max_jobs=1)
+
+    job = jobs.get_job(inventory_db, job_id)
+    assert job.status == jobs.JOB_SUCCEEDED, job.error
+    assert job.result == {"processed_rows": 2, "action": "add"}
+    assert (job.progress_current, job.progress_total) == (2, 2)
+    assert not stored_file.exists()
+    with sqlite3.connect(inventory_db) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM PRODUCT").fetchone() == (3,)
+
+
+def test_failed_job_records_error(inventory_db: Path):
+    data = _workbook({"Item": ["Widget"]})
+    job_id = jobs.submit_import_job(
+        inventory_db, data, filename="remove.xlsx", action="remove", column_mappings={"Item": "NAME"}
+    )
+
+    jobs.run_worker(inventory_db, max_jobs=1)
+
+    job = jobs.get_job(inventory_db, job_id)
+    assert job.status == jobs.JOB_FAILED
+    assert job.error.startswith("DestructiveActionApprovalRequired")
+    with pytest.raises(ValueError):
+        jobs.submit_job(inventory_db, "unknown")
+
+
+def test_recover_orphaned_jobs_requeues_then_fails(inventory_db: Path):
+    job_id = jobs.submit_report_job(inventory_db)
+    dead_pid = 2**22 + 1  # above the default pid_max, so never a live process
+
+    for _ in range(jobs.MAX_ATTEMPTS - 1):
+        assert jobs.claim_next_job(inventory_db, worker_pid=dead_pid).id == job_id
+        assert jobs.recover_orphaned_jobs(inventory_db) == 1
+        assert jobs.get_job(inventory_db, job_id).status == jobs.JOB_QUEUED
+
+    jobs.claim_next_job(inventory_db, worker_pid=dead_pid)
+    jobs.recover_orphaned_jobs(inventory_db)
+    job = jobs.get_job(inventory_db, job_id)
+    assert (job.status, job.attempts) == (jobs.JOB_FAILED, jobs.MAX_ATTEMPTS)
+
+
+def test_worker_pool_processes_jobs_in_child_processes(inventory_db: Path):
+    data = _workbook({"Item": ["Sprocket"], "Qty": [5]})
+    job_id = jobs.submit_import_job(
+        inventory_db, data, filename="pool.xlsx", action="add", column_mappings={"Item": "NAME", "Qty": "STOCK"}
+    )
+
+    try:
+        assert jobs.start_workers(inventory_db, processes=1) == 1
+        assert jobs.start_workers(inventory_db, processes=1) == 1
+        deadline = time.monotonic() + 60
+        while not jobs.get_job(inventory_db, job_id).finished and time.monotonic() < deadline:
+            time.sleep(0.2)
+    finally:
+        jobs.stop_workers()
+
+    job = jobs.get_job(inventory_db, job_id)
+    assert job.status == jobs.JOB_SUCCEEDED, job.error
+    assert job.worker_pid != jobs.os.getpid()
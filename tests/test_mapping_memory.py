@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import excel_processing
+import mapping_memory
+from audit import get_audit_log_path
+from database import ensure_schema
+
+pd = pytest.importorskip("pandas")
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data: bytes, name: str = "supplier.xlsx"):
+        super().__init__(data)
+        self.name = name
+
+
+def _workbook_bytes(rows: dict[str, list]) -> bytes:
+    pytest.importorskip("openpyxl")
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def inventory_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    return db_path
+
+
+def _product_columns(db_path: Path) -> list[str]:
+    with sqlite3.connect(db_path) as connection:
+        return [row[1] for row in connection.execute("PRAGMA table_info(PRODUCT)")]
+
+
+def test_layout_signature_ignores_order_case_and_punctuation():
+    signature = mapping_memory.layout_signature(["Item Name", "Qty"], ["NAME", "STOCK"])
+
+    assert signature == mapping_memory.layout_signature(["qty", "item-name"], ["STOCK", "NAME"])
+    assert signature != mapping_memory.layout_signature(["Item Name", "Qty"], ["NAME", "STOCK", "SUPPLIER"])
+    assert mapping_memory.layout_signature(["Qty", "QTY "], ["STOCK"]) is None
+
+
+def test_remember_recall_list_and_forget(inventory_db: Path):
+    columns = _product_columns(inventory_db)
+    with sqlite3.connect(inventory_db) as connection:
+        signature = mapping_memory.remember_mapping(
+            connection, ["Item Name", "Qty"], columns, {"Item Name": "NAME", "Qty": "STOCK"}, source="week1.xlsx"
+        )
+
+    assert mapping_memory.recall_mapping(inventory_db, ["QTY", "item name"], columns) == {
+        "QTY": "STOCK",
+        "item name": "NAME",
+    }
+    assert mapping_memory.recall_mapping(inventory_db, ["Item Name", "Price"], columns) is None
+    [entry] = mapping_memory.list_mappings(inventory_db)
+    assert (entry.signature, entry.hit_count, entry.source) == (signature, 1, "week1.xlsx")
+
+    assert mapping_memory.forget_mapping(inventory_db, signature) is True
+    assert mapping_memory.forget_mapping(inventory_db, signature) is False
+    assert mapping_memory.recall_mapping(inventory_db, ["Item Name", "Qty"], columns) is None
+
+
+def test_successful_import_is_recalled_without_the_model(inventory_db: Path, monkeypatch):
+    calls = []
+
+    def fake_map_columns(excel_columns, existing_columns, response_fn):
+        calls.append(list(excel_columns))
+        return {"Item": "NAME", "Qty": "STOCK", "Supplier": "SUPPLIER"}
+
+    monkeypatch.setattr(excel_processing, "map_columns", fake_map_columns)
+    week1 = _workbook_bytes({"Item": ["Widget"], "Qty": [3], "Supplier": ["Acme"]})
+    week2 = _workbook_bytes({"Supplier": ["Acme"], "Item": ["Gizmo"], "Qty": [5]})
+
+    excel_processing.preview_excel_import(_Upload(week1), str(inventory_db), emit_audit_event=True)
+    excel_processing.process_excel_file(_Upload(week1), str(inventory_db), "add", allow_schema_changes=True)
+    preview = excel_processing.preview_excel_import(_Upload(week2), str(inventory_db), emit_audit_event=True)
+
+    assert len(calls) == 2  # the preview inside process_excel_file, before anything was remembered
+    assert preview["column_mappings"] == {"Supplier": "SUPPLIER", "Item": "NAME", "Qty": "STOCK"}
+    assert preview["proposed_new_columns"] == []
+    events = [json.loads(line) for line in get_audit_log_path(inventory_db).read_text(encoding="utf-8").splitlines()]
+    previews = [event["details"]["mapping_source"] for event in events if event["event_type"] == "excel_import_preview"]
+    assert previews == ["model", "memory"]
+
+
+def test_failed_import_is_not_remembered(inventory_db: Path, monkeypatch):
+    monkeypatch.setattr(excel_processing, "map_columns", lambda *args: {"Item": "NAME", "Colour": "COLOUR"})
+    data = _workbook_bytes({"Item": ["Widget"], "Colour": ["Red"]})
+
+    with pytest.raises(excel_processing.GuardrailViolation):
+        excel_processing.process_excel_file(_Upload(data), str(inventory_db), "add")
+
+    assert mapping_memory.list_mappings(inventory_db) == []
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import sqlite3
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import metrics
+from audit import append_audit_event
+from utils import read_sql_query
+
+
+def test_registry_renders_text_exposition_format():
+    registry = metrics.Registry()
+    requests = registry.counter("demo_requests_total", "Requests handled.", ("route",))
+    in_flight = registry.gauge("demo_in_flight", "Requests in flight.")
+    latency = registry.histogram("demo_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    in_flight.set(3)
+    in_flight.dec()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    rendered = registry.render()
+    assert "# TYPE demo_requests_total counter" in rendered
+    assert 'demo_requests_total{route="/a\\"b"} 3' in rendered
+    assert "demo_in_flight 2" in rendered
+    assert 'demo_latency_seconds_bucket{le="0.1"} 1' in rendered
+    assert 'demo_latency_seconds_bucket{le="1"} 2' in rendered
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 3' in rendered
+    assert "demo_latency_seconds_sum 5.55" in rendered
+    assert "demo_latency_seconds_count 3" in rendered
+
+
+def test_metric_validation_and_registration_rules():
+    registry = metrics.Registry()
+    counter = registry.counter("demo_total", "Demo.", ("kind",))
+
+    assert registry.counter("demo_total", "Demo.", ("kind",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("demo_total", "Demo.")
+    with pytest.raises(ValueError):
+        counter.inc(kind="a", other="b")
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+    with pytest.raises(ValueError):
+        registry.histogram("demo_seconds", "Demo.", ("le",))
+
+
+def test_histogram_time_fills_status_label():
+    histogram = metrics.Registry().histogram("demo_seconds", "Demo.", ("status",))
+
+    with histogram.time():
+        pass
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError("boom")
+    with histogram.time() as labels:
+        labels["status"] = "skipped"
+
+    assert histogram.count(status="ok") == 1
+    assert histogram.count(status="error") == 1
+    assert histogram.count(status="skipped") == 1
+
+
+def test_hot_paths_update_the_default_registry(tmp_path: Path):
+    db_path = tmp_path / "inventory.db"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE PRODUCT (ID INTEGER PRIMARY KEY, NAME TEXT)")
+        connection.executemany("INSERT INTO PRODUCT (NAME) VALUES (?)", [("A",), ("B",)])
+
+    queries_before = metrics.SQL_QUERY_SECONDS.count(status="ok")
+    rows_before = metrics.SQL_QUERY_ROWS.value()
+    audits_before = metrics.AUDIT_EVENTS.value(event_type="metrics_test")
+
+    read_sql_query("SELECT * FROM PRODUCT", str(db_path))
+    audit_path = append_audit_event(db_path, "metrics_test", {})
+
+    assert metrics.SQL_QUERY_SECONDS.count(status="ok") == queries_before + 1
+    assert metrics.SQL_QUERY_ROWS.value() == rows_before + 2
+    assert metrics.AUDIT_EVENTS.value(event_type="metrics_test") == audits_before + 1
+    assert metrics.AUDIT_LOG_BYTES.value() == audit_path.stat().st_size
+
+
+def test_exporter_serves_registry_and_is_idempotent(monkeypatch):
+    monkeypatch.delenv(metrics.METRICS_PORT_ENV, raising=False)
+    registry = metrics.Registry()
+    registry.counter("demo_scrapes_total", "Demo.").inc()
+
+    assert metrics.start_exporter(registry=registry) is None
+
+    server = metrics.start_exporter(0, registry=registry)
+    try:
+        assert metrics.start_exporter(0, registry=registry) is server
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        metrics.stop_exporter()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "demo_scrapes_total 1" in body
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import excel_processing
+import preview_cache
+from audit import get_audit_log_path
+from database import ensure_schema
+
+pd = pytest.importorskip("pandas")
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data: bytes, name: str = "supplier.xlsx"):
+        super().__init__(data)
+        self.name = name
+
+
+def _workbook_bytes() -> bytes:
+    pytest.importorskip("openpyxl")
+    buffer = io.BytesIO()
+    pd.DataFrame({"Product Name": ["Widget", "Gizmo"], "Price": [1.5, 2.0]}).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_put_get_round_trips_mapping_and_frame(tmp_path: Path):
+    pytest.importorskip("pyarrow")
+    cache = preview_cache.PreviewCache(tmp_path / "cache")
+    frame = pd.DataFrame({"Name": ["Widget"], "Stock": [3]})
+    key = cache.key("abc", ["ID", "NAME"])
+
+    assert cache.get(key) is None
+    cache.put(key, frame, {"Name": "NAME", "Stock": "STOCK"}, "stock.xlsx")
+
+    cached = cache.get(key)
+    assert cached.column_mappings == {"Name": "NAME", "Stock": "STOCK"}
+    assert cached.uploaded_filename == "stock.xlsx"
+    pd.testing.assert_frame_equal(cached.frame, frame)
+    assert cache.key("abc", ["ID", "NAME", "SUPPLIER"]) != key
+
+
+def test_unencodable_frames_cache_only_the_mapping(tmp_path: Path):
+    cache = preview_cache.PreviewCache(tmp_path / "cache")
+    mixed = pd.DataFrame({"Name": ["Widget", 7]})
+
+    cache.put("mixed", mixed, {"Name": "NAME"})
+
+    cached = cache.get("mixed")
+    assert cached.column_mappings == {"Name": "NAME"}
+    assert cached.frame is None
+    assert not list(cache.directory.glob("*.tmp"))
+
+
+def test_evicts_least_recently_used_entries(tmp_path: Path):
+    cache = preview_cache.PreviewCache(tmp_path / "cache", max_entries=2)
+    cache.put("a", None, {"A": "A"})
+    cache.put("b", None, {"B": "B"})
+    os.utime(cache.directory / "a.json", (1_000, 1_000))
+    os.utime(cache.directory / "b.json", (2_000, 2_000))
+    assert cache.get("a") is not None  # touching "a" makes "b" the oldest
+
+    cache.put("c", None, {"C": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_preview_excel_import_reuses_cache_across_sessions(tmp_path: Path, monkeypatch):
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    data = _workbook_bytes()
+    cache = preview_cache.get_preview_cache(db_path)
+    assert cache is preview_cache.get_preview_cache(db_path)
+
+    first = excel_processing.preview_excel_import(_Upload(data), str(db_path), emit_audit_event=True, cache=cache)
+
+    monkeypatch.setattr(excel_processing, "map_columns", lambda *args: pytest.fail("mapping must come from cache"))
+    if importlib.util.find_spec("pyarrow") is not None:
+        monkeypatch.setattr(excel_processing.pd, "read_excel", lambda *args: pytest.fail("frame must come from cache"))
+    second = excel_processing.preview_excel_import(_Upload(data), str(db_path), emit_audit_event=True, cache=cache)
+
+    assert second["column_mappings"] == first["column_mappings"] == {"Product Name": "NAME", "Price": "PRICE"}
+    assert list(second["dataframe"]["Product Name"]) == ["Widget", "Gizmo"]
+    events = [json.loads(line) for line in get_audit_log_path(db_path).read_text(encoding="utf-8").splitlines()]
+    assert [event["details"]["preview_cache"] for event in events] == ["miss", "hit"]
+
+
+def test_schema_changes_invalidate_cached_previews(tmp_path: Path, monkeypatch):
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    data = _workbook_bytes()
+    cache = preview_cache.PreviewCache(tmp_path / "cache")
+    excel_processing.preview_excel_import(_Upload(data), str(db_path), cache=cache)
+
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("ALTER TABLE PRODUCT ADD COLUMN SUPPLIER TEXT")
+    calls = []
+    real_map_columns = excel_processing.map_columns
+
+    def counting_map_columns(*args):
+        calls.append(args)
+        return real_map_columns(*args)
+
+    monkeypatch.setattr(excel_processing, "map_columns", counting_map_columns)
+    excel_processing.preview_excel_import(_Upload(data), str(db_path), cache=cache)
+
+    assert len(calls) == 1
+    assert len(_keys(cache)) == 2
+
+
+def _keys(cache: preview_cache.PreviewCache) -> list[str]:
+    return [path.stem for path in cache.directory.glob("*.json")]
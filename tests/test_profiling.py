@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+import pstats
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+import profiling
+from audit import get_audit_log_path
+
+
+def _audit_events(db_path: Path) -> list[dict]:
+    audit_path = get_audit_log_path(db_path)
+    if not audit_path.exists():
+        return []
+    return [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+
+
+def _busy_work() -> list[str]:
+    return [str(index) * 10 for index in range(5_000)]
+
+
+@pytest.mark.parametrize(
+    ("setting", "action", "expected"),
+    [
+        ("", "generate_report", False),
+        ("0", "generate_report", False),
+        ("1", "generate_report", True),
+        ("all", "generate_sql_query", True),
+        ("generate_sql_query, generate_report", "generate_report", True),
+        ("generate_sql_query", "generate_report", False),
+    ],
+)
+def test_profiling_enabled_reads_environment(monkeypatch, setting, action, expected):
+    monkeypatch.setenv(profiling.PROFILE_ENV, setting)
+
+    assert profiling.profiling_enabled(action) is expected
+
+
+def test_profile_action_is_a_no_op_when_disabled(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    db_path = tmp_path / "inventory.db"
+
+    with profiling.profile_action("generate_report", db_path):
+        _busy_work()
+
+    assert not profiling.get_profile_dir(db_path).exists()
+    assert _audit_events(db_path) == []
+
+
+def test_profile_action_writes_artifacts_and_audit_event(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "generate_report")
+    db_path = tmp_path / "inventory.db"
+
+    with profiling.profile_action("generate_report", db_path):
+        _busy_work()
+
+    (event,) = _audit_events(db_path)
+    details = event["details"]
+    assert event["event_type"] == "ui_action_profile"
+    assert details["action"] == "generate_report"
+    assert details["status"] == "success"
+    assert details["peak_memory_bytes"] > 0
+
+    profile_path = Path(details["profile_path"])
+    allocations_path = Path(details["allocations_path"])
+    assert profile_path.parent == profiling.get_profile_dir(db_path)
+    stats = pstats.Stats(str(profile_path))
+    assert any(func[2] == "_busy_work" for func in stats.stats)
+    report = allocations_path.read_text(encoding="utf-8")
+    assert report.startswith("Top 25 allocation sites for generate_report")
+
+
+def test_profile_action_records_failures(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "all")
+    db_path = tmp_path / "inventory.db"
+
+    with pytest.raises(RuntimeError):
+        with profiling.profile_action("generate_sql_query", db_path):
+            raise RuntimeError("boom")
+
+    (event,) = _audit_events(db_path)
+    assert event["details"]["status"] == "failed"
+    assert Path(event["details"]["profile_path"]).exists()
+
+
+def test_profile_action_runs_unprofiled_when_another_profiler_is_active(tmp_path: Path, monkeypatch):
+    class _BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setenv(profiling.PROFILE_ENV, "all")
+    monkeypatch.setattr(profiling.cProfile, "Profile", _BusyProfile)
+    db_path = tmp_path / "inventory.db"
+    ran = []
+
+    with profiling.profile_action("generate_report", db_path):
+        ran.append(True)
+
+    assert ran == [True]
+    assert _audit_events(db_path) == []
+    assert not tracemalloc.is_tracing()
+
+
+def test_overlapping_profiles_keep_tracemalloc_until_the_last_one_ends():
+    profiling._start_tracing()
+    profiling._start_tracing()
+    profiling._stop_tracing()
+    assert tracemalloc.is_tracing()
+
+    profiling._stop_tracing()
+    assert not tracemalloc.is_tracing()
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import importlib
+import io
 import json
 import sqlite3
 import sys
 import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
 import database
 import prompt
-from guardrails import DestructiveActionApprovalRequired, SchemaChangeApprovalRequired
+from guardrails import (
+    DestructiveActionApprovalRequired,
+    ImportResumeConflict,
+    SchemaChangeApprovalRequired,
+)
 
 
 class FakeColumns(list):
@@ -155,7 +161,7 @@ def test_ensure_schema_migrates_legacy_quantity_column(tmp_path: Path):
     assert "QUANTITY" not in columns
     assert database.INVENTORY_VALUE_COLUMN in columns
     assert migrated_row == ("Widget", 9.99, 12)
-    assert schema_version == 1
+    assert schema_version == 3
 
 
 def test_ensure_schema_repairs_legacy_schema_even_with_stale_version_metadata(tmp_path: Path):
@@ -195,7 +201,11 @@ def test_seed_database_populates_rows(monkeypatch, tmp_path: Path):
         ("Widget", "Gadgets", "Acme", 9.99, 12, "M", "Blue", 1.2, "Original widget"),
         ("Cable", "Accessories", "Acme", 4.5, 20, "N/A", "White", 0.3, "Charging cable"),
     ]
-    monkeypatch.setattr(database, "generate_product_data", lambda num_products: list(seeded_rows))
+    monkeypatch.setattr(
+        database,
+        "generate_product_chunks",
+        lambda num_products, **kwargs: iter([list(seeded_rows)]),
+    )
 
     db_path = tmp_path / "seeded_inventory.db"
     database.ensure_schema(db_path)
@@ -214,7 +224,11 @@ def test_seed_database_is_idempotent_by_default(monkeypatch, tmp_path: Path):
     seeded_rows = [
         ("Widget", "Gadgets", "Acme", 9.99, 12, "M", "Blue", 1.2, "Original widget"),
     ]
-    monkeypatch.setattr(database, "generate_product_data", lambda num_products: list(seeded_rows))
+    monkeypatch.setattr(
+        database,
+        "generate_product_chunks",
+        lambda num_products, **kwargs: iter([list(seeded_rows)]),
+    )
 
     db_path = tmp_path / "idempotent_seed.db"
     database.ensure_schema(db_path)
@@ -228,6 +242,74 @@ def test_seed_database_is_idempotent_by_default(monkeypatch, tmp_path: Path):
     assert row_count == len(seeded_rows)
 
 
+def test_generate_product_chunks_is_seedable_and_bounded():
+    first = list(database.generate_product_chunks(25, chunk_size=10, seed=7))
+    second = list(database.generate_product_chunks(25, chunk_size=10, seed=7))
+
+    assert first == second
+    assert [len(chunk) for chunk in first] == [10, 10, 5]
+    name, category, brand, price, stock, size, color, weight, specifications = first[0][0]
+    assert category in database._PRODUCT_CATEGORIES
+    assert size in database._PRODUCT_SIZES
+    assert 1.0 <= price <= 1000.0 and 0 <= stock <= 1000 and 0.1 <= weight <= 50.0
+    assert all(isinstance(value, (str, int, float)) for value in first[0][0])
+
+
+def test_seed_database_streams_chunks_in_one_transaction(tmp_path: Path):
+    db_path = tmp_path / "chunked_seed.db"
+    database.ensure_schema(db_path)
+    database.seed_database(db_path, num_products=1234, chunk_size=100, seed=3)
+
+    with sqlite3.connect(db_path) as connection:
+        row_count = connection.execute("SELECT COUNT(*) FROM PRODUCT").fetchone()[0]
+
+    assert row_count == 1234
+
+
+def test_seed_database_merges_parallel_shards(tmp_path: Path):
+    db_path = tmp_path / "parallel_seed.db"
+    database.ensure_schema(db_path)
+    report = database.seed_database(db_path, num_products=101, chunk_size=20, seed=5, workers=3)
+
+    with sqlite3.connect(db_path) as connection:
+        row_count, min_id, max_id = connection.execute(
+            "SELECT COUNT(*), MIN(ID), MAX(ID) FROM PRODUCT"
+        ).fetchone()
+
+    assert (row_count, min_id, max_id) == (101, 1, 101)
+    assert report.rows == 101 and report.workers == 3
+    assert report.rows_per_second > 0
+    # Temporary shard databases are cleaned up after the merge.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["parallel_seed.db"]
+
+
+def test_seed_database_merges_parallel_shards_all_or_nothing(tmp_path: Path, monkeypatch):
+    db_path = tmp_path / "failed_seed.db"
+    database.ensure_schema(db_path)
+    seed_shard = database._seed_shard
+
+    def seed_shard_without_last(shard_path, num_products, chunk_size, seed):
+        if shard_path.endswith("shard-2.db"):
+            sqlite3.connect(shard_path).close()  # no PRODUCT table, so its merge fails
+            return 0
+        return seed_shard(shard_path, num_products, chunk_size, seed)
+
+    monkeypatch.setattr(database, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(database, "_seed_shard", seed_shard_without_last)
+    with pytest.raises(sqlite3.OperationalError):
+        database.seed_database(db_path, num_products=90, chunk_size=20, seed=5, workers=3)
+
+    with sqlite3.connect(db_path) as connection:
+        row_count = connection.execute("SELECT COUNT(*) FROM PRODUCT").fetchone()[0]
+        triggers = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0]
+
+    assert row_count == 0
+    assert triggers == len(database.CREATE_STOCK_TRIGGERS_SQL)
+    # With nothing committed, a retry without ``force`` seeds from scratch.
+    monkeypatch.setattr(database, "_seed_shard", seed_shard)
+    assert database.seed_database(db_path, num_products=90, chunk_size=20, seed=5, workers=3).rows == 90
+
+
 def test_initialize_database_only_applies_schema(tmp_path: Path):
     db_path = tmp_path / "schema_only.db"
     database.initialize_database(db_path)
@@ -421,6 +503,162 @@ def test_process_excel_file_blocks_destructive_actions_without_approval(
     assert events[-1]["details"]["error"].endswith("Blocked action: REMOVE.")
 
 
+def test_process_excel_file_checkpointed_import_resumes_after_failure(
+    excel_processing_module,
+    inventory_db: Path,
+    monkeypatch,
+):
+    upload = io.BytesIO(b"same workbook bytes")
+    rows = [{"Name": f"Item {index}", "Stock": index} for index in range(5)]
+    # Row 4 has a column the mapping does not cover, so the run fails after two batches.
+    excel_processing_module.pd.read_excel = lambda uploaded_file: FakeFrame(
+        rows[:4] + [{"Name": "Item 4", "Stock": 4, "Bogus": "x"}]
+    )
+
+    with pytest.raises(ValueError, match="no mapping for: Bogus"):
+        excel_processing_module.process_excel_file(upload, str(inventory_db), "add", batch_size=2)
+
+    content_hash = excel_processing_module.get_upload_content_hash(upload)
+    state = excel_processing_module.get_import_state(str(inventory_db), content_hash, "add")
+    assert (state.rows_committed, state.status) == (4, "in_progress")
+    assert state.column_mappings == {"Name": "NAME", "Stock": "STOCK"}
+
+    excel_processing_module.pd.read_excel = lambda uploaded_file: FakeFrame(rows)
+    monkeypatch.setattr(
+        excel_processing_module,
+        "map_columns",
+        lambda *args: pytest.fail("resume must reuse the checkpointed mapping"),
+    )
+    processed = excel_processing_module.process_excel_file(upload, str(inventory_db), "add", batch_size=2)
+
+    assert processed == 1
+    with sqlite3.connect(inventory_db) as connection:
+        names = [row[0] for row in connection.execute("SELECT NAME FROM PRODUCT WHERE NAME LIKE 'Item %'")]
+    assert sorted(names) == [f"Item {index}" for index in range(5)]
+    state = excel_processing_module.get_import_state(str(inventory_db), content_hash, "add")
+    assert (state.rows_committed, state.status) == (5, "completed")
+
+    audit_path = inventory_db.with_name("ai_operation_audit.jsonl")
+    events = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+    batches = [event["details"] for event in events if event["event_type"] == "excel_import_batch"]
+    assert [(batch["batch_index"], batch["rows_committed"]) for batch in batches] == [(0, 2), (1, 4), (2, 5)]
+    failed, succeeded = [event["details"] for event in events if event["event_type"] == "excel_import_processed"]
+    assert (failed["status"], failed["rows_committed"]) == ("failed", 4)
+    assert (succeeded["status"], succeeded["resumed_from_row"]) == ("success", 4)
+
+
+def test_process_excel_file_resume_checks_the_preview_mapping_and_policy(
+    excel_processing_module,
+    inventory_db: Path,
+):
+    upload = io.BytesIO(b"same workbook bytes")
+    rows = [{"Name": f"Item {index}", "Stock": index} for index in range(5)]
+    excel_processing_module.pd.read_excel = lambda uploaded_file: FakeFrame(
+        rows[:4] + [{"Name": "Item 4", "Stock": 4, "Bogus": "x"}]
+    )
+    with pytest.raises(ValueError, match="no mapping for: Bogus"):
+        excel_processing_module.process_excel_file(upload, str(inventory_db), "add", batch_size=2)
+
+    excel_processing_module.pd.read_excel = lambda uploaded_file: FakeFrame(rows)
+    remapped = excel_processing_module.preview_excel_import(
+        upload, str(inventory_db), column_mappings={"Name": "NAME", "Stock": "PRICE"}
+    )
+    with pytest.raises(ImportResumeConflict, match="different column mapping"):
+        excel_processing_module.process_excel_file(
+            upload, str(inventory_db), "add", preview=remapped, batch_size=2
+        )
+
+    content_hash = excel_processing_module.get_upload_content_hash(upload)
+    state = excel_processing_module.get_import_state(str(inventory_db), content_hash, "add")
+    assert (state.rows_committed, state.status) == (4, "in_progress")
+    assert excel_processing_module.get_import_state(str(inventory_db), content_hash, "add", "sum") is None
+
+    reviewed = excel_processing_module.preview_excel_import(
+        upload, str(inventory_db), column_mappings=state.column_mappings
+    )
+    assert excel_processing_module.process_excel_file(
+        upload, str(inventory_db), "add", preview=reviewed, batch_size=2
+    ) == 1
+    # Another duplicate policy consolidates rows differently, so it starts from the top.
+    assert excel_processing_module.process_excel_file(
+        upload, str(inventory_db), "add", preview=reviewed, batch_size=2, duplicate_policy="sum"
+    ) == 5
+
+
+def test_import_state_table_from_before_duplicate_policies_is_migrated(
+    excel_processing_module,
+    inventory_db: Path,
+):
+    with sqlite3.connect(inventory_db) as connection:
+        connection.execute(
+            """
+            CREATE TABLE _import_state (
+                content_hash TEXT NOT NULL, action TEXT NOT NULL, rows_committed INTEGER NOT NULL,
+                total_rows INTEGER, status TEXT NOT NULL, column_mappings TEXT NOT NULL,
+                updated_at TEXT NOT NULL, PRIMARY KEY (content_hash, action)
+            )
+            """
+        )
+        connection.execute(
+            "INSERT INTO _import_state VALUES ('abc', 'add', 4, 5, 'in_progress', '{\"Name\": \"NAME\"}', 'then')"
+        )
+
+    state = excel_processing_module.get_import_state(str(inventory_db), "abc", "add")
+
+    assert (state.duplicate_policy, state.rows_committed, state.column_mappings) == ("last", 4, {"Name": "NAME"})
+
+
+def test_process_excel_file_checkpointed_import_requires_readable_upload(
+    excel_processing_module,
+    inventory_db: Path,
+):
+    with pytest.raises(ValueError, match="bytes can be read"):
+        excel_processing_module.process_excel_file(object(), str(inventory_db), "add", batch_size=10)
+    with pytest.raises(ValueError, match="positive"):
+        excel_processing_module.process_excel_file(io.BytesIO(b"x"), str(inventory_db), "add", batch_size=0)
+
+
+def test_process_excel_file_dry_run_reports_changes_without_writing(
+    excel_processing_module,
+    inventory_db: Path,
+):
+    excel_processing_module.pd.read_excel = lambda uploaded_file: FakeFrame(
+        [
+            {"Name": "Widget", "Price": 12.5, "Stock": 12},
+            {"Name": "Gizmo", "Price": 19.99, "Stock": 3},
+            {"Name": "Doohickey", "Price": 1.0, "Stock": 7},
+        ]
+    )
+    with sqlite3.connect(inventory_db) as connection:
+        before = connection.execute("SELECT * FROM PRODUCT ORDER BY ID").fetchall()
+
+    modify = excel_processing_module.process_excel_file(object(), str(inventory_db), "modify", dry_run=True)
+    add = excel_processing_module.process_excel_file(object(), str(inventory_db), "add", dry_run=True)
+    remove = excel_processing_module.process_excel_file(object(), str(inventory_db), "remove", dry_run=True)
+
+    assert modify.counts() == {
+        "total_rows": 3,
+        "inserts": 0,
+        "updates": 1,
+        "unchanged": 1,
+        "deletes": 0,
+        "not_found": 1,
+        "duplicate_rows": 0,
+        "changed_columns": {"PRICE": 1},
+    }
+    assert modify.samples["updates"] == [{"NAME": "Widget", "changes": {"PRICE": [9.99, 12.5]}}]
+    assert modify.samples["not_found"] == [{"NAME": "Doohickey"}]
+    assert (add.inserts, add.updates, add.not_found) == (1, 1, 0)
+    assert add.samples["inserts"] == [{"NAME": "Doohickey", "PRICE": 1.0, "STOCK": 7}]
+    assert (remove.deletes, remove.not_found) == (2, 1)
+    with sqlite3.connect(inventory_db) as connection:
+        assert connection.execute("SELECT * FROM PRODUCT ORDER BY ID").fetchall() == before
+    audit_path = inventory_db.with_name("ai_operation_audit.jsonl")
+    events = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+    assert [event["event_type"] for event in events] == ["excel_import_dry_run"] * 3
+    assert events[-1]["details"]["deletes"] == 2
+
+
 def test_get_gemini_response_uses_mocked_sdk_when_api_key_is_available(monkeypatch):
     calls = []
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+import analytics
+import database
+import reporting
+import stock_ledger
+
+pytest.importorskip("pandas")
+
+PRODUCTS = [
+    ("Widget", "Tools", 2.0, 100),
+    ("Gizmo", "Tools", 10.0, 5),
+    ("Lamp", "Home", 25.0, 8),
+    ("Rug", "Home", 40.0, 12),
+    ("Cable", None, 1.5, 0),
+    ("Chair", "Home", 30.0, 10),
+    ("Throne", "Home", 9000.0, 1),
+]
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return "Narrative. "
+
+
+@pytest.fixture()
+def db_path(tmp_path: Path) -> Path:
+    path = tmp_path / "inventory.db"
+    database.ensure_schema(path)
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO PRODUCT (NAME, CATEGORY, PRICE, STOCK) VALUES (?, ?, ?, ?)", PRODUCTS
+        )
+        connection.execute(
+            "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (2, -7, 'sale', ?)",
+            (stock_ledger.ledger_time(datetime.now(timezone.utc)),),
+        )
+    reporting.clear_report_cache()
+    return path
+
+
+def test_report_figures_cover_the_whole_table(db_path: Path):
+    report = reporting.build_report(db_path, top_n=3, low_stock_threshold=8)
+
+    assert (report.product_count, report.total_units, report.out_of_stock) == (7, 136, 1)
+    assert report.total_value == pytest.approx(200 + 50 + 200 + 480 + 300 + 9000)
+    assert [row["CATEGORY"] for row in report.value_by_category] == ["Home", "Tools", "Uncategorized"]
+    assert report.value_by_category[0] == {"CATEGORY": "Home", "PRODUCTS": 4, "UNITS": 31, "VALUE": 9980.0}
+    assert [row["NAME"] for row in report.top_by_value] == ["Throne", "Rug", "Chair"]
+    assert [row["NAME"] for row in report.low_stock] == ["Cable", "Throne", "Gizmo"]
+    assert [(row["NAME"], row["COLUMN"]) for row in report.outliers] == [("Throne", "PRICE"), ("Widget", "STOCK")]
+    assert report.best_sellers == [{"NAME": "Gizmo", "UNITS_SOLD": 7}]
+
+
+def test_best_sellers_skip_deletions_and_recounts(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        database.set_movement_reason(connection, "import:remove")
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Widget'")
+        database.set_movement_reason(connection, "import:modify")
+        connection.execute("UPDATE PRODUCT SET STOCK = 2 WHERE NAME = 'Rug'")
+        database.clear_movement_reason(connection)
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Lamp'")
+
+    report = reporting.build_report(db_path)
+
+    assert report.best_sellers == [{"NAME": "Gizmo", "UNITS_SOLD": 7}]
+
+
+def test_report_is_cached_until_the_database_changes(db_path: Path):
+    first = reporting.build_report(db_path)
+
+    assert reporting.build_report(db_path) is first
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("INSERT INTO PRODUCT (NAME, CATEGORY, PRICE, STOCK) VALUES ('Mat', 'Home', 5, 3)")
+    second = reporting.build_report(db_path)
+    assert second is not first
+    assert second.product_count == 8
+    assert second.database_version != first.database_version
+
+
+def test_generate_report_asks_for_narrative_only_and_appends_the_figures(db_path: Path):
+    client = _RecordingClient()
+
+    text = analytics.generate_report(None, db_path=str(db_path), client=client)
+
+    (prompt,) = client.prompts
+    assert "do not invent or recompute figures" in prompt
+    assert "- Inventory value: 10,230.00" in prompt
+    assert text.startswith("Narrative.\n\n### Inventory figures")
+    assert "| Throne | Home | 1 | 9,000.00 | 9,000.00 |" in text
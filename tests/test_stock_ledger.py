@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import io
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+import database
+import excel_processing
+import stock_ledger
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def db_path(tmp_path: Path) -> Path:
+    path = tmp_path / "inventory.db"
+    database.ensure_schema(path)
+    return path
+
+
+def _movements(db_path: Path) -> list[tuple]:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute("SELECT PRODUCT_ID, DELTA, REASON FROM STOCK_MOVEMENT ORDER BY ID").fetchall()
+
+
+def _record(connection: sqlite3.Connection, product_id: int, delta: int, day: float) -> None:
+    connection.execute(
+        "INSERT INTO STOCK_MOVEMENT (PRODUCT_ID, DELTA, REASON, MOVED_AT) VALUES (?, ?, 'sale', ?)",
+        (product_id, delta, stock_ledger.ledger_time(START + timedelta(days=day))),
+    )
+
+
+def test_triggers_record_every_stock_change(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("INSERT INTO PRODUCT (NAME, STOCK) VALUES ('Widget', 10)")
+        connection.execute("INSERT INTO PRODUCT (NAME, STOCK) VALUES ('Empty', 0)")
+        connection.execute("UPDATE PRODUCT SET STOCK = 7 WHERE NAME = 'Widget'")
+        connection.execute("UPDATE PRODUCT SET PRICE = 2.5, STOCK = 7 WHERE NAME = 'Widget'")
+        database.set_movement_reason(connection, "recount")
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Widget'")
+        database.clear_movement_reason(connection)
+
+    assert _movements(db_path) == [(1, 10, "manual"), (1, -3, "manual"), (1, -7, "delisted")]
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM _stock_movement_context").fetchone() == (0,)
+
+
+def test_migration_records_existing_stock_as_an_opening_snapshot(tmp_path: Path):
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(database.CREATE_PRODUCT_TABLE_SQL)
+        connection.execute("INSERT INTO PRODUCT (NAME, STOCK) VALUES ('Widget', 12), ('Gizmo', 0)")
+        connection.execute("CREATE TABLE _schema_version (version INTEGER NOT NULL)")
+        connection.execute("INSERT INTO _schema_version (version) VALUES (1)")
+
+    database.ensure_schema(db_path)
+
+    assert _movements(db_path) == []
+    assert stock_ledger.stock_as_of(db_path, datetime.now(timezone.utc) + timedelta(seconds=1)) == {1: 12}
+
+
+def test_migration_relabels_recorded_deletions(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("INSERT INTO PRODUCT (NAME, STOCK) VALUES ('Widget', 10), ('Gizmo', 4)")
+        connection.execute("UPDATE PRODUCT SET STOCK = 6 WHERE NAME = 'Widget'")
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Widget'")
+        # What the delete trigger recorded before deletions had their own reason.
+        connection.execute("UPDATE STOCK_MOVEMENT SET REASON = 'import:remove' WHERE DELTA = -6")
+        connection.execute("UPDATE _schema_version SET version = 2")
+
+    database.ensure_schema(db_path)
+
+    assert _movements(db_path) == [(1, 10, "manual"), (2, 4, "manual"), (1, -4, "manual"), (1, -6, "delisted")]
+
+
+def test_migration_keeps_sales_of_products_deleted_at_zero(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("INSERT INTO PRODUCT (NAME, STOCK) VALUES ('Widget', 10), ('Gizmo', 4)")
+        connection.execute("UPDATE PRODUCT SET STOCK = 0 WHERE NAME = 'Widget'")  # sold out
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Widget'")  # nothing left to write off
+        connection.execute("UPDATE PRODUCT SET STOCK = 1 WHERE NAME = 'Gizmo'")
+        connection.execute("DELETE FROM PRODUCT WHERE NAME = 'Gizmo'")
+        # Before schema version 3 a manual deletion was labelled like a sale.
+        connection.execute("UPDATE STOCK_MOVEMENT SET REASON = 'manual'")
+        connection.execute("UPDATE _schema_version SET version = 2")
+
+    database.ensure_schema(db_path)
+
+    assert _movements(db_path) == [
+        (1, 10, "manual"),
+        (2, 4, "manual"),
+        (1, -10, "manual"),
+        (2, -3, "manual"),
+        (2, -1, "manual"),
+    ]
+
+
+def test_imports_label_their_movements(db_path: Path):
+    upload = io.BytesIO(b"Name,Stock\nWidget,5\nGizmo,2\n")
+    upload.name = "stock.csv"
+
+    excel_processing.process_excel_file(upload, str(db_path), "add")
+
+    assert _movements(db_path) == [(1, 5, "import:add"), (2, 2, "import:add")]
+
+
+def test_stock_as_of_matches_a_full_replay_with_and_without_snapshots(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        for day in range(30):
+            _record(connection, 1, 10 if day % 7 == 0 else -1, day)
+            _record(connection, 2, 5 if day % 3 == 0 else -2, day + 0.5)
+    moments = [START + timedelta(days=day, hours=12) for day in (0, 3, 10, 29)]
+    replayed = [stock_ledger.stock_as_of(db_path, moment) for moment in moments]
+
+    with sqlite3.connect(db_path) as connection:
+        assert stock_ledger.take_snapshot(connection) is not None
+        assert stock_ledger.take_snapshot(connection) is None  # nothing moved since
+        connection.execute("UPDATE STOCK_SNAPSHOT SET TAKEN_AT = ?", (stock_ledger.ledger_time(START + timedelta(days=30)),))
+        _record(connection, 1, -4, 31)
+
+    assert [stock_ledger.stock_as_of(db_path, moment) for moment in moments] == replayed
+    assert replayed[0] == {1: 10, 2: 5}
+    assert stock_ledger.stock_as_of(db_path, START + timedelta(days=32)) == {
+        product: stock - (4 if product == 1 else 0) for product, stock in replayed[-1].items()
+    }
+    assert stock_ledger.stock_as_of(db_path, START + timedelta(days=32), product_ids=[2]) == {2: replayed[-1][2]}
+
+
+def test_checkpoint_if_due_waits_for_enough_movements(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        for day in range(3):
+            _record(connection, 1, -1, day)
+
+    assert stock_ledger.checkpoint_if_due(db_path, every=5) is None
+    assert stock_ledger.checkpoint_if_due(db_path, every=3) is not None
+    assert stock_ledger.checkpoint_if_due(db_path, every=1) is None
+
+
+def test_stock_velocity_splits_units_in_and_out(db_path: Path):
+    with sqlite3.connect(db_path) as connection:
+        _record(connection, 1, 20, 0.5)
+        for day in range(1, 11):
+            _record(connection, 1, -2, day)
+        _record(connection, 2, -1, 40)
+
+    (velocity,) = stock_ledger.stock_velocity(db_path, START, START + timedelta(days=10))
+
+    assert (velocity.product_id, velocity.units_in, velocity.units_out, velocity.net) == (1, 20, 20, 0)
+    assert velocity.daily_outflow == pytest.approx(2.0)
+
+
+def test_seeding_records_opening_levels_instead_of_movements(db_path: Path):
+    database.seed_database(db_path, num_products=50, seed=3)
+
+    with sqlite3.connect(db_path) as connection:
+        expected = dict(connection.execute("SELECT ID, STOCK FROM PRODUCT WHERE STOCK != 0"))
+        triggers = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0]
+        connection.execute("UPDATE PRODUCT SET STOCK = STOCK + 1 WHERE ID = 1")
+
+    assert _movements(db_path) == [(1, 1, "manual")]
+    assert triggers == len(database.CREATE_STOCK_TRIGGERS_SQL)
+    later = datetime.now(timezone.utc) + timedelta(seconds=1)
+    assert stock_ledger.stock_as_of(db_path, later) == {**expected, 1: expected.get(1, 0) + 1}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import sys
+import types
+
+import pytest
+
+import analytics
+import gemini_client
+import prompt
+from metrics import LLM_ERRORS, LLM_FIRST_TOKEN_SECONDS
+
+
+class _Chunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("chunk has no text parts")
+        return self._text
+
+
+class _FakeStreamingModel:
+    """Stands in for ``GenerativeModel``: yields chunks, optionally failing part way."""
+
+    chunks: tuple = ("SELECT NAME ", None, "FROM PRODUCT ", "WHERE STOCK < 5")
+    fail_after: int | None = None
+    calls: list = []
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt_text, stream=False, **kwargs):
+        type(self).calls.append({"prompt": prompt_text, "stream": stream, **kwargs})
+        if not stream:
+            return _Chunk("".join(chunk for chunk in self.chunks if chunk))
+        return self._stream()
+
+    def _stream(self):
+        for index, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and index >= self.fail_after:
+                raise ConnectionError("stream dropped")
+            yield _Chunk(chunk)
+
+
+@pytest.fixture(autouse=True)
+def gateway():
+    gemini_client.reset_gateway(gemini_client.GeminiGateway(sleep=lambda seconds: None))
+    yield gemini_client.get_gateway()
+    gemini_client.reset_gateway()
+
+
+@pytest.fixture()
+def fake_model(monkeypatch):
+    model = type("Model", (_FakeStreamingModel,), {"calls": []})
+    genai = types.SimpleNamespace(configure=lambda **kwargs: None, GenerativeModel=model)
+    google = types.ModuleType("google")
+    google.__path__ = []
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    return model
+
+
+def test_analytics_client_streams_chunks_and_records_first_token(fake_model):
+    client = analytics.GeminiAnalyticsClient(genai_module=sys.modules["google.generativeai"])
+    before = LLM_FIRST_TOKEN_SECONDS.count(caller="analytics", source="gemini")
+
+    chunks = list(client.generate_stream("hello", generation_config={"temperature": 0}))
+
+    assert chunks == ["SELECT NAME ", "FROM PRODUCT ", "WHERE STOCK < 5"]
+    assert fake_model.calls == [{"prompt": "hello", "stream": True, "generation_config": {"temperature": 0}}]
+    assert LLM_FIRST_TOKEN_SECONDS.count(caller="analytics", source="gemini") == before + 1
+
+
+def test_stream_functions_fall_back_to_one_chunk_for_non_streaming_clients():
+    class _Client:
+        def generate(self, prompt_text):
+            return "whole answer"
+
+    frame = types.SimpleNamespace(columns=["NAME"])
+
+    assert list(analytics.stream_insights(frame, client=_Client())) == ["whole answer"]
+    assert list(analytics.stream_stock_needs(frame, client=_Client())) == ["whole answer"]
+
+
+def test_sql_streams_from_gemini_and_finalizes_the_joined_text(fake_model):
+    chunks = list(prompt.stream_sql_query("PRODUCT (NAME, STOCK)", "what is low?"))
+
+    assert chunks == ["SELECT NAME ", "FROM PRODUCT ", "WHERE STOCK < 5"]
+    assert "Question: what is low?" in fake_model.calls[0]["prompt"]
+    assert prompt.finalize_sql_query("".join(chunks), "what is low?") == "SELECT NAME FROM PRODUCT WHERE STOCK < 5"
+    assert prompt.finalize_sql_query("I cannot help", "how many products") == (
+        "SELECT COUNT(*) AS product_count FROM PRODUCT"
+    )
+
+
+def test_sql_stream_falls_back_only_when_nothing_was_streamed(fake_model):
+    errors = LLM_ERRORS.value(error="ConnectionError")
+    fake_model.fail_after = 0
+    assert list(prompt.stream_sql_query("", "count products")) == [
+        "SELECT COUNT(*) AS product_count FROM PRODUCT"
+    ]
+
+    fake_model.fail_after = 1
+    assert list(prompt.stream_sql_query("", "count products")) == ["SELECT NAME "]
+    assert LLM_ERRORS.value(error="ConnectionError") == errors + 2
+
+
+def test_sql_stream_without_a_key_yields_the_fallback(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+
+    assert list(prompt.stream_sql_query("", "average price")) == ["SELECT AVG(PRICE) AS average_price FROM PRODUCT"]
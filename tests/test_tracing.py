@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import tracing
+from audit import append_audit_event
+from guardrails import validate_read_only_sql
+from utils import read_sql_query
+
+
+@pytest.fixture(autouse=True)
+def _clean_trace_buffer(monkeypatch):
+    monkeypatch.delenv(tracing.TRACE_FILE_ENV, raising=False)
+    tracing.clear_finished_traces()
+    yield
+    tracing.clear_finished_traces()
+
+
+def test_spans_nest_and_record_counters_and_histograms():
+    with tracing.span("outer", kind="test") as outer:
+        with tracing.span("inner"):
+            tracing.count("rows", 3)
+            tracing.observe("row_ms", 2.0)
+            tracing.observe("row_ms", 4.0)
+        outer.count("calls")
+
+    (trace,) = tracing.finished_traces()
+    assert trace["name"] == "outer"
+    assert trace["attributes"] == {"kind": "test"}
+    assert trace["counters"] == {"calls": 1}
+    (inner,) = trace["children"]
+    assert inner["parent_id"] == trace["span_id"]
+    assert inner["trace_id"] == trace["trace_id"]
+    assert inner["counters"] == {"rows": 3}
+    assert inner["histograms"]["row_ms"] == {"count": 2, "sum": 6.0, "min": 2.0, "max": 4.0, "mean": 3.0}
+    assert trace["duration_ms"] >= inner["duration_ms"] >= 0
+
+
+def test_span_records_errors_and_reraises():
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+
+    assert tracing.finished_traces()[-1]["error"] == "ValueError: boom"
+
+
+def test_counters_outside_a_span_are_ignored():
+    tracing.count("rows")
+    tracing.observe("row_ms", 1.0)
+
+    assert tracing.current_trace() is None
+    assert tracing.finished_traces() == []
+
+
+def test_export_jsonl_and_env_export(tmp_path: Path, monkeypatch):
+    auto_export = tmp_path / "auto.jsonl"
+    monkeypatch.setenv(tracing.TRACE_FILE_ENV, str(auto_export))
+
+    with tracing.span("exported"):
+        pass
+
+    manual = tracing.export_jsonl(tmp_path / "manual.jsonl")
+    assert [json.loads(line)["name"] for line in auto_export.read_text().splitlines()] == ["exported"]
+    assert [json.loads(line)["name"] for line in manual.read_text().splitlines()] == ["exported"]
+
+
+def test_audit_events_inside_a_span_carry_the_trace(tmp_path: Path):
+    db_path = tmp_path / "inventory.db"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE PRODUCT (ID INTEGER PRIMARY KEY, NAME TEXT)")
+        connection.execute("INSERT INTO PRODUCT (NAME) VALUES ('Widget')")
+
+    with tracing.span("ui.generate_sql_query"):
+        sql = validate_read_only_sql("SELECT * FROM PRODUCT", allowed_tables=("PRODUCT",))
+        read_sql_query(sql, str(db_path))
+        audit_path = append_audit_event(db_path, "sql_query_review", {"status": "executed"})
+    append_audit_event(db_path, "untraced", {})
+
+    traced_event, untraced_event = [
+        json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()
+    ]
+    trace = traced_event["trace"]
+    assert [step["name"] for step in trace["steps"]] == ["validate_read_only_sql", "read_sql_query"]
+    assert (trace["root"], trace["span"]) == ("ui.generate_sql_query", "ui.generate_sql_query")
+    assert "trace" not in untraced_event
+
+    root = tracing.finished_traces()[-2]
+    assert (root["trace_id"], root["span_id"]) == (trace["trace_id"], trace["span_id"])
+    assert [child["name"] for child in root["children"]][-1] == "append_audit_event"
+    assert root["children"][1]["counters"] == {"rows": 1}
+
+
+def test_audit_trace_summaries_stay_bounded_across_batches(tmp_path: Path):
+    db_path = tmp_path / "inventory.db"
+
+    with tracing.span("process_excel_file"):
+        for batch in range(3 * tracing.MAX_SUMMARY_STEPS):
+            with tracing.span("batch"):
+                pass
+            audit_path = append_audit_event(db_path, "excel_import_batch", {"batch_index": batch})
+
+    lines = audit_path.read_text(encoding="utf-8").splitlines()
+    last = json.loads(lines[-1])["trace"]
+    assert len(last["steps"]) == tracing.MAX_SUMMARY_STEPS
+    assert {step["name"] for step in last["steps"]} == {"batch"}
+    assert last["steps_omitted"] == 2 * tracing.MAX_SUMMARY_STEPS
+    assert len(lines[-1]) < 2 * len(lines[tracing.MAX_SUMMARY_STEPS])
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import functools
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import excel_processing
+import upload_formats
+from audit import get_audit_log_path
+from database import ensure_schema
+
+pd = pytest.importorskip("pandas")
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data: bytes, name: str | None = None):
+        super().__init__(data)
+        self.name = name
+
+
+def _parquet_bytes(frame) -> bytes:
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, index=False, row_group_size=2)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def inventory_db(tmp_path: Path) -> Path:
+    db_path = tmp_path / "inventory.db"
+    ensure_schema(db_path)
+    return db_path
+
+
+@pytest.mark.parametrize(
+    ("data", "name", "expected"),
+    [
+        (b"PK\x03\x04rest-of-zip", "export.csv", upload_formats.EXCEL),
+        (b"PAR1....", None, upload_formats.PARQUET),
+        (b"Name,Stock\nWidget,3\n", "stock.csv", upload_formats.UploadFormat("csv", ",")),
+        (b"Name;Stock\nWidget;3\n", "stock.csv", upload_formats.UploadFormat("csv", ";")),
+        (b"Name\tStock\nWidget\t3\n", None, upload_formats.UploadFormat("tsv", "\t")),
+        (b"Name,Stock\nWidget,3\n", None, upload_formats.UploadFormat("csv", ",")),
+        (b"not a table", None, upload_formats.EXCEL),
+    ],
+)
+def test_sniff_upload_format(data: bytes, name: str | None, expected):
+    upload = _Upload(data, name)
+
+    assert upload_formats.sniff_upload_format(upload) == expected
+    assert upload.tell() == 0
+    assert upload_formats.sniff_upload_format(object()) == upload_formats.EXCEL
+
+
+def test_csv_and_parquet_stream_in_chunks():
+    frame = pd.DataFrame({"Name": ["A", "B", "C", "D", "E"], "Stock": [1, 2, 3, 4, 5]})
+    csv_upload = _Upload(frame.to_csv(index=False).encode(), "stock.csv")
+    parquet_upload = _Upload(_parquet_bytes(frame), "stock.parquet")
+
+    for upload in (csv_upload, parquet_upload):
+        upload_format = upload_formats.sniff_upload_format(upload)
+        chunks = list(upload_formats.iter_upload_chunks(upload, upload_format, chunk_rows=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert list(upload_formats.read_upload_sample(upload, upload_format, rows=3)["Name"]) == ["A", "B", "C"]
+    assert upload_formats.count_upload_rows(parquet_upload, upload_formats.PARQUET) == 5
+    assert upload_formats.count_upload_rows(csv_upload, upload_formats.sniff_upload_format(csv_upload)) is None
+
+
+@pytest.mark.parametrize("fmt", ["tsv", "parquet"])
+def test_streamed_formats_feed_the_import_pipeline(inventory_db: Path, monkeypatch, fmt: str):
+    frame = pd.DataFrame({"Product Name": [f"Item {index}" for index in range(5)], "Qty": [1, 2, 3, 4, 5]})
+    if fmt == "parquet":
+        data = _parquet_bytes(frame)
+    else:
+        data = frame.to_csv(index=False, sep="\t").encode()
+    monkeypatch.setattr(upload_formats, "PREVIEW_SAMPLE_ROWS", 2)
+    monkeypatch.setattr(
+        excel_processing, "iter_upload_chunks", functools.partial(upload_formats.iter_upload_chunks, chunk_rows=2)
+    )
+    monkeypatch.setattr(excel_processing.pd, "read_excel", lambda *args: pytest.fail("not an Excel upload"))
+
+    preview = excel_processing.preview_excel_import(_Upload(data, f"erp.{fmt}"), str(inventory_db))
+    processed = excel_processing.process_excel_file(_Upload(data, f"erp.{fmt}"), str(inventory_db), "add")
+
+    assert preview["column_mappings"] == {"Product Name": "NAME", "Qty": "STOCK"}
+    assert len(preview["dataframe"]) == 2  # only a sample is parsed for the preview
+    assert preview["total_rows"] == (5 if fmt == "parquet" else None)
+    assert processed == 5
+    with sqlite3.connect(inventory_db) as connection:
+        assert connection.execute("SELECT SUM(STOCK) FROM PRODUCT").fetchone() == (15,)
+    event = json.loads(get_audit_log_path(inventory_db).read_text(encoding="utf-8").splitlines()[-1])
+    assert event["details"]["upload_format"] == fmt
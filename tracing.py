@@ -0,0 +1,264 @@
+"""Lightweight in-process tracing for the inventory app's hot paths.
+
+``span()`` is a context manager that times a block and nests under whichever
+span is active in the current context, so a slow click can be broken down
+into SQLite, Excel parsing, and Gemini time. Spans also carry counters and
+histograms for per-call detail (rows fetched, per-row latency).
+
+Finished root spans are kept in a small in-memory buffer, can be exported as
+JSON lines with ``export_jsonl``, and are appended automatically to the file
+named by ``INVENTORY_TRACE_FILE`` when that variable is set. The audit log
+attaches ``trace_summary()`` to events written while a span is active: the
+trace and span IDs that find the full tree, plus a bounded list of steps.
+
+Everything here is stdlib-only and safe to import from any module.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, TypeVar
+
+TRACE_FILE_ENV = "INVENTORY_TRACE_FILE"
+MAX_FINISHED_TRACES = 256
+MAX_SUMMARY_STEPS = 20
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+@dataclass
+class Histogram:
+    """Streaming summary of observed values (count, sum, min, max)."""
+
+    count: int = 0
+    total: float = 0.0
+    minimum: float | None = None
+    maximum: float | None = None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def to_dict(self) -> dict[str, float | int | None]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.total / self.count if self.count else None,
+        }
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    duration_ms: float | None = None
+    error: str | None = None
+    counters: dict[str, float] = field(default_factory=dict)
+    histograms: dict[str, Histogram] = field(default_factory=dict)
+    children: list[Span] = field(default_factory=list)
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        self.histograms.setdefault(name, Histogram()).observe(value)
+
+    def elapsed_ms(self) -> float:
+        if self.duration_ms is not None:
+            return self.duration_ms
+        return (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.elapsed_ms(), 3),
+            "in_progress": self.duration_ms is None,
+        }
+        if self.attributes:
+            payload["attributes"] = dict(self.attributes)
+        if self.error is not None:
+            payload["error"] = self.error
+        if self.counters:
+            payload["counters"] = dict(self.counters)
+        if self.histograms:
+            payload["histograms"] = {name: hist.to_dict() for name, hist in self.histograms.items()}
+        if self.children:
+            payload["children"] = [child.to_dict() for child in list(self.children)]
+        return payload
+
+
+_current_span: ContextVar[Span | None] = ContextVar("inventory_current_span", default=None)
+_root_span: ContextVar[Span | None] = ContextVar("inventory_root_span", default=None)
+_finished: deque[dict[str, Any]] = deque(maxlen=MAX_FINISHED_TRACES)
+_finished_lock = threading.Lock()
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def current_trace() -> dict[str, Any] | None:
+    """Return the active trace tree (root span and all children so far)."""
+
+    root = _root_span.get()
+    return root.to_dict() if root is not None else None
+
+
+def trace_summary(max_steps: int = MAX_SUMMARY_STEPS, *, skip: Iterable[str] = ()) -> dict[str, Any] | None:
+    """Return a bounded summary of the active span for records such as audit events.
+
+    ``trace_id`` and ``span_id`` identify the full tree once it is exported.
+    The summary lists only the current span's last ``max_steps`` finished
+    children (name, duration, error), leaving out those named in ``skip``, so
+    its size does not grow with the work done earlier in the trace.
+    """
+
+    active = _current_span.get()
+    if active is None:
+        return None
+    root = _root_span.get() or active
+    skipped = set(skip)
+    steps = [child for child in list(active.children) if child.name not in skipped]
+    recent = steps[-max_steps:] if max_steps > 0 else []
+    summary: dict[str, Any] = {
+        "trace_id": active.trace_id,
+        "span_id": active.span_id,
+        "root": root.name,
+        "span": active.name,
+        "elapsed_ms": round(root.elapsed_ms(), 3),
+        "steps": [
+            {
+                "name": child.name,
+                "duration_ms": round(child.elapsed_ms(), 3),
+                **({"error": child.error} if child.error is not None else {}),
+            }
+            for child in recent
+        ],
+    }
+    if len(recent) < len(steps):
+        summary["steps_omitted"] = len(steps) - len(recent)
+    return summary
+
+
+def count(name: str, value: float = 1) -> None:
+    """Increment a counter on the active span; a no-op outside any span."""
+
+    active = _current_span.get()
+    if active is not None:
+        active.count(name, value)
+
+
+def observe(name: str, value: float) -> None:
+    """Record a histogram value on the active span; a no-op outside any span."""
+
+    active = _current_span.get()
+    if active is not None:
+        active.observe(name, value)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a span nested under the active one."""
+
+    parent = _current_span.get()
+    new_span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else secrets.token_hex(8),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent is not None else None,
+        attributes=dict(attributes),
+    )
+    span_token = _current_span.set(new_span)
+    root_token = _root_span.set(new_span) if parent is None else None
+    try:
+        yield new_span
+    except BaseException as exc:
+        new_span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        new_span.duration_ms = (time.perf_counter() - new_span._start) * 1000
+        _current_span.reset(span_token)
+        if parent is not None:
+            parent.children.append(new_span)
+        else:
+            _root_span.reset(root_token)
+            _record_finished(new_span.to_dict())
+
+
+def traced(name: str | None = None) -> Callable[[_F], _F]:
+    """Decorator form of ``span`` using the function's qualified name by default."""
+
+    def decorator(func: _F) -> _F:
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _record_finished(trace: dict[str, Any]) -> None:
+    with _finished_lock:
+        _finished.append(trace)
+    export_path = os.getenv(TRACE_FILE_ENV)
+    if export_path:
+        try:
+            export_jsonl(export_path, [trace])
+        except OSError:
+            pass  # tracing must never break the operation being traced
+
+
+def finished_traces() -> list[dict[str, Any]]:
+    """Return the most recent finished root traces, oldest first."""
+
+    with _finished_lock:
+        return list(_finished)
+
+
+def clear_finished_traces() -> None:
+    with _finished_lock:
+        _finished.clear()
+
+
+def export_jsonl(path: str | Path, traces: Iterable[dict[str, Any]] | None = None) -> Path:
+    """Append traces (default: the finished buffer) to ``path`` as JSON lines."""
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    items = finished_traces() if traces is None else list(traces)
+    with target.open("a", encoding="utf-8") as handle:
+        for trace in items:
+            handle.write(json.dumps(trace, sort_keys=True, default=str))
+            handle.write("\n")
+    return target
@@ -0,0 +1,159 @@
+"""Format sniffing and streaming readers for tabular uploads.
+
+Excel workbooks are still parsed whole by ``excel_processing``. CSV/TSV
+exports are read in ``pandas.read_csv`` chunks. Parquet files are read one
+row-group batch at a time through pyarrow, so neither is ever fully
+materialized. The import preview only parses a sample of those formats.
+
+The format is decided by magic bytes first (``PK`` zip containers and OLE
+compound files are workbooks, ``PAR1`` is Parquet), then by the file
+extension, and finally by whether the first line of text carries a tab or
+comma. Anything else is handed to ``pd.read_excel`` as before, so it keeps
+its error messages.
+"""
+
+from __future__ import annotations
+
+import io
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import PurePath
+
+EXCEL_FORMAT = "excel"
+CSV_FORMAT = "csv"
+TSV_FORMAT = "tsv"
+PARQUET_FORMAT = "parquet"
+
+DEFAULT_CHUNK_ROWS = 50_000
+PREVIEW_SAMPLE_ROWS = 1_000
+_SNIFF_BYTES = 64 * 1024
+
+_WORKBOOK_MAGIC = (b"PK\x03\x04", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")
+_PARQUET_MAGIC = b"PAR1"
+_SUFFIX_FORMATS = {
+    ".xlsx": EXCEL_FORMAT,
+    ".xlsm": EXCEL_FORMAT,
+    ".xls": EXCEL_FORMAT,
+    ".csv": CSV_FORMAT,
+    ".tsv": TSV_FORMAT,
+    ".tab": TSV_FORMAT,
+    ".parquet": PARQUET_FORMAT,
+    ".pq": PARQUET_FORMAT,
+}
+
+
+@dataclass(frozen=True)
+class UploadFormat:
+    name: str
+    delimiter: str | None = None
+
+    @property
+    def streamed(self) -> bool:
+        return self.name != EXCEL_FORMAT
+
+
+EXCEL = UploadFormat(EXCEL_FORMAT)
+PARQUET = UploadFormat(PARQUET_FORMAT)
+
+
+def _peek(uploaded_file, size: int = _SNIFF_BYTES) -> bytes | None:
+    if hasattr(uploaded_file, "read") and hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+        head = uploaded_file.read(size)
+        uploaded_file.seek(0)
+    elif hasattr(uploaded_file, "getvalue"):
+        head = uploaded_file.getvalue()[:size]
+    else:
+        return None
+    return head.encode("utf-8") if isinstance(head, str) else bytes(head)
+
+
+def _text_format(head: bytes) -> UploadFormat | None:
+    try:
+        first_line = head.decode("utf-8-sig").splitlines()[0]
+    except (UnicodeDecodeError, IndexError):
+        return None
+    if "\t" in first_line:
+        return UploadFormat(TSV_FORMAT, "\t")
+    if "," in first_line:
+        return UploadFormat(CSV_FORMAT, ",")
+    return None
+
+
+def sniff_upload_format(uploaded_file) -> UploadFormat:
+    """Decide how to read an upload from its leading bytes and file name."""
+
+    head = _peek(uploaded_file)
+    if head is None:
+        return EXCEL
+    if head.startswith(_PARQUET_MAGIC):
+        return PARQUET
+    if head.startswith(_WORKBOOK_MAGIC):
+        return EXCEL
+    suffix = PurePath(str(getattr(uploaded_file, "name", None) or "")).suffix.lower()
+    by_suffix = _SUFFIX_FORMATS.get(suffix)
+    if by_suffix == TSV_FORMAT:
+        return UploadFormat(TSV_FORMAT, "\t")
+    if by_suffix == CSV_FORMAT:
+        sniffed = _text_format(head)
+        # Semicolon-separated "CSV" is common in European ERP exports.
+        if sniffed is None and b";" in head.split(b"\n", 1)[0]:
+            return UploadFormat(CSV_FORMAT, ";")
+        return UploadFormat(CSV_FORMAT, sniffed.delimiter if sniffed else ",")
+    if by_suffix is not None:
+        return UploadFormat(by_suffix)
+    return _text_format(head) or EXCEL
+
+
+def _rewound(uploaded_file):
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+        return uploaded_file
+    return io.BytesIO(uploaded_file.getvalue())
+
+
+def _parquet_file(uploaded_file):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - pyarrow ships with most pandas installs.
+        raise ValueError("Parquet uploads need the optional 'pyarrow' package.") from exc
+    return pq.ParquetFile(_rewound(uploaded_file))
+
+
+def read_upload_sample(uploaded_file, upload_format: UploadFormat, rows: int | None = None):
+    """Return the first ``rows`` (default ``PREVIEW_SAMPLE_ROWS``) rows of a CSV/TSV or Parquet upload."""
+
+    rows = PREVIEW_SAMPLE_ROWS if rows is None else rows
+    if upload_format.name == PARQUET_FORMAT:
+        batch = next(_parquet_file(uploaded_file).iter_batches(batch_size=rows), None)
+        if batch is None:
+            return _parquet_file(uploaded_file).schema_arrow.empty_table().to_pandas()
+        return batch.to_pandas()
+    import pandas as pd
+
+    return pd.read_csv(_rewound(uploaded_file), sep=upload_format.delimiter, nrows=rows)
+
+
+def iter_upload_chunks(
+    uploaded_file,
+    upload_format: UploadFormat,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator:
+    """Yield a CSV/TSV or Parquet upload as DataFrames of at most ``chunk_rows`` rows."""
+
+    if upload_format.name == PARQUET_FORMAT:
+        for batch in _parquet_file(uploaded_file).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    import pandas as pd
+
+    with pd.read_csv(_rewound(uploaded_file), sep=upload_format.delimiter, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def count_upload_rows(uploaded_file, upload_format: UploadFormat) -> int | None:
+    """Return the row count when the format records it (Parquet), else ``None``."""
+
+    if upload_format.name == PARQUET_FORMAT:
+        return _parquet_file(uploaded_file).metadata.num_rows
+    return None
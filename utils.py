@@ -13,7 +13,10 @@ import sqlite3
 from pathlib import Path
 from typing import Callable, Iterable, Sequence
 
+from column_matching import match_columns
+from metrics import SQL_QUERY_ROWS, SQL_QUERY_SECONDS
 from prompt import build_column_mapping_prompt
+from tracing import count, span
 
 try:  # Optional dependency for richer return values when available.
     import pandas as _pandas  # type: ignore
@@ -113,23 +116,32 @@ def read_sql_query(query: str, db_path: str):
     resolved_db_path = _resolve_db_path(db_path)
     sql = _rewrite_query_for_known_schema(query)
 
-    with sqlite3.connect(resolved_db_path) as connection:
-        connection.row_factory = sqlite3.Row
-        cursor = connection.cursor()
-        try:
-            cursor.execute(sql)
-        except sqlite3.OperationalError:
-            if sql != query:
-                cursor.execute(_rewrite_query_for_known_schema(query))
-            else:
-                raise
-
-        if cursor.description is None:
-            return _to_dataframe([], [])
-
-        columns = [description[0] for description in cursor.description]
-        rows = [dict(row) for row in cursor.fetchall()]
-        return _to_dataframe(rows, columns)
+    with (
+        span("read_sql_query", sql_chars=len(sql), rewritten=sql != query) as query_span,
+        SQL_QUERY_SECONDS.time(),
+    ):
+        with sqlite3.connect(resolved_db_path) as connection:
+            connection.row_factory = sqlite3.Row
+            cursor = connection.cursor()
+            with span("sqlite.execute"):
+                try:
+                    cursor.execute(sql)
+                except sqlite3.OperationalError:
+                    if sql != query:
+                        cursor.execute(_rewrite_query_for_known_schema(query))
+                    else:
+                        raise
+
+            if cursor.description is None:
+                return _to_dataframe([], [])
+
+            columns = [description[0] for description in cursor.description]
+            with span("sqlite.fetch"):
+                rows = [dict(row) for row in cursor.fetchall()]
+            query_span.count("rows", len(rows))
+            SQL_QUERY_ROWS.inc(len(rows))
+        with span("build_dataframe"):
+            return _to_dataframe(rows, columns)
 
 
 def _guess_sqlite_type(column_name: str) -> str:
@@ -187,75 +199,41 @@ def _parse_mapping_response(response: str) -> dict[str, str]:
     return mapping
 
 
-def _heuristic_column_mapping(
-    excel_columns: Iterable[str],
-    existing_columns: Iterable[str],
-) -> dict[str, str]:
-    existing_lookup = {_normalize_identifier(column): column for column in existing_columns}
-    result: dict[str, str] = {}
-
-    synonym_groups = {
-        "NAME": ("NAME", "PRODUCTNAME", "ITEMNAME", "PRODUCT"),
-        "CATEGORY": ("CATEGORY", "TYPE", "GROUP"),
-        "BRAND": ("BRAND",),
-        "PRICE": ("PRICE", "COST", "AMOUNT", "RATE"),
-        "STOCK": ("STOCK", "QUANTITY", "QTY", "INVENTORY"),
-        "QUANTITY": ("QUANTITY", "STOCK", "QTY", "INVENTORY"),
-        "COLOR": ("COLOR", "COLOUR"),
-        "SIZE": ("SIZE",),
-        "WEIGHT": ("WEIGHT",),
-        "SPECIFICATIONS": ("SPECIFICATIONS", "SPECIFICATION", "DETAILS", "DESCRIPTION", "SPEC"),
-        "ID": ("ID", "PRODUCTID"),
-    }
-
-    for excel_column in excel_columns:
-        normalized = _normalize_identifier(str(excel_column))
-        if normalized in existing_lookup:
-            result[str(excel_column)] = existing_lookup[normalized]
-            continue
-
-        mapped_column = None
-        for target, aliases in synonym_groups.items():
-            if normalized == target or normalized in aliases:
-                mapped_column = existing_lookup.get(_normalize_identifier(target), target)
-                break
-
-        if mapped_column is None:
-            mapped_column = normalized or "COLUMN"
-
-        result[str(excel_column)] = mapped_column
-
-    return result
-
-
 def map_columns(
     excel_columns: Iterable[str],
     existing_columns: Iterable[str],
     response_fn: Callable[[str], str] | None,
 ) -> dict[str, str]:
-    """Map Excel column names to the PRODUCT table columns."""
+    """Map Excel column names to the PRODUCT table columns.
+
+    Headers are matched offline by ``column_matching``; only the ones it
+    reports as ambiguous are sent to ``response_fn``. When the model is
+    unavailable or omits a header, the matcher's best guess is kept.
+    """
 
     excel_columns = [str(column) for column in excel_columns]
     existing_columns = [str(column) for column in existing_columns]
-    prompt = build_column_mapping_prompt(excel_columns, existing_columns)
-
-    if response_fn is not None:
-        try:
-            response_mapping = _parse_mapping_response(response_fn(prompt))
-            if response_mapping:
-                normalized_existing = {_normalize_identifier(column): column for column in existing_columns}
-                mapped: dict[str, str] = {}
-                for excel_column in excel_columns:
-                    raw_value = response_mapping.get(excel_column)
-                    if raw_value is None:
-                        raw_value = response_mapping.get(_normalize_identifier(excel_column))
-                    if raw_value is None:
-                        continue
-                    normalized_raw = _normalize_identifier(str(raw_value))
-                    mapped[excel_column] = normalized_existing.get(normalized_raw, normalized_raw)
-                if len(mapped) == len(excel_columns):
-                    return mapped
-        except Exception:
-            pass
-
-    return _heuristic_column_mapping(excel_columns, existing_columns)
+    matches = match_columns(excel_columns, existing_columns)
+    mapped = {column: matches[column].target for column in excel_columns}
+    ambiguous = [column for column in excel_columns if not matches[column].confident]
+    count("columns_matched_offline", len(excel_columns) - len(ambiguous))
+    count("columns_escalated", len(ambiguous))
+    if not ambiguous or response_fn is None:
+        return mapped
+
+    prompt = build_column_mapping_prompt(ambiguous, existing_columns)
+    try:
+        response_mapping = _parse_mapping_response(response_fn(prompt))
+    except Exception:
+        return mapped
+    normalized_existing = {_normalize_identifier(column): column for column in existing_columns}
+    for excel_column in ambiguous:
+        raw_value = response_mapping.get(excel_column)
+        if raw_value is None:
+            raw_value = response_mapping.get(_normalize_identifier(excel_column))
+        if raw_value is None:
+            continue
+        normalized_raw = _normalize_identifier(str(raw_value))
+        if normalized_raw:
+            mapped[excel_column] = normalized_existing.get(normalized_raw, normalized_raw)
+    return mapped